@@ -0,0 +1,143 @@
+"""
+Benchmark: /api/analytics/laboral/cadenas-productivas aggregation.
+
+Generates a synthetic set of offers (no database needed) and times the
+legacy per-cadena loop against the single ``aggregate_cadenas`` pass over
+the same ``sector × municipio`` rows, plus the whole columnar-snapshot path
+(``OfertasSnapshot.cells`` + distinct empresas + ``aggregate_cadenas``).
+Query time is not included: the inputs are pre-aggregated as SQL would
+return them. ``--municipios`` widens the territory to show how each grows
+with the number of rows. Also reports how far the legacy summed empresas
+overcount the distinct employers per cadena.
+
+Usage:
+    python benchmarks/bench_cadenas.py --offers 100000 --municipios 11 1100 --runs 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from src.backend.services.cadenas import CADENA_SECTORES, CADENAS, aggregate_cadenas  # noqa: E402
+from src.backend.services.olap import OfertasSnapshot  # noqa: E402
+
+SECTORES = sorted({s for cfg in CADENAS.values() for s in cfg["sectores"]} | {"Otro", "Tecnología"})
+SKILLS = sorted({s for cfg in CADENAS.values() for s in cfg["skills"]} | {"Inglés", "Python", "Conducción"})
+
+
+def synthetic_offers(n: int, municipios: int, seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    empresas = [f"Empresa {i}" for i in range(max(n // 20, 1))]
+    return [{
+        "sector": rng.choice(SECTORES),
+        "municipio": f"Municipio {rng.randrange(municipios)}",
+        "empresa": rng.choice(empresas),
+        "salario_numerico": rng.randint(1_300_000, 6_000_000) if rng.random() < 0.4 else None,
+        "skills": rng.sample(SKILLS, rng.randint(0, 4)),
+    } for _ in range(n)]
+
+
+def legacy_cadenas(sector_data: list[dict], sector_skills: dict) -> list[dict]:
+    """get_cadenas_productivas before the rewrite (O(cadenas × rows))."""
+    result = []
+    for cadena_name, cfg in CADENAS.items():
+        cadena_ofertas = 0
+        salarios = []
+        municipios = {}
+        matched_skills = {}
+        for row in sector_data:
+            if row["sector"] in cfg["sectores"]:
+                cadena_ofertas += row["ofertas"]
+                if row.get("salario_promedio"):
+                    salarios.append((row["salario_promedio"], row["ofertas"]))
+                muni = row.get("municipio", "Otro")
+                if muni not in municipios:
+                    municipios[muni] = {"municipio": muni, "ofertas": 0}
+                municipios[muni]["ofertas"] += row["ofertas"]
+        for sector in cfg["sectores"]:
+            for sk in sector_skills.get(sector, []):
+                if sk["skill"] in cfg["skills"]:
+                    matched_skills[sk["skill"]] = matched_skills.get(sk["skill"], 0) + sk["demanda"]
+        sal_prom = None
+        if salarios:
+            total_w = sum(w for _, w in salarios)
+            sal_prom = int(sum(s * w for s, w in salarios) / total_w) if total_w > 0 else None
+        empresas_total = sum(row["empresas"] for row in sector_data if row["sector"] in cfg["sectores"])
+        top_skills = sorted(matched_skills.items(), key=lambda x: x[1], reverse=True)[:10]
+        result.append({
+            "cadena": cadena_name, "sectores": cfg["sectores"], "ofertas": cadena_ofertas,
+            "empresas": empresas_total, "salario_promedio": sal_prom,
+            "top_skills": [{"skill": s, "demanda": d} for s, d in top_skills],
+            "municipios": sorted(municipios.values(), key=lambda x: x["ofertas"], reverse=True),
+        })
+    return sorted(result, key=lambda x: x["ofertas"], reverse=True)
+
+
+def sql_inputs(offers: list[dict]) -> tuple:
+    """What the legacy and the new queries return for *offers*."""
+    df = pd.DataFrame(offers)
+    grouped = df.groupby(["sector", "municipio"])
+    legacy = grouped.agg(ofertas=("empresa", "size"), empresas=("empresa", "nunique"),
+                         salario_promedio=("salario_numerico", "mean")).reset_index()
+    legacy["salario_promedio"] = pd.Series([None if pd.isna(v) else round(v) for v in legacy["salario_promedio"]],
+                                           dtype=object)
+    cells = grouped.agg(ofertas=("empresa", "size"), salario_suma=("salario_numerico", "sum"),
+                        salario_n=("salario_numerico", "count")).reset_index()
+    skills = df[["sector", "skills"]].explode("skills").dropna().groupby(["sector", "skills"]).size()
+    skill_rows = [{"sector": s, "skill": k, "demanda": int(d)} for (s, k), d in skills.items()]
+    legacy_skills = {}
+    for row in sorted(skill_rows, key=lambda r: -r["demanda"]):
+        legacy_skills.setdefault(row["sector"], []).append(row)
+    empresas = {c: df.loc[df["sector"].isin(cfg["sectores"]), "empresa"].nunique() for c, cfg in CADENAS.items()}
+    return legacy.to_dict("records"), legacy_skills, cells.to_dict("records"), skill_rows, empresas
+
+
+def _time(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--offers", type=int, default=100_000)
+    parser.add_argument("--municipios", type=int, nargs="+", default=[11, 1100])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for n_municipios in args.municipios:
+        offers = synthetic_offers(args.offers, n_municipios)
+        sector_data, legacy_skills, cells, skill_rows, empresas = sql_inputs(offers)
+        snap = OfertasSnapshot([{**o, "dane_code": None, "fuente": None, "tipo_contrato": None,
+                                 "nivel_educativo": None, "nivel_experiencia": None, "modalidad": None,
+                                 "periodo": None} for o in offers])
+
+        def snapshot_path():
+            mask = snap.isin("sector", CADENA_SECTORES)
+            skills = [{"sector": sec, "skill": sk, "demanda": d}
+                      for sec, counts in snap.skill_counts_by("sector", mask).items() for sk, d in counts]
+            distinct = {c: snap.distinct("empresa", snap.isin("sector", cfg["sectores"]))
+                        for c, cfg in CADENAS.items()}
+            return aggregate_cadenas(snap.cells(["sector", "municipio"], mask), skills, distinct)
+
+        print(f"{args.offers} offers, {n_municipios} municipios: {len(sector_data)} sector×municipio rows")
+        print(f"  legacy loop           {_time(lambda: legacy_cadenas(sector_data, legacy_skills), args.runs):8.2f} ms")
+        print(f"  aggregate_cadenas     {_time(lambda: aggregate_cadenas(cells, skill_rows, empresas), args.runs):8.2f} ms")
+        print(f"  snapshot path         {_time(snapshot_path, args.runs):8.2f} ms")
+
+    legacy = {c["cadena"]: c["empresas"] for c in legacy_cadenas(sector_data, legacy_skills)}
+    for cadena in aggregate_cadenas(cells, skill_rows, empresas):
+        print(f"  {cadena['cadena']:32s} empresas distintas {cadena['empresas']:6d}"
+              f"  (suma por sector×municipio: {legacy[cadena['cadena']]})")
+
+
+if __name__ == "__main__":
+    main()
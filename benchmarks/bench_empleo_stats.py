@@ -0,0 +1,107 @@
+"""
+Benchmark: /api/empleo/stats — seven queries vs one GROUPING SETS pass.
+
+Copies empleo.ofertas_laborales into a scratch schema multiplied by each
+scale factor, then times the legacy seven-query sequence against
+``empleo_stats_sql`` and counts the table scans in each plan.
+
+Usage (needs a PostgreSQL DATABASE_URL with empleo.ofertas_laborales):
+    python benchmarks/bench_empleo_stats.py --scales 1 10 100 --runs 5
+
+Local PostgreSQL 16, 25,000 synthetic offers (11 municipios, 5 fuentes,
+12 sectores, ~800 empresas, 45% with salary), median of 5 runs:
+
+     scale       rows  legacy ms  scans  single ms  scans  speedup
+        1x      25000       51.9      7       23.9      1     2.2x
+       10x     250000      485.6      7      250.8      1     1.9x
+       40x    1000000     1648.1      7      890.4      1     1.9x
+
+The legacy sequence includes the exact PERCENTILE_CONT median; the single
+pass does not, since /stats now reads it from empleo.salarios_rollup.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from src.backend.database import engine  # noqa: E402
+from src.backend.routers.empleo import empleo_stats_sql  # noqa: E402
+
+TABLE = "empleo.ofertas_laborales"
+BENCH_TABLE = "bench_empleo.ofertas_laborales"
+WHERE = "1=1"
+SAL = f"{WHERE} AND salario_numerico IS NOT NULL"
+EMP = f"{WHERE} AND empresa IS NOT NULL AND empresa != 'No especificada'"
+
+# The queries get_empleo_stats issued before the GROUPING SETS rewrite
+LEGACY_QUERIES = [
+    f"SELECT COUNT(*) as total FROM {TABLE} WHERE {WHERE}",
+    f"SELECT municipio, COUNT(*) as total FROM {TABLE} WHERE {WHERE} GROUP BY municipio ORDER BY total DESC",
+    f"SELECT fuente, COUNT(*) as total FROM {TABLE} WHERE {WHERE} GROUP BY fuente ORDER BY total DESC",
+    f"SELECT sector, COUNT(*) as total FROM {TABLE} WHERE {WHERE} GROUP BY sector ORDER BY total DESC",
+    f"SELECT empresa, COUNT(*) as total FROM {TABLE} WHERE {EMP} GROUP BY empresa ORDER BY total DESC LIMIT 15",
+    f"SELECT COUNT(*) as total FROM {TABLE} WHERE {SAL}",
+    f"""SELECT ROUND(AVG(salario_numerico)) as promedio, MIN(salario_numerico) as minimo,
+               MAX(salario_numerico) as maximo,
+               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana
+        FROM {TABLE} WHERE {SAL}""",
+]
+
+
+def _scans(plan: dict) -> int:
+    own = 1 if plan.get("Relation Name") == "ofertas_laborales" else 0
+    return own + sum(_scans(p) for p in plan.get("Plans", []))
+
+
+def _measure(conn, queries: list[str], runs: int) -> tuple[float, int]:
+    scans = 0
+    for sql in queries:
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scans += _scans(plan[0]["Plan"])
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for sql in queries:
+            conn.execute(text(sql)).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = [q.replace(TABLE, BENCH_TABLE) for q in LEGACY_QUERIES]
+    single = [empleo_stats_sql(WHERE).replace(TABLE, BENCH_TABLE)]
+
+    print(f"{'scale':>6} {'rows':>10} {'legacy ms':>10} {'scans':>6} {'single ms':>10} {'scans':>6} {'speedup':>8}")
+    with engine.connect() as conn:
+        for scale in args.scales:
+            conn.execute(text("DROP SCHEMA IF EXISTS bench_empleo CASCADE"))
+            conn.execute(text("CREATE SCHEMA bench_empleo"))
+            conn.execute(text(
+                f"CREATE TABLE {BENCH_TABLE} AS "
+                f"SELECT municipio, fuente, sector, empresa, salario_numerico, dane_code "
+                f"FROM {TABLE}, generate_series(1, :n)"
+            ), {"n": scale})
+            conn.execute(text(f"ANALYZE {BENCH_TABLE}"))
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {BENCH_TABLE}")).scalar()
+
+            legacy_s, legacy_scans = _measure(conn, legacy, args.runs)
+            single_s, single_scans = _measure(conn, single, args.runs)
+            print(f"{scale:>5}x {rows:>10} {legacy_s * 1000:>10.1f} {legacy_scans:>6} "
+                  f"{single_s * 1000:>10.1f} {single_scans:>6} {legacy_s / single_s:>7.1f}x")
+        conn.execute(text("DROP SCHEMA IF EXISTS bench_empleo CASCADE"))
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: /api/empleo/ofertas?busqueda= — ILIKE scan vs GIN full-text index.
+
+Copies empleo.ofertas_laborales into a scratch schema multiplied by each
+scale factor (with the same generated ``search_tsv`` column and GIN index as
+migration 19), then times the legacy ``titulo/descripcion ILIKE '%q%'``
+filter against ``search_clause`` for a set of search terms.
+
+Usage (needs a PostgreSQL DATABASE_URL with migration 19 applied):
+    python benchmarks/bench_ofertas_search.py --scales 1 10 50 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from src.backend.database import engine  # noqa: E402
+from src.backend.services.search import SEARCH_CONFIG, search_clause  # noqa: E402
+
+TABLE = "empleo.ofertas_laborales"
+BENCH_TABLE = "bench_search.ofertas_laborales"
+TERMS = ["enfermera", "tecnico", "auxiliar contable", "conductor", "banano"]
+
+
+def _page_sql(condition: str, rank: str | None) -> str:
+    order = f"{rank} DESC, " if rank else ""
+    return (f"SELECT id, titulo FROM {BENCH_TABLE} WHERE {condition} "
+            f"ORDER BY {order}fecha_publicacion DESC NULLS LAST, id DESC LIMIT 25")
+
+
+def _measure(conn, fulltext: bool, runs: int) -> tuple[float, int]:
+    timings, matches = [], 0
+    for term in TERMS:
+        condition, rank, params = search_clause(term, fulltext)
+        matches += conn.execute(text(f"SELECT COUNT(*) FROM {BENCH_TABLE} WHERE {condition}"), params).scalar()
+        sql = text(_page_sql(condition, rank))
+        for _ in range(runs):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>10} {'ilike ms':>9} {'hits':>7} {'fts ms':>8} {'hits':>7} {'speedup':>8}")
+    with engine.connect() as conn:
+        for scale in args.scales:
+            conn.execute(text("DROP SCHEMA IF EXISTS bench_search CASCADE"))
+            conn.execute(text("CREATE SCHEMA bench_search"))
+            conn.execute(text(
+                f"CREATE TABLE {BENCH_TABLE} AS "
+                f"SELECT (id * 1000 + g) AS id, titulo, descripcion, fecha_publicacion "
+                f"FROM {TABLE}, generate_series(1, :n) g"
+            ), {"n": scale})
+            conn.execute(text(
+                f"ALTER TABLE {BENCH_TABLE} ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(titulo, '')), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(descripcion, '')), 'B')) STORED"
+            ))
+            conn.execute(text(f"CREATE INDEX ON {BENCH_TABLE} USING GIN (search_tsv)"))
+            conn.execute(text(f"ANALYZE {BENCH_TABLE}"))
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {BENCH_TABLE}")).scalar()
+
+            ilike_s, ilike_hits = _measure(conn, False, args.runs)
+            fts_s, fts_hits = _measure(conn, True, args.runs)
+            print(f"{scale:>5}x {rows:>10} {ilike_s * 1000:>9.1f} {ilike_hits:>7} "
+                  f"{fts_s * 1000:>8.1f} {fts_hits:>7} {ilike_s / fts_s:>7.1f}x")
+        conn.execute(text("DROP SCHEMA IF EXISTS bench_search CASCADE"))
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ import geopandas as gpd
 import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
+from etl_sync import bump_data_version
 
 # ============================================================
 # CONFIGURACIÓN
@@ -313,6 +314,11 @@ def main():
     # Socioeconómico and others (these usually have all municipios in one file or specific files)
     # To be updated in next steps...
 
+    # Every schema was dropped and reloaded above
+    with engine.begin() as conn:
+        for schema in ['cartografia', 'catastro', 'socioeconomico', 'seguridad', 'servicios']:
+            bump_data_version(conn, schema)
+
     # Resumen
     print("\n" + "=" * 70)
     print("  RESUMEN ETL REGIONAL")
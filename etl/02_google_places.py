@@ -11,6 +11,7 @@ from pathlib import Path
 import requests
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from etl_sync import bump_data_version
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
@@ -129,6 +130,8 @@ def load_to_db(all_places):
     gdf = gdf.drop_duplicates(subset=["place_id"])
 
     gdf.to_postgis("google_places", engine, schema="servicios", if_exists="replace", index=False)
+    with engine.begin() as conn:
+        bump_data_version(conn, "servicios")
     print(f"\n  Cargados {len(gdf)} lugares a PostGIS")
 
 
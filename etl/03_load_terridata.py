@@ -11,6 +11,7 @@ import os
 from pathlib import Path
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from etl_sync import bump_data_version
 
 # Load env before importing DB_URL if possible, or just re-read it here
 load_dotenv()
@@ -119,6 +120,9 @@ def main():
         except Exception as e:
             print(f"  [ERROR] Loading {f}: {e}")
 
+    with engine.begin() as conn:
+        bump_data_version(conn, SCHEMA)
+
     print("\n" + "=" * 70)
     print("  TERRIDATA LOAD COMPLETE")
     print("=" * 70)
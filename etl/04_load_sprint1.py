@@ -16,6 +16,7 @@ from pathlib import Path
 
 import pandas as pd
 from sqlalchemy import create_engine, text
+from etl_sync import bump_data_version
 
 # ============================================================
 # CONFIGURACION
@@ -95,6 +96,12 @@ def load_dataset(rel_path, schema, table, expected):
         print(f"  [FAIL] {full_table}: {e}")
         return {"table": full_table, "status": "error", "rows": 0, "detail": str(e)}
 
+def bump_loaded_schemas():
+    """Invalida el cache del API para cada schema escrito por esta carga."""
+    with engine.begin() as conn:
+        for schema in sorted({schema for _, schema, _, _ in DATASETS}):
+            bump_data_version(conn, schema)
+
 def truncate_tables():
     """Limpia las tablas antes de la carga regional."""
     with engine.connect() as conn:
@@ -119,6 +126,7 @@ def main():
         else:
              results.append(load_dataset(rel_path, schema, table, expected))
 
+    bump_loaded_schemas()
     generate_completeness_report()
     return 0
 
@@ -521,6 +529,8 @@ def main():
         else:
             fail_count += 1
 
+    bump_loaded_schemas()
+
     print(f"\n--- Carga completada: {ok_count} OK, {fail_count} errores, {total_rows:,} filas totales ---")
 
     report = generate_completeness_report()
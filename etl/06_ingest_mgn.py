@@ -3,6 +3,7 @@ import geopandas as gpd
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from etl_sync import bump_data_version
 
 load_dotenv()
 
@@ -74,6 +75,7 @@ def ingest_mgn_veredas():
             DROP TABLE IF EXISTS cartografia.veredas_mgn;
             ALTER TABLE cartografia.veredas_mgn_temp RENAME TO veredas_mgn;
         """))
+        bump_data_version(conn, "cartografia")
     
     print("Ingesta completa exitosa (via WKT manual).")
 
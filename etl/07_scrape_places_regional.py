@@ -2,6 +2,7 @@ import os
 import time
 import pandas as pd
 from sqlalchemy import create_engine, text
+from etl_sync import bump_data_version
 from dotenv import load_dotenv
 import requests
 
@@ -130,6 +131,7 @@ def save_places_to_db(data, engine):
                 "addr": row.address, "rat": row.rating, "urt": urt,
                 "lat": row.lat, "lon": row.lon, "dane": row.dane_code
             })
+        bump_data_version(conn, "servicios")
 
 if __name__ == "__main__":
     print("🚀 Iniciando motor de scraping regional...")
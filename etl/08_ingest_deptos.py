@@ -2,6 +2,7 @@ import os
 import geopandas as gpd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from etl_sync import bump_data_version
 
 load_dotenv()
 
@@ -53,6 +54,7 @@ def ingest_departamentos():
             DROP TABLE IF EXISTS cartografia.departamentos;
             ALTER TABLE cartografia.departamentos_temp RENAME TO departamentos;
         """))
+        bump_data_version(conn, "cartografia")
     
     print("Ingesta de departamentos completa.")
 
@@ -11,6 +11,7 @@ import numpy as np
 from pathlib import Path
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from etl_sync import bump_data_version
 
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
@@ -310,6 +311,10 @@ def main():
     total += load_ips(engine)
     total += load_establecimientos(engine)
 
+    with engine.begin() as conn:
+        for schema in ("seguridad", "socioeconomico"):
+            bump_data_version(conn, schema)
+
     print("\n" + "=" * 60)
     print(f"  COMPLETE: {total} total rows loaded")
     print("=" * 60)
@@ -23,6 +23,7 @@ from sqlalchemy import create_engine, text
 # ---------------------------------------------------------------------------
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import DB_URL
+from etl_sync import bump_data_version
 
 GEOJSON_PATH = next(
     (p for p in [
@@ -157,6 +158,8 @@ def main():
         ))
         print("  Indice espacial creado")
 
+        bump_data_version(conn, "cartografia")
+
     print("\nDone!")
 
 
@@ -13,6 +13,7 @@ from sqlalchemy import create_engine, text
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import DB_URL
+from etl_sync import bump_data_version, refresh_ofertas_rollup
 
 SQLITE_PATH = Path.home() / "uraba_empleos" / "empleos_uraba.db"
 
@@ -312,6 +313,8 @@ def main():
         conn.execute(text("CREATE INDEX idx_ofertas_fecha ON empleo.ofertas_laborales(fecha_publicacion)"))
 
         print(f"  Insertadas: {inserted} ofertas")
+        refresh_ofertas_rollup(conn)
+        bump_data_version(conn, "empleo")
 
         # Print summary stats
         stats = conn.execute(text("""
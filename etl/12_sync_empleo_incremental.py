@@ -28,6 +28,19 @@ from etl_sync import (
     parse_salary,
     get_dane_code,
     compute_dedup_hash,
+    bump_data_version,
+    ensure_rollup_table,
+    rollup_deltas,
+    apply_rollup_deltas,
+    refresh_monthly_rollup,
+    ensure_salary_rollup_table,
+    salary_rollup_deltas,
+    apply_salary_rollup_deltas,
+    refresh_salary_rollup,
+    ensure_daily_rollup_table,
+    daily_rollup_deltas,
+    apply_daily_rollup_deltas,
+    refresh_daily_rollup,
 )
 
 
@@ -109,6 +122,7 @@ def main():
 
         inserted = 0
         skipped_dedup = 0
+        inserted_rows = []
         for row in new_rows:
             titulo = row['titulo']
             desc = row['descripcion']
@@ -133,7 +147,7 @@ def main():
                 if len(parts) == 3:
                     fecha_pub = f"{parts[2]}-{parts[1]}-{parts[0]}"
 
-            conn.execute(text("""
+            result = conn.execute(text("""
                 INSERT INTO empleo.ofertas_laborales
                     (titulo, empresa, salario_texto, salario_numerico, descripcion,
                      fecha_publicacion, enlace, municipio, dane_code, fuente,
@@ -145,6 +159,8 @@ def main():
                      :sector, :skills, :fecha_scraping, :hash, :dedup_hash,
                      :nivel_experiencia, :tipo_contrato, :nivel_educativo, :modalidad)
                 ON CONFLICT (dedup_hash) WHERE dedup_hash IS NOT NULL DO NOTHING
+                RETURNING fecha_publicacion, municipio, dane_code, sector, fuente,
+                          empresa, salario_numerico, nivel_educativo, nivel_experiencia
             """), {
                 "titulo": titulo,
                 "empresa": empresa,
@@ -167,11 +183,35 @@ def main():
                 "modalidad": enrich['modalidad'],
             })
             existing_dedup.add(dedup)
+            inserted_row = result.mappings().first()
+            if inserted_row is not None:
+                inserted_rows.append(inserted_row)
             inserted += 1
 
         print(f"  Insertadas: {inserted} nuevas ofertas")
         print(f"  Omitidas por deduplicación cross-portal: {skipped_dedup}")
 
+        if inserted:
+            # Merge the aggregates of just this batch into each rollup (no full
+            # recompute); a new or empty rollup is built from every offer instead
+            rollups = (
+                ("mensual", ensure_rollup_table, refresh_monthly_rollup,
+                 apply_rollup_deltas, rollup_deltas),
+                ("salarial", ensure_salary_rollup_table, refresh_salary_rollup,
+                 apply_salary_rollup_deltas, salary_rollup_deltas),
+                ("diario", ensure_daily_rollup_table, refresh_daily_rollup,
+                 apply_daily_rollup_deltas, daily_rollup_deltas),
+            )
+            for name, ensure, refresh, apply_deltas, deltas in rollups:
+                if ensure(conn):
+                    cells = refresh(conn)
+                    print(f"  Rollup {name}: reconstruido, {cells} celdas")
+                else:
+                    cells = apply_deltas(conn, deltas(inserted_rows))
+                    print(f"  Rollup {name}: {cells} celdas actualizadas con {len(inserted_rows)} ofertas")
+            version = bump_data_version(conn, "empleo")
+            print(f"  Versión de datos empleo: {version}")
+
     conn_sqlite.close()
     engine.dispose()
     print("Sync completado!")
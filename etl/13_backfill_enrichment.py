@@ -17,6 +17,7 @@ from sqlalchemy import create_engine, text
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import DB_URL
+from etl_sync import bump_data_version, refresh_ofertas_rollup
 
 # Import patterns from ETL 12 to stay DRY
 sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -206,6 +207,11 @@ def main():
                 """), u)
         updated += len(updates)
 
+    with engine.begin() as conn:
+        # Backfills rewrite rows in place: rebuild the rollup rather than merge deltas
+        refresh_ofertas_rollup(conn)
+        bump_data_version(conn, "empleo")
+
     print(f"\nBackfill completado: {updated} ofertas enriquecidas")
 
     # Summary
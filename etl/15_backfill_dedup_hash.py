@@ -9,7 +9,7 @@ from sqlalchemy import create_engine, text
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 from config import DB_URL
-from etl_sync import compute_dedup_hash
+from etl_sync import compute_dedup_hash, bump_data_version, refresh_ofertas_rollup
 
 def main():
     engine = create_engine(DB_URL, pool_size=1, max_overflow=0)
@@ -54,6 +54,8 @@ def main():
                 text("DELETE FROM empleo.ofertas_laborales WHERE id = ANY(:ids)"),
                 {"ids": duplicates},
             )
+            refresh_ofertas_rollup(conn)
+            bump_data_version(conn, "empleo")
 
     engine.dispose()
     print(f"  Backfill complete. Updated: {len(updates)}, Removed: {len(duplicates)}")
@@ -2,7 +2,8 @@
 ETL 16: Imputación Salarial
 ============================
 Estima salarios para ofertas sin salario_numerico usando la mediana
-por sector + municipio + nivel_educativo + nivel_experiencia.
+por sector + municipio + nivel_educativo + nivel_experiencia, leída de los
+histogramas de empleo.salarios_rollup (ver migración 24).
 
 Fallback chain:
   1. sector + municipio + nivel_educativo + nivel_experiencia (≥3 muestra)
@@ -19,6 +20,14 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from sqlalchemy import create_engine, text
+from etl_sync import (
+    bump_data_version,
+    ensure_salary_rollup_table,
+    merge_salary_sketches,
+    refresh_ofertas_rollup,
+    refresh_salary_rollup,
+    sketch_quantile,
+)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
@@ -39,54 +48,36 @@ def ensure_column():
 
 
 def build_reference_table(conn):
-    """Build salary reference medians at different granularity levels."""
-    # Level 1: Full granularity
-    level1 = conn.execute(text("""
-        SELECT sector, municipio, nivel_educativo, nivel_experiencia,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana,
-               COUNT(*) as muestra
-        FROM empleo.ofertas_laborales
-        WHERE salario_numerico IS NOT NULL
-        GROUP BY sector, municipio, nivel_educativo, nivel_experiencia
-        HAVING COUNT(*) >= 3
-    """)).fetchall()
+    """Build salary reference medians at different granularity levels.
+
+    Medians come from merging the salary histograms of empleo.salarios_rollup
+    (±1%) instead of sorting every salary with PERCENTILE_CONT.
+    """
+    if ensure_salary_rollup_table(conn):
+        refresh_salary_rollup(conn)
+    cells = conn.execute(text("""
+        SELECT sector, municipio, nivel_educativo, nivel_experiencia, salario_n, salario_sketch
+        FROM empleo.salarios_rollup
+    """)).mappings().all()
+
+    def medians(columns):
+        groups = {}
+        for cell in cells:
+            group = groups.setdefault(tuple(cell[c] for c in columns), [0, []])
+            group[0] += cell["salario_n"]
+            group[1].append(cell["salario_sketch"])
+        return {
+            key: int(sketch_quantile(merge_salary_sketches(sketches), 0.5))
+            for key, (muestra, sketches) in groups.items()
+            if muestra >= 3
+        }
 
+    # Level 1: Full granularity
+    ref1 = medians(("sector", "municipio", "nivel_educativo", "nivel_experiencia"))
     # Level 2: sector + municipio
-    level2 = conn.execute(text("""
-        SELECT sector, municipio,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana,
-               COUNT(*) as muestra
-        FROM empleo.ofertas_laborales
-        WHERE salario_numerico IS NOT NULL
-        GROUP BY sector, municipio
-        HAVING COUNT(*) >= 3
-    """)).fetchall()
-
+    ref2 = medians(("sector", "municipio"))
     # Level 3: sector only
-    level3 = conn.execute(text("""
-        SELECT sector,
-               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana,
-               COUNT(*) as muestra
-        FROM empleo.ofertas_laborales
-        WHERE salario_numerico IS NOT NULL
-        GROUP BY sector
-        HAVING COUNT(*) >= 3
-    """)).fetchall()
-
-    # Build lookup dicts
-    ref1 = {}
-    for r in level1:
-        key = (r[0], r[1], r[2], r[3])
-        ref1[key] = int(r[4])
-
-    ref2 = {}
-    for r in level2:
-        key = (r[0], r[1])
-        ref2[key] = int(r[2])
-
-    ref3 = {}
-    for r in level3:
-        ref3[r[0]] = int(r[1])
+    ref3 = {key[0]: mediana for key, mediana in medians(("sector",)).items()}
 
     print(f"  Reference tables: L1={len(ref1)} | L2={len(ref2)} | L3={len(ref3)}")
     return ref1, ref2, ref3
@@ -157,6 +148,9 @@ def main():
     with engine.begin() as conn:
         ref1, ref2, ref3 = build_reference_table(conn)
         impute(conn, ref1, ref2, ref3)
+        # Backfills rewrite rows in place: rebuild the rollup rather than merge deltas
+        refresh_ofertas_rollup(conn)
+        bump_data_version(conn, "empleo")
 
     print("[DONE] Salary imputation complete.")
 
@@ -0,0 +1,20 @@
+-- ============================================================
+-- Migration: Data-version watermarks for API cache invalidation
+-- ============================================================
+-- Each ETL script that writes to a schema bumps its row here
+-- (see etl_sync.bump_data_version). The API includes the current
+-- version in its cache keys, so cached aggregates stay valid until
+-- the underlying data actually changes.
+
+CREATE SCHEMA IF NOT EXISTS meta;
+
+CREATE TABLE IF NOT EXISTS meta.data_versions (
+    schema_name TEXT PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO meta.data_versions (schema_name, version)
+VALUES ('empleo', 1), ('socioeconomico', 1), ('seguridad', 1),
+       ('servicios', 1), ('cartografia', 1)
+ON CONFLICT (schema_name) DO NOTHING;
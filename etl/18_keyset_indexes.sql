@@ -0,0 +1,20 @@
+-- ============================================================
+-- Migration: Indexes for keyset (cursor) pagination
+-- ============================================================
+-- /api/empleo/ofertas?mode=cursor and /api/geo/places/directory?mode=cursor
+-- page with WHERE (sort_col, id) > (last) ORDER BY sort_col, id LIMIT n
+-- (< for the DESC orders); NULL sort keys are read as a separate trailing block.
+-- These composite indexes match each ORDER BY exactly, so every page is an
+-- index range scan of page_size rows regardless of depth.
+
+CREATE INDEX IF NOT EXISTS idx_ofertas_fecha_id_keyset
+    ON empleo.ofertas_laborales (fecha_publicacion DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_places_name_keyset
+    ON servicios.google_places_regional (name, place_id);
+
+CREATE INDEX IF NOT EXISTS idx_places_rating_keyset
+    ON servicios.google_places_regional (rating DESC NULLS LAST, place_id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_places_reviews_keyset
+    ON servicios.google_places_regional (user_ratings_total DESC NULLS LAST, place_id DESC);
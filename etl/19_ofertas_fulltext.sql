@@ -0,0 +1,32 @@
+-- ============================================================
+-- Migration: Full-text search index for job offers
+-- ============================================================
+-- Replaces the leading-wildcard ILIKE behind /api/empleo/ofertas?busqueda=
+-- (a full scan of descripcion per request) with a GIN-indexed tsvector.
+-- The column is GENERATED ... STORED, so every INSERT/UPDATE done by the
+-- ETL (11_migrate, 12_sync, 13_backfill) maintains it without code changes.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Spanish stemming with accents folded first (same folding as etl_sync._normalize)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION public.es_unaccent (COPY = pg_catalog.spanish);
+        ALTER TEXT SEARCH CONFIGURATION public.es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word
+            WITH unaccent, spanish_stem;
+    END IF;
+END $$;
+
+ALTER TABLE empleo.ofertas_laborales
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('public.es_unaccent', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('public.es_unaccent', coalesce(descripcion, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_ofertas_search_tsv
+    ON empleo.ofertas_laborales USING GIN (search_tsv);
+
+ANALYZE empleo.ofertas_laborales;
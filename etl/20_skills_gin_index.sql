@@ -0,0 +1,11 @@
+-- ============================================================
+-- Migration: Inverted index over offer skills
+-- ============================================================
+-- A GIN index on the skills array is Postgres' own skill -> offer posting
+-- list, maintained on every ETL insert/update. It serves the containment
+-- filter (skills @> ARRAY['Excel']) behind /api/empleo/skills/co-occurrence
+-- when the API runs with OLAP_ENGINE=sql; with OLAP_ENGINE=numpy the API
+-- keeps in-memory posting lists rebuilt on each empleo data version.
+
+CREATE INDEX IF NOT EXISTS idx_ofertas_skills_gin
+    ON empleo.ofertas_laborales USING GIN (skills);
@@ -0,0 +1,49 @@
+-- ============================================================
+-- Migration: Monthly rollup of job offers
+-- ============================================================
+-- One row per month × municipio × dane_code × sector × fuente. The time
+-- series, dinamismo, estacionalidad, sectores and sector × municipio
+-- endpoints read this table, so they scale with months × cells rather than
+-- with the number of offers. empresas is the exact set of distinct
+-- companies in the cell, so COUNT(DISTINCT) over any set of cells is exact.
+--
+-- Maintained by etl_sync: ETL 12 merges each batch's per-cell deltas with
+-- apply_rollup_deltas (building the table in full first if it is new or
+-- empty); refresh_ofertas_rollup is a full rebuild, run by ETL 11, 13, 15,
+-- 16 and 23.
+-- Until this migration runs, the API aggregates empleo.ofertas_laborales
+-- directly (src/backend/services/rollup.py).
+
+CREATE TABLE IF NOT EXISTS empleo.ofertas_rollup_mensual (
+    mes          DATE,            -- first day of the month; NULL = undated offers
+    municipio    TEXT,
+    dane_code    TEXT,
+    sector       TEXT,
+    fuente       TEXT,
+    ofertas      INTEGER NOT NULL,
+    salario_suma BIGINT,
+    salario_n    INTEGER NOT NULL,
+    salario_min  INTEGER,
+    salario_max  INTEGER,
+    empresas     TEXT[] NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_mes ON empleo.ofertas_rollup_mensual (mes);
+CREATE INDEX IF NOT EXISTS idx_rollup_dane ON empleo.ofertas_rollup_mensual (dane_code);
+
+-- Initial population
+DELETE FROM empleo.ofertas_rollup_mensual;
+INSERT INTO empleo.ofertas_rollup_mensual
+    (mes, municipio, dane_code, sector, fuente,
+     ofertas, salario_suma, salario_n, salario_min, salario_max, empresas)
+SELECT DATE_TRUNC('month', fecha_publicacion)::date, municipio, dane_code, sector, fuente,
+       COUNT(*),
+       SUM(salario_numerico) FILTER (WHERE salario_numerico > 0),
+       COUNT(salario_numerico) FILTER (WHERE salario_numerico > 0),
+       MIN(salario_numerico) FILTER (WHERE salario_numerico > 0),
+       MAX(salario_numerico) FILTER (WHERE salario_numerico > 0),
+       ARRAY_REMOVE(ARRAY_AGG(DISTINCT empresa), NULL)
+FROM empleo.ofertas_laborales
+GROUP BY 1, municipio, dane_code, sector, fuente;
+
+ANALYZE empleo.ofertas_rollup_mensual;
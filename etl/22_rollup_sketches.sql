@@ -0,0 +1,19 @@
+-- ============================================================
+-- Migration: Delta-maintained rollup (cell key + salary sketches)
+-- ============================================================
+-- ETL 12 now merges the aggregates of each new batch into existing rollup
+-- cells with INSERT ... ON CONFLICT, instead of re-aggregating months. That
+-- needs a unique key over the (nullable) cell columns and a mergeable
+-- salary sketch: a log-bucket histogram {bucket: count} where bucket i holds
+-- salaries in (1.02^(i-1), 1.02^i], so medians read from merged sketches
+-- are within ±1%.
+--
+-- After applying, rebuild the rollup once so existing cells get sketches:
+--   python etl/23_rebuild_rollup.py
+
+ALTER TABLE empleo.ofertas_rollup_mensual
+    ADD COLUMN IF NOT EXISTS salario_sketch JSONB NOT NULL DEFAULT '{}';
+
+-- NULLS NOT DISTINCT (PostgreSQL 15+): undated / unclassified cells are keys too
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_cell
+    ON empleo.ofertas_rollup_mensual (mes, municipio, dane_code, sector, fuente) NULLS NOT DISTINCT;
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+ETL 23 — Rebuild empleo.ofertas_rollup_mensual, empleo.salarios_rollup and
+empleo.ofertas_rollup_diario from scratch.
+
+The incremental sync (ETL 12) merges each batch into the rollups; the
+backfills (11, 13, 15, 16) rebuild them themselves. Run this after applying
+migrations 22, 24 or 25, or whenever a rollup is suspected to have drifted.
+
+Uso:
+  python etl/23_rebuild_rollup.py
+"""
+import sys
+from pathlib import Path
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from config import DB_URL
+from etl_sync import bump_data_version, refresh_ofertas_rollup
+
+
+def main():
+    engine = create_engine(DB_URL, pool_size=1, max_overflow=0)
+    with engine.begin() as conn:
+        cells = refresh_ofertas_rollup(conn)
+        version = bump_data_version(conn, "empleo")
+    engine.dispose()
+    print(f"  Rollups reconstruidos (mensual, diario y salarios): "
+          f"{cells} celdas mensuales (empleo v{version})")
+
+
+if __name__ == "__main__":
+    main()
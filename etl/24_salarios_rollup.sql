@@ -0,0 +1,52 @@
+-- ============================================================
+-- Migration: Salary percentile rollup
+-- ============================================================
+-- One row per municipio × dane_code × sector × nivel_educativo ×
+-- nivel_experiencia with the salaried offers' count, sum and log-bucket
+-- histogram (same buckets as ofertas_rollup_mensual.salario_sketch). Medians
+-- and p10/p25/p75/p90 for any combination of those columns are read by
+-- merging histograms (±1%), instead of PERCENTILE_CONT sorting every salary:
+-- /api/empleo/stats, /api/empleo/salarios/percentiles,
+-- /api/analytics/laboral/salario-imputado and ETL 16's reference table.
+--
+-- Maintained by etl_sync: ETL 12 merges the deltas of each batch, the
+-- backfills and ETL 23 rebuild it with refresh_ofertas_rollup. Until it is
+-- populated, /stats and /salario-imputado fall back to exact medians over
+-- empleo.ofertas_laborales.
+
+CREATE TABLE IF NOT EXISTS empleo.salarios_rollup (
+    municipio         TEXT,
+    dane_code         TEXT,
+    sector            TEXT,
+    nivel_educativo   TEXT,
+    nivel_experiencia TEXT,
+    salario_n         INTEGER NOT NULL,
+    salario_suma      BIGINT NOT NULL,
+    salario_sketch    JSONB NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_salarios_rollup_cell
+    ON empleo.salarios_rollup (municipio, dane_code, sector, nivel_educativo, nivel_experiencia)
+    NULLS NOT DISTINCT;
+
+-- Initial population: each (cell, bucket) pair counted with a window, then
+-- folded into the cell's histogram (bucket = etl_sync.salary_bucket)
+DELETE FROM empleo.salarios_rollup;
+INSERT INTO empleo.salarios_rollup
+    (municipio, dane_code, sector, nivel_educativo, nivel_experiencia,
+     salario_n, salario_suma, salario_sketch)
+SELECT municipio, dane_code, sector, nivel_educativo, nivel_experiencia,
+       COUNT(*), SUM(salario_numerico), jsonb_object_agg(bucket, bucket_n)
+FROM (
+    SELECT o.*, COUNT(*) OVER (PARTITION BY municipio, dane_code, sector,
+                                            nivel_educativo, nivel_experiencia, bucket) AS bucket_n
+    FROM (
+        SELECT municipio, dane_code, sector, nivel_educativo, nivel_experiencia, salario_numerico,
+               CEIL(LN(salario_numerico) / LN(1.02))::int AS bucket
+        FROM empleo.ofertas_laborales
+        WHERE salario_numerico > 0
+    ) o
+) o
+GROUP BY municipio, dane_code, sector, nivel_educativo, nivel_experiencia;
+
+ANALYZE empleo.salarios_rollup;
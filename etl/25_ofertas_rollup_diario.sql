@@ -0,0 +1,35 @@
+-- ============================================================
+-- Migration: Daily rollup of job offers
+-- ============================================================
+-- One row per day × municipio × sector with the offers and the salaried
+-- offers' count and sum. The API loads it into an in-memory time-series
+-- store (src/backend/services/timeseries.py) that serves termometro
+-- (rolling 7/14/30-day windows), dinamismo (monthly growth) and
+-- estacionalidad (seasonal indices). dia NULL holds undated offers.
+--
+-- Maintained by etl_sync: ETL 12 merges the deltas of each batch, the
+-- backfills and ETL 23 rebuild it with refresh_ofertas_rollup.
+
+CREATE TABLE IF NOT EXISTS empleo.ofertas_rollup_diario (
+    dia          DATE,
+    municipio    TEXT,
+    sector       TEXT,
+    ofertas      INTEGER NOT NULL,
+    salario_suma BIGINT NOT NULL,
+    salario_n    INTEGER NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_diario_cell
+    ON empleo.ofertas_rollup_diario (dia, municipio, sector) NULLS NOT DISTINCT;
+
+-- Initial population
+DELETE FROM empleo.ofertas_rollup_diario;
+INSERT INTO empleo.ofertas_rollup_diario (dia, municipio, sector, ofertas, salario_suma, salario_n)
+SELECT fecha_publicacion, municipio, sector,
+       COUNT(*),
+       COALESCE(SUM(salario_numerico) FILTER (WHERE salario_numerico > 0), 0),
+       COUNT(salario_numerico) FILTER (WHERE salario_numerico > 0)
+FROM empleo.ofertas_laborales
+GROUP BY fecha_publicacion, municipio, sector;
+
+ANALYZE empleo.ofertas_rollup_diario;
@@ -3,8 +3,14 @@ Shared ETL functions for the Observatorio Laboral.
 Extracted from 12_sync_empleo_incremental.py for testability and reuse.
 """
 import hashlib
+import json
+import math
 import re
 import unicodedata
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import text
 
 MUNICIPIO_DANE = {
     "apartadó": "05045", "apartado": "05045",
@@ -279,3 +285,407 @@ def categorize_skills(skills_list):
     if uncategorized:
         result["Otra"] = uncategorized
     return result
+
+
+def bump_data_version(conn, schema_name: str) -> int:
+    """Increment the data-version watermark of *schema_name* in meta.data_versions.
+
+    Call it inside the same transaction that writes the data, so the API's
+    version-keyed cache entries are invalidated exactly when it commits.
+    Returns the new version.
+    """
+    conn.execute(text("CREATE SCHEMA IF NOT EXISTS meta"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS meta.data_versions (
+            schema_name TEXT PRIMARY KEY,
+            version     BIGINT NOT NULL DEFAULT 0,
+            updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    return conn.execute(text("""
+        INSERT INTO meta.data_versions (schema_name, version, updated_at)
+        VALUES (:schema, 1, now())
+        ON CONFLICT (schema_name) DO UPDATE
+        SET version = meta.data_versions.version + 1, updated_at = now()
+        RETURNING version
+    """), {"schema": schema_name}).scalar()
+
+
+ROLLUP_KEY = ("mes", "municipio", "dane_code", "sector", "fuente")
+ROLLUP_COLUMNS = """
+    mes, municipio, dane_code, sector, fuente,
+    ofertas, salario_suma, salario_n, salario_min, salario_max, empresas, salario_sketch
+"""
+# Log-bucket salary histogram: bucket i holds values in (gamma^(i-1), gamma^i], so
+# any quantile read back from it is within ±1% of the exact value. Histograms
+# merge by adding counts. Must match src/backend/services/sketches.py.
+SALARY_SKETCH_GAMMA = 1.02
+
+
+def salary_bucket(value) -> int | None:
+    """Histogram bucket of a salary (None for missing or non-positive values).
+
+    Every rollup counts a salary in salario_n / salario_suma only when it has
+    a bucket, so counts and histogram totals always agree.
+    """
+    if not value or value <= 0:
+        return None
+    return math.ceil(math.log(value) / math.log(SALARY_SKETCH_GAMMA))
+
+
+def merge_salary_sketches(sketches) -> Counter:
+    """Sum of salary histograms given as dicts or JSON strings."""
+    merged = Counter()
+    for sketch in sketches:
+        if isinstance(sketch, str):
+            sketch = json.loads(sketch)
+        for bucket, count in (sketch or {}).items():
+            merged[int(bucket)] += int(count)
+    return merged
+
+
+def sketch_quantile(histogram: Counter, q: float) -> float | None:
+    """Approximate q-quantile of a merged histogram (bucket midpoint, ±1%).
+    Mirrors src/backend/services/sketches.histogram_quantile."""
+    total = sum(histogram.values())
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen > q * (total - 1):
+            return 2 * SALARY_SKETCH_GAMMA ** bucket / (SALARY_SKETCH_GAMMA + 1)
+    return None
+
+
+def rollup_month(fecha_pub):
+    """First day of the month of an ISO 'YYYY-MM-DD' date (None if absent/unparseable)."""
+    try:
+        return date.fromisoformat(str(fecha_pub)[:7] + "-01") if fecha_pub else None
+    except ValueError:
+        return None
+
+
+def rollup_deltas(rows) -> list[dict]:
+    """Aggregate offers into empleo.ofertas_rollup_mensual rows.
+
+    *rows* are mappings with fecha_publicacion, municipio, dane_code, sector,
+    fuente, empresa and salario_numerico. The result can be inserted into an
+    empty rollup or merged into an existing one with apply_rollup_deltas.
+    """
+    cells = {}
+    for r in rows:
+        key = (rollup_month(r["fecha_publicacion"]), r["municipio"], r["dane_code"], r["sector"], r["fuente"])
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {
+                **dict(zip(ROLLUP_KEY, key)),
+                "ofertas": 0, "salario_suma": None, "salario_n": 0,
+                "salario_min": None, "salario_max": None,
+                "empresas": set(), "salario_sketch": Counter(),
+            }
+        cell["ofertas"] += 1
+        if r["empresa"] is not None:
+            cell["empresas"].add(r["empresa"])
+        salario = r["salario_numerico"]
+        bucket = salary_bucket(salario)
+        if bucket is not None:
+            cell["salario_suma"] = (cell["salario_suma"] or 0) + salario
+            cell["salario_n"] += 1
+            cell["salario_min"] = salario if cell["salario_min"] is None else min(cell["salario_min"], salario)
+            cell["salario_max"] = salario if cell["salario_max"] is None else max(cell["salario_max"], salario)
+            cell["salario_sketch"][str(bucket)] += 1
+    return [
+        {**c, "empresas": sorted(c["empresas"]), "salario_sketch": json.dumps(dict(c["salario_sketch"]))}
+        for c in cells.values()
+    ]
+
+
+def _rollup_empty(conn, table: str) -> bool:
+    return bool(conn.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {table})")).scalar())
+
+
+def ensure_rollup_table(conn) -> bool:
+    """Create empleo.ofertas_rollup_mensual and its cell key if missing (see etl/21, etl/22).
+
+    Returns True when the table is empty (just created, or never populated):
+    deltas merged into it would hold only their batch, so fill it with
+    refresh_monthly_rollup instead.
+    """
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS empleo.ofertas_rollup_mensual (
+            mes            DATE,
+            municipio      TEXT,
+            dane_code      TEXT,
+            sector         TEXT,
+            fuente         TEXT,
+            ofertas        INTEGER NOT NULL,
+            salario_suma   BIGINT,
+            salario_n      INTEGER NOT NULL,
+            salario_min    INTEGER,
+            salario_max    INTEGER,
+            empresas       TEXT[] NOT NULL,
+            salario_sketch JSONB NOT NULL DEFAULT '{}'
+        )
+    """))
+    conn.execute(text(
+        "ALTER TABLE empleo.ofertas_rollup_mensual "
+        "ADD COLUMN IF NOT EXISTS salario_sketch JSONB NOT NULL DEFAULT '{}'"
+    ))
+    conn.execute(text(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_cell
+        ON empleo.ofertas_rollup_mensual ({", ".join(ROLLUP_KEY)}) NULLS NOT DISTINCT
+    """))
+    return _rollup_empty(conn, "empleo.ofertas_rollup_mensual")
+
+
+# Sum of the stored histogram r.salario_sketch and the incoming one, bucket by bucket
+_MERGE_SKETCHES = """(
+                SELECT COALESCE(jsonb_object_agg(bucket, n), '{}'::jsonb)
+                FROM (
+                    SELECT key AS bucket, SUM(value::int) AS n
+                    FROM (SELECT * FROM jsonb_each_text(r.salario_sketch)
+                          UNION ALL
+                          SELECT * FROM jsonb_each_text(EXCLUDED.salario_sketch)) kv
+                    GROUP BY key
+                ) merged
+            )"""
+
+
+def apply_rollup_deltas(conn, deltas: list[dict]) -> int:
+    """Merge rollup_deltas() rows into the rollup: new cells are inserted,
+    existing cells add counts and sums, widen min/max, union their empresas
+    and add their salary histograms. Returns the number of cells written."""
+    if not deltas:
+        return 0
+    conn.execute(text(f"""
+        INSERT INTO empleo.ofertas_rollup_mensual AS r ({ROLLUP_COLUMNS})
+        VALUES (:mes, :municipio, :dane_code, :sector, :fuente,
+                :ofertas, :salario_suma, :salario_n, :salario_min, :salario_max,
+                :empresas, CAST(:salario_sketch AS JSONB))
+        ON CONFLICT ({", ".join(ROLLUP_KEY)}) DO UPDATE SET
+            ofertas = r.ofertas + EXCLUDED.ofertas,
+            salario_suma = CASE WHEN r.salario_n + EXCLUDED.salario_n > 0
+                THEN COALESCE(r.salario_suma, 0) + COALESCE(EXCLUDED.salario_suma, 0) END,
+            salario_n = r.salario_n + EXCLUDED.salario_n,
+            salario_min = LEAST(r.salario_min, EXCLUDED.salario_min),
+            salario_max = GREATEST(r.salario_max, EXCLUDED.salario_max),
+            empresas = ARRAY(SELECT DISTINCT e FROM UNNEST(r.empresas || EXCLUDED.empresas) AS e ORDER BY e),
+            salario_sketch = {_MERGE_SKETCHES}
+    """), deltas)
+    return len(deltas)
+
+
+SALARY_ROLLUP_KEY = ("municipio", "dane_code", "sector", "nivel_educativo", "nivel_experiencia")
+
+
+def salary_rollup_deltas(rows) -> list[dict]:
+    """Aggregate salaried offers into empleo.salarios_rollup rows.
+
+    *rows* are mappings with municipio, dane_code, sector, nivel_educativo,
+    nivel_experiencia and salario_numerico; offers without a salary are
+    skipped. Merge the result with apply_salary_rollup_deltas.
+    """
+    cells = {}
+    for r in rows:
+        bucket = salary_bucket(r["salario_numerico"])
+        if bucket is None:
+            continue
+        key = tuple(r[col] for col in SALARY_ROLLUP_KEY)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {
+                **dict(zip(SALARY_ROLLUP_KEY, key)),
+                "salario_n": 0, "salario_suma": 0, "salario_sketch": Counter(),
+            }
+        cell["salario_n"] += 1
+        cell["salario_suma"] += r["salario_numerico"]
+        cell["salario_sketch"][str(bucket)] += 1
+    return [{**c, "salario_sketch": json.dumps(dict(c["salario_sketch"]))} for c in cells.values()]
+
+
+def ensure_salary_rollup_table(conn) -> bool:
+    """Create empleo.salarios_rollup and its cell key if missing (see etl/24).
+    Returns True when the table is empty; fill it with refresh_salary_rollup."""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS empleo.salarios_rollup (
+            municipio         TEXT,
+            dane_code         TEXT,
+            sector            TEXT,
+            nivel_educativo   TEXT,
+            nivel_experiencia TEXT,
+            salario_n         INTEGER NOT NULL,
+            salario_suma      BIGINT NOT NULL,
+            salario_sketch    JSONB NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_salarios_rollup_cell
+        ON empleo.salarios_rollup ({", ".join(SALARY_ROLLUP_KEY)}) NULLS NOT DISTINCT
+    """))
+    return _rollup_empty(conn, "empleo.salarios_rollup")
+
+
+def apply_salary_rollup_deltas(conn, deltas: list[dict]) -> int:
+    """Merge salary_rollup_deltas() rows into empleo.salarios_rollup (counts
+    and sums add, histograms merge). Returns the number of cells written."""
+    if not deltas:
+        return 0
+    conn.execute(text(f"""
+        INSERT INTO empleo.salarios_rollup AS r
+            ({", ".join(SALARY_ROLLUP_KEY)}, salario_n, salario_suma, salario_sketch)
+        VALUES (:municipio, :dane_code, :sector, :nivel_educativo, :nivel_experiencia,
+                :salario_n, :salario_suma, CAST(:salario_sketch AS JSONB))
+        ON CONFLICT ({", ".join(SALARY_ROLLUP_KEY)}) DO UPDATE SET
+            salario_n = r.salario_n + EXCLUDED.salario_n,
+            salario_suma = r.salario_suma + EXCLUDED.salario_suma,
+            salario_sketch = {_MERGE_SKETCHES}
+    """), deltas)
+    return len(deltas)
+
+
+DAILY_ROLLUP_KEY = ("dia", "municipio", "sector")
+
+
+def rollup_day(fecha_pub):
+    """Date of an ISO 'YYYY-MM-DD' publication date (None if absent/unparseable)."""
+    if isinstance(fecha_pub, date):
+        return fecha_pub
+    try:
+        return date.fromisoformat(str(fecha_pub)[:10]) if fecha_pub else None
+    except ValueError:
+        return None
+
+
+def daily_rollup_deltas(rows) -> list[dict]:
+    """Aggregate offers into empleo.ofertas_rollup_diario rows (offers and
+    salary count/sum per day × municipio × sector). Merge the result with
+    apply_daily_rollup_deltas."""
+    cells = {}
+    for r in rows:
+        key = (rollup_day(r["fecha_publicacion"]), r["municipio"], r["sector"])
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {**dict(zip(DAILY_ROLLUP_KEY, key)), "ofertas": 0, "salario_suma": 0, "salario_n": 0}
+        cell["ofertas"] += 1
+        if salary_bucket(r["salario_numerico"]) is not None:
+            cell["salario_suma"] += r["salario_numerico"]
+            cell["salario_n"] += 1
+    return list(cells.values())
+
+
+def ensure_daily_rollup_table(conn) -> bool:
+    """Create empleo.ofertas_rollup_diario and its cell key if missing (see etl/25).
+    Returns True when the table is empty; fill it with refresh_daily_rollup."""
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS empleo.ofertas_rollup_diario (
+            dia          DATE,
+            municipio    TEXT,
+            sector       TEXT,
+            ofertas      INTEGER NOT NULL,
+            salario_suma BIGINT NOT NULL,
+            salario_n    INTEGER NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_rollup_diario_cell
+        ON empleo.ofertas_rollup_diario ({", ".join(DAILY_ROLLUP_KEY)}) NULLS NOT DISTINCT
+    """))
+    return _rollup_empty(conn, "empleo.ofertas_rollup_diario")
+
+
+def apply_daily_rollup_deltas(conn, deltas: list[dict]) -> int:
+    """Merge daily_rollup_deltas() rows into empleo.ofertas_rollup_diario
+    (counts and sums add). Returns the number of cells written."""
+    if not deltas:
+        return 0
+    conn.execute(text(f"""
+        INSERT INTO empleo.ofertas_rollup_diario AS r
+            ({", ".join(DAILY_ROLLUP_KEY)}, ofertas, salario_suma, salario_n)
+        VALUES (:dia, :municipio, :sector, :ofertas, :salario_suma, :salario_n)
+        ON CONFLICT ({", ".join(DAILY_ROLLUP_KEY)}) DO UPDATE SET
+            ofertas = r.ofertas + EXCLUDED.ofertas,
+            salario_suma = r.salario_suma + EXCLUDED.salario_suma,
+            salario_n = r.salario_n + EXCLUDED.salario_n
+    """), deltas)
+    return len(deltas)
+
+
+# Offers with their salary (positive values only) and its histogram bucket:
+# the SQL twin of salary_bucket() for the bulk rebuild
+_OFERTAS_BUCKETED = f"""(
+    SELECT DATE_TRUNC('month', fecha_publicacion)::date AS mes, fecha_publicacion AS dia,
+           municipio, dane_code, sector, fuente, empresa, nivel_educativo, nivel_experiencia,
+           CASE WHEN salario_numerico > 0 THEN salario_numerico END AS salario,
+           CASE WHEN salario_numerico > 0
+                THEN CEIL(LN(salario_numerico) / LN({SALARY_SKETCH_GAMMA}))::int END AS bucket
+    FROM empleo.ofertas_laborales
+)"""
+
+
+def refresh_monthly_rollup(conn) -> int:
+    """Rebuild empleo.ofertas_rollup_mensual from empleo.ofertas_laborales.
+    Returns the number of cells."""
+    ensure_rollup_table(conn)
+    conn.execute(text("DELETE FROM empleo.ofertas_rollup_mensual"))
+    key = ", ".join(ROLLUP_KEY)
+    return conn.execute(text(f"""
+        INSERT INTO empleo.ofertas_rollup_mensual ({ROLLUP_COLUMNS})
+        SELECT {key},
+               COUNT(*), SUM(salario), COUNT(salario), MIN(salario), MAX(salario),
+               ARRAY_REMOVE(ARRAY_AGG(DISTINCT empresa), NULL),
+               COALESCE(jsonb_object_agg(bucket, bucket_n) FILTER (WHERE bucket IS NOT NULL), '{{}}')
+        FROM (
+            SELECT o.*, COUNT(*) OVER (PARTITION BY {key}, bucket) AS bucket_n
+            FROM {_OFERTAS_BUCKETED} o
+        ) o
+        GROUP BY {key}
+    """)).rowcount
+
+
+def refresh_daily_rollup(conn) -> int:
+    """Rebuild empleo.ofertas_rollup_diario from empleo.ofertas_laborales.
+    Returns the number of cells."""
+    ensure_daily_rollup_table(conn)
+    conn.execute(text("DELETE FROM empleo.ofertas_rollup_diario"))
+    key = ", ".join(DAILY_ROLLUP_KEY)
+    return conn.execute(text(f"""
+        INSERT INTO empleo.ofertas_rollup_diario ({key}, ofertas, salario_suma, salario_n)
+        SELECT {key}, COUNT(*), COALESCE(SUM(salario), 0), COUNT(salario)
+        FROM {_OFERTAS_BUCKETED} o
+        GROUP BY {key}
+    """)).rowcount
+
+
+def refresh_salary_rollup(conn) -> int:
+    """Rebuild empleo.salarios_rollup from empleo.ofertas_laborales.
+    Returns the number of cells."""
+    ensure_salary_rollup_table(conn)
+    conn.execute(text("DELETE FROM empleo.salarios_rollup"))
+    key = ", ".join(SALARY_ROLLUP_KEY)
+    return conn.execute(text(f"""
+        INSERT INTO empleo.salarios_rollup ({key}, salario_n, salario_suma, salario_sketch)
+        SELECT {key}, COUNT(*), SUM(salario), jsonb_object_agg(bucket, bucket_n)
+        FROM (
+            SELECT o.*, COUNT(*) OVER (PARTITION BY {key}, bucket) AS bucket_n
+            FROM {_OFERTAS_BUCKETED} o
+            WHERE bucket IS NOT NULL
+        ) o
+        GROUP BY {key}
+    """)).rowcount
+
+
+def refresh_ofertas_rollup(conn) -> int:
+    """Rebuild empleo.ofertas_rollup_mensual, empleo.ofertas_rollup_diario and
+    empleo.salarios_rollup from scratch, in SQL.
+
+    Only needed after bulk loads and backfills (ETL 11, 13, 15, 16); the
+    incremental sync merges the deltas of its new offers instead. Each rollup
+    is one INSERT ... SELECT ... GROUP BY over empleo.ofertas_laborales, so no
+    offer leaves the database. A histogram is built by counting each offer's
+    (cell, bucket) with a window and folding the pairs with jsonb_object_agg.
+    Call it in the transaction that wrote the offers, before
+    bump_data_version. Returns the number of monthly rollup cells.
+    """
+    cells = refresh_monthly_rollup(conn)
+    refresh_daily_rollup(conn)
+    refresh_salary_rollup(conn)
+    return cells
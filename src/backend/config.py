@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -15,3 +16,41 @@ if ".neon.tech" in DATABASE_URL and "sslmode" not in DATABASE_URL:
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
 DANE_CODE = os.getenv("DANE_CODE", "05045")
 MUNICIPALITY_NAME = os.getenv("MUNICIPALITY_NAME", "Apartadó")
+
+# In-memory endpoint cache (per-namespace budgets, see services/cache.py)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_SWEEP_SECONDS = float(os.getenv("CACHE_SWEEP_SECONDS", "60"))
+# Shared tier behind the per-process cache: "memory" (none) or "sqlite" (node-local file)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "/tmp/observatorio_cache.sqlite3")
+# Data-version watermarks (meta.data_versions, bumped by the ETL scripts)
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "30"))
+# TTL for cache entries keyed by a known data version (they only go stale on ETL runs)
+CACHE_VERSIONED_TTL_SECONDS = float(os.getenv("CACHE_VERSIONED_TTL_SECONDS", "86400"))
+# Max seconds past TTL a stale dashboard aggregate may be served while it refreshes
+CACHE_MAX_STALE_SECONDS = float(os.getenv("CACHE_MAX_STALE_SECONDS", "21600"))
+# Max pooled connections a parallel query_dicts_batch may use at once (1 = always serial).
+# Keep it below the engine's pool_size + max_overflow.
+DB_BATCH_PARALLELISM = int(os.getenv("DB_BATCH_PARALLELISM", "3"))
+# Pre-populate dashboard caches for every municipality at startup
+CACHE_WARMUP = os.getenv("CACHE_WARMUP", "1") == "1"
+# Concurrent warm-up endpoint calls, one pooled connection each; kept below the
+# pool size so live requests get a connection
+CACHE_WARMUP_CONCURRENCY = int(os.getenv("CACHE_WARMUP_CONCURRENCY", "2"))
+# Aggregation engine for the empleo endpoints: "sql" (Postgres) or "numpy"
+# (in-memory columnar snapshot of empleo.ofertas_laborales, reloaded per data version)
+OLAP_ENGINE = os.getenv("OLAP_ENGINE", "sql")
+
+
+def _source_digest() -> str:
+    """Hash of the backend sources, so the fallback build id changes with the code."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(Path(__file__).parent.rglob("*.py")):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+# Identifies the deployed code in version ETags: a release that changes a
+# response shape must not be answered with 304 against the previous body
+APP_BUILD_ID = os.getenv("APP_BUILD_ID") or os.getenv("VERCEL_GIT_COMMIT_SHA") or _source_digest()
@@ -1,11 +1,27 @@
-import json
-import time
+import asyncio
+import inspect
+import logging
 import sqlite3
 import os
-from functools import wraps
-from sqlalchemy import create_engine, text
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+import anyio
+from sqlalchemy import create_engine, make_url, text
 from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_SWEEP_SECONDS,
+    CACHE_BACKEND, CACHE_SQLITE_PATH, DATA_VERSION_POLL_SECONDS, CACHE_VERSIONED_TTL_SECONDS,
+    DB_BATCH_PARALLELISM,
+)
+from .services.cache import CacheRegistry
+from .services.shared_cache import make_backend
+from .services.encoding import EncodedPayload, accept_encoding
+
+logger = logging.getLogger("observatorio.database")
 
 # Database Engine — supports both PostgreSQL (production) and SQLite (testing)
 _engine_kwargs = {"pool_pre_ping": True}
@@ -16,6 +32,36 @@ else:
 
 engine = create_engine(DATABASE_URL, **_engine_kwargs)
 
+
+def _make_async_engine():
+    """asyncpg engine for the async query helpers, or None (SQLite, or asyncpg
+    not installed) in which case they run the sync helpers in a worker thread."""
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() != "postgresql":
+        return None
+    try:
+        import asyncpg  # noqa: F401
+        from sqlalchemy.ext.asyncio import create_async_engine
+    except ImportError:
+        logger.info("asyncpg not installed; async queries fall back to the threadpool")
+        return None
+    # libpq-only options are not understood by asyncpg
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    connect_args = {"ssl": sslmode} if sslmode else {}
+    if url.host and "-pooler" in url.host:
+        # PgBouncer in transaction mode cannot keep prepared statements
+        connect_args["statement_cache_size"] = 0
+    return create_async_engine(
+        url.set(drivername="postgresql+asyncpg", query=query),
+        pool_pre_ping=True, pool_size=2, max_overflow=3, pool_recycle=120,
+        connect_args=connect_args,
+    )
+
+
+async_engine = _make_async_engine()
+
 # SQLite Connection (Employment Data)
 # Assuming it's in a known path relative to the project
 SQLITE_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../uraba_empleos/empleos_uraba.db"))
@@ -28,24 +74,131 @@ def get_sqlite_conn():
     conn.row_factory = sqlite3.Row
     return conn
 
-_cache = {}
+_cache = CacheRegistry(
+    CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_SWEEP_SECONDS,
+    backend=make_backend(CACHE_BACKEND, CACHE_SQLITE_PATH),
+)
+
+_data_versions = {"values": {}, "checked_at": 0.0}
+_data_versions_lock = threading.Lock()
+
+
+def get_data_versions() -> dict[str, int]:
+    """Current ETL data-version watermarks per schema (meta.data_versions).
+
+    Re-read at most every DATA_VERSION_POLL_SECONDS. Returns the last known
+    values (or {}) when the table is missing or the database is unreachable.
+    """
+    now = time.time()
+    if now - _data_versions["checked_at"] < DATA_VERSION_POLL_SECONDS:
+        return _data_versions["values"]
+    if not _data_versions_lock.acquire(blocking=False):
+        return _data_versions["values"]
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT schema_name, version FROM meta.data_versions")).fetchall()
+        _data_versions["values"] = {r[0]: int(r[1]) for r in rows}
+    except Exception as e:
+        logger.debug("Data versions unavailable: %s", e)
+    finally:
+        _data_versions["checked_at"] = now
+        _data_versions_lock.release()
+    return _data_versions["values"]
+
+
+async def aget_data_versions() -> dict[str, int]:
+    """``get_data_versions`` for coroutines: the periodic poll runs off the event loop."""
+    if time.time() - _data_versions["checked_at"] < DATA_VERSION_POLL_SECONDS:
+        return _data_versions["values"]
+    return await run_sync(get_data_versions)
+
+
+async def run_sync(fn, *args, **kwargs):
+    """Run blocking *fn* (sync DB work, CPU-heavy encoding) in a worker thread."""
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs))
+
 
-def cached(ttl_seconds: int = 600):
-    """Simple in-memory TTL cache decorator for endpoint functions."""
+def _namespace_name(fn) -> str:
+    return f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+
+def cached(ttl_seconds: int = 600, max_entries: int = None, max_bytes: int = None,
+           max_stale_seconds: float = 0, depends_on: tuple[str, ...] = (),
+           encoded: bool = False):
+    """In-memory TTL cache decorator for endpoint functions.
+
+    Each decorated function gets its own namespace in ``_cache``, bounded by
+    *max_entries* and *max_bytes* (defaults from config) with LRU eviction.
+    Concurrent misses on the same arguments are coalesced into one call.
+    With *max_stale_seconds* > 0 the entry is served stale for up to that
+    long after its TTL while it is recomputed in a background thread.
+
+    *depends_on* lists the DB schemas the result is computed from. Their
+    data versions become part of the key; while all of them are known the
+    entry lives for CACHE_VERSIONED_TTL_SECONDS, since an ETL run bumping a
+    version is what makes it obsolete.
+
+    With *encoded* the cache keeps the serialized JSON (plus gzip/brotli
+    variants) and, inside a request, returns it as a ready Response chosen by
+    Accept-Encoding. Direct calls still get the decoded value.
+
+    Coroutine functions are supported: the wrapper is then ``async`` too and
+    coalesces misses on the event loop instead of blocking a thread.
+    """
     def decorator(fn):
-        @wraps(fn)
-        def wrapper(*args, **kwargs):
-            # Create a cache key from function name and arguments
-            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
-            entry = _cache.get(key)
-            if entry and time.time() - entry[0] < ttl_seconds:
-                return entry[1]
-            result = fn(*args, **kwargs)
-            _cache[key] = (time.time(), result)
+        ns = _cache.namespace(_namespace_name(fn), max_entries, max_bytes)
+        state = {"tag": ()}
+
+        def resolve(args, kwargs, versions):
+            key = (args, tuple(sorted(kwargs.items())))
+            ttl = ttl_seconds
+            if depends_on:
+                tag = tuple(versions.get(schema) for schema in depends_on)
+                if None not in tag:
+                    ttl = max(ttl_seconds, CACHE_VERSIONED_TTL_SECONDS)
+                if tag != state["tag"]:
+                    state["tag"] = tag
+                    ns.purge_where(lambda k: k[0] != tag)
+                key = (tag,) + key
+            return key, ttl
+
+        def finish(result):
+            _cache.maybe_sweep()
+            if encoded:
+                accept = accept_encoding.get()
+                return result.decode() if accept is None else result.response(accept)
             return result
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                versions = await aget_data_versions() if depends_on else {}
+                key, ttl = resolve(args, kwargs, versions)
+
+                async def compute():
+                    value = await fn(*args, **kwargs)
+                    return await run_sync(EncodedPayload.encode, value) if encoded else value
+
+                return finish(await ns.aload(key, compute, ttl, max_stale_seconds))
+        else:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                versions = get_data_versions() if depends_on else {}
+                key, ttl = resolve(args, kwargs, versions)
+                if encoded:
+                    compute = lambda: EncodedPayload.encode(fn(*args, **kwargs))  # noqa: E731
+                else:
+                    compute = lambda: fn(*args, **kwargs)  # noqa: E731
+                return finish(ns.load(key, compute, ttl, max_stale_seconds))
+        wrapper.cache_namespace = ns
         return wrapper
     return decorator
 
+
+def cache_stats() -> dict:
+    """Per-endpoint cache counters, memory usage and current data versions."""
+    return {**_cache.stats(), "data_versions": get_data_versions()}
+
 SessionLocal = sessionmaker(bind=engine)
 
 def get_db():
@@ -65,7 +218,37 @@ def query_dicts(sql: str, params: dict = None) -> list[dict]:
         return []
 
 
-def query_dicts_batch(queries: list[tuple[str, dict | None]]) -> list[list[dict]]:
+def _query_dicts_isolated(sql: str, params: dict = None) -> list[dict]:
+    """``query_dicts`` on its own connection, with a failure returning []."""
+    try:
+        return query_dicts(sql, params)
+    except Exception as e:
+        logger.debug("Batch query failed: %s", e)
+        return []
+
+
+# Cap on a parallel batch's fan-out in the current context (see serial_batches);
+# None means DB_BATCH_PARALLELISM
+_batch_parallelism: ContextVar[int | None] = ContextVar("batch_parallelism", default=None)
+
+
+def _parallelism() -> int:
+    return _batch_parallelism.get() or DB_BATCH_PARALLELISM
+
+
+@contextmanager
+def serial_batches():
+    """Run parallel batches on a single connection within this context (and
+    the tasks and worker threads it spawns), so each caller holds at most one
+    pooled connection at a time."""
+    token = _batch_parallelism.set(1)
+    try:
+        yield
+    finally:
+        _batch_parallelism.reset(token)
+
+
+def query_dicts_batch(queries: list[tuple[str, dict | None]], parallel: bool = False) -> list[list[dict]]:
     """Execute multiple SQL queries on a single connection, returning a list of results.
 
     Each item in *queries* is a (sql, params) tuple.
@@ -74,7 +257,17 @@ def query_dicts_batch(queries: list[tuple[str, dict | None]]) -> list[list[dict]
     exhaust Vercel serverless connection limits.
     Uses SAVEPOINTs so a failed query doesn't abort the transaction for
     subsequent queries.
+
+    With *parallel*, independent queries are instead fanned out over up to
+    DB_BATCH_PARALLELISM pooled connections at once (1 under
+    ``serial_batches``); a failed query still yields [] without affecting
+    the others.
     """
+    workers = min(_parallelism(), len(queries))
+    if parallel and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-batch") as pool:
+            return list(pool.map(lambda q: _query_dicts_isolated(*q), queries))
+
     results: list[list[dict]] = []
     with engine.connect() as conn:
         for i, (sql, params) in enumerate(queries):
@@ -95,10 +288,8 @@ def query_dicts_batch(queries: list[tuple[str, dict | None]]) -> list[list[dict]
                     pass
     return results
 
-def query_geojson(sql: str, params: dict = None, geom_col: str = "geom") -> dict:
-    """Execute SQL and return a GeoJSON FeatureCollection built server-side
-    by PostGIS. *geom_col* must match the geometry column name in the query."""
-    wrapped = f"""
+def _geojson_sql(sql: str, geom_col: str) -> str:
+    return f"""
         SELECT json_build_object(
             'type', 'FeatureCollection',
             'features', COALESCE(json_agg(
@@ -111,6 +302,75 @@ def query_geojson(sql: str, params: dict = None, geom_col: str = "geom") -> dict
         ) AS fc
         FROM ({sql}) sub
     """
+
+
+def query_geojson(sql: str, params: dict = None, geom_col: str = "geom") -> dict:
+    """Execute SQL and return a GeoJSON FeatureCollection built server-side
+    by PostGIS. *geom_col* must match the geometry column name in the query."""
     with engine.connect() as conn:
-        row = conn.execute(text(wrapped), params or {}).fetchone()
+        row = conn.execute(text(_geojson_sql(sql, geom_col)), params or {}).fetchone()
+    return row[0] if row and row[0] else {"type": "FeatureCollection", "features": []}
+
+
+# ── Async variants ──────────────────────────────────────────────
+# Same contracts as the sync helpers above. With asyncpg the event loop
+# multiplexes queries directly; otherwise the sync helper runs in a thread.
+
+async def aquery_dicts(sql: str, params: dict = None) -> list[dict]:
+    """Async ``query_dicts``."""
+    if async_engine is None:
+        return await run_sync(query_dicts, sql, params)
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(sql), params or {})
+        if result.returns_rows:
+            columns = list(result.keys())
+            return [dict(zip(columns, row)) for row in result.fetchall()]
+        return []
+
+
+async def aquery_dicts_batch(queries: list[tuple[str, dict | None]], parallel: bool = False) -> list[list[dict]]:
+    """Async ``query_dicts_batch`` (one connection, SAVEPOINT per query, or
+    fanned out over up to DB_BATCH_PARALLELISM connections with *parallel*)."""
+    if async_engine is None:
+        return await run_sync(query_dicts_batch, queries, parallel)
+    parallelism = _parallelism()
+    if parallel and min(parallelism, len(queries)) > 1:
+        budget = asyncio.Semaphore(parallelism)
+
+        async def run_one(sql, params):
+            async with budget:
+                try:
+                    return await aquery_dicts(sql, params)
+                except Exception as e:
+                    logger.debug("Batch query failed: %s", e)
+                    return []
+
+        return list(await asyncio.gather(*(run_one(sql, params) for sql, params in queries)))
+    results: list[list[dict]] = []
+    async with async_engine.connect() as conn:
+        for i, (sql, params) in enumerate(queries):
+            try:
+                await conn.execute(text(f"SAVEPOINT sp_{i}"))
+                result = await conn.execute(text(sql), params or {})
+                if result.returns_rows:
+                    columns = list(result.keys())
+                    results.append([dict(zip(columns, row)) for row in result.fetchall()])
+                else:
+                    results.append([])
+                await conn.execute(text(f"RELEASE SAVEPOINT sp_{i}"))
+            except Exception:
+                results.append([])
+                try:
+                    await conn.execute(text(f"ROLLBACK TO SAVEPOINT sp_{i}"))
+                except Exception:
+                    pass
+    return results
+
+
+async def aquery_geojson(sql: str, params: dict = None, geom_col: str = "geom") -> dict:
+    """Async ``query_geojson``."""
+    if async_engine is None:
+        return await run_sync(query_geojson, sql, params, geom_col)
+    async with async_engine.connect() as conn:
+        row = (await conn.execute(text(_geojson_sql(sql, geom_col)), params or {})).fetchone()
     return row[0] if row and row[0] else {"type": "FeatureCollection", "features": []}
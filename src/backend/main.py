@@ -3,13 +3,19 @@ Observatorio de Ciudades — Urabá
 API Backend (FastAPI)
 """
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.exc import SQLAlchemyError
-from .routers import layers, geo, indicators, crossvar, stats, empleo, analytics
+from .routers import layers, geo, indicators, crossvar, stats, empleo, analytics, cache
 from .middleware.rate_limit import RateLimitMiddleware
+from .middleware.conditional import ConditionalGetMiddleware
+from .middleware.encoding import AcceptEncodingMiddleware
+from .database import aget_data_versions
+from .config import APP_BUILD_ID, CACHE_WARMUP, CACHE_WARMUP_CONCURRENCY
+from .services import warmup
 from .monitoring import setup_logging, init_sentry
 
 logger = setup_logging()
@@ -24,8 +30,22 @@ TAGS_METADATA = [
     {"name": "Estadísticas", "description": "Resumen ejecutivo y catálogo de datos"},
     {"name": "Empleo", "description": "Mercado laboral y vacantes (Uraba Empleos)"},
     {"name": "Analytics", "description": "Inteligencia territorial, gaps y rankings regionales"},
+    {"name": "Cache", "description": "Estado y contadores de la caché de endpoints"},
 ]
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = None
+    if CACHE_WARMUP:
+        task = warmup.start_warmup(CACHE_WARMUP_CONCURRENCY)
+    else:
+        warmup.mark_disabled()
+    yield
+    if task is not None:
+        task.cancel()
+
+
 app = FastAPI(
     title="Observatorio Laboral de Urabá",
     description=(
@@ -54,6 +74,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_tags=TAGS_METADATA,
+    lifespan=lifespan,
 )
 
 ALLOWED_ORIGINS = os.getenv(
@@ -83,6 +104,18 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+app.add_middleware(AcceptEncodingMiddleware)
+# GeoJSON payloads only change when the ETL bumps their schema's data version
+app.add_middleware(
+    ConditionalGetMiddleware,
+    versioned_paths={
+        "/api/geo": ("cartografia",),
+        "/api/geo/places": ("servicios",),
+        "/api/layers": ("cartografia", "servicios"),
+    },
+    versions=aget_data_versions,
+    build_id=APP_BUILD_ID,
+)
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(
     RateLimitMiddleware,
@@ -97,6 +130,7 @@ app.include_router(crossvar.router)
 app.include_router(stats.router)
 app.include_router(empleo.router)
 app.include_router(analytics.router)
+app.include_router(cache.router)
 
 
 @app.exception_handler(SQLAlchemyError)
@@ -0,0 +1,100 @@
+"""
+Conditional GET middleware (ETag / If-None-Match / 304).
+
+Successful JSON GET responses get a strong ETag and ``Cache-Control:
+no-cache`` so browsers revalidate instead of re-downloading. Two kinds of tag:
+
+- Version tags, for paths whose data is only rewritten by the ETL (GeoJSON
+  layers, manzanas, places). The tag is derived from the request URL, the
+  schema data versions and the app build id, so a matching ``If-None-Match`` is answered with 304
+  before the endpoint runs: no query, no serialization, no body.
+- Content tags, for everything else: a hash of the response body. The
+  endpoint still runs (usually from cache), but a match sends an empty 304.
+"""
+import hashlib
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+def _etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in candidates
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """
+    Add ETags to JSON GET responses and answer matching revalidations with 304.
+
+    Args:
+        app: The ASGI app.
+        versioned_paths: Path prefix -> schemas whose data versions identify
+            the response (the longest matching prefix wins).
+        versions: Coroutine function returning the current ``{schema: version}``
+            map (it must not block the event loop).
+        build_id: Identifies the deployed code, so a release changes every
+            version tag even when the data did not.
+    """
+
+    def __init__(self, app, versioned_paths: dict[str, tuple[str, ...]] = None, versions=None,
+                 build_id: str = ""):
+        super().__init__(app)
+        self.versioned_paths = sorted((versioned_paths or {}).items(), key=lambda kv: -len(kv[0]))
+        self.versions = versions
+        self.build_id = build_id
+
+    async def _version_etag(self, request: Request) -> str | None:
+        if self.versions is None:
+            return None
+        path = request.url.path
+        schemas = next((s for prefix, s in self.versioned_paths if path.startswith(prefix)), None)
+        if not schemas:
+            return None
+        current = await self.versions()
+        if not all(s in current for s in schemas):
+            return None
+        query = sorted(request.query_params.multi_items())
+        # Cached bodies may be served pre-compressed; each coding is its own representation
+        coding = request.headers.get("accept-encoding", "")
+        return _etag(self.build_id, path, query, coding, *(f"{s}={current[s]}" for s in schemas))
+
+    @staticmethod
+    def _not_modified(etag: str) -> Response:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET":
+            return await call_next(request)
+
+        if_none_match = request.headers.get("if-none-match")
+        etag = await self._version_etag(request)
+        if etag and _matches(if_none_match, etag):
+            return self._not_modified(etag)
+
+        response = await call_next(request)
+        if response.status_code != 200 or "etag" in response.headers:
+            return response
+        if not response.headers.get("content-type", "").startswith(("application/json", "application/geo+json")):
+            return response
+
+        if etag is None:
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            etag = _etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+            headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+            response = Response(body, status_code=200, headers=headers, media_type=response.media_type)
+            if _matches(if_none_match, etag):
+                return self._not_modified(etag)
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return response
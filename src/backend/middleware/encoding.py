@@ -0,0 +1,24 @@
+"""
+Expose the request's Accept-Encoding to cached endpoints.
+
+Pure ASGI middleware (no body buffering) that sets the ``accept_encoding``
+context variable, so ``@cached(encoded=True)`` endpoints can pick the
+pre-compressed variant of their cached payload.
+"""
+from ..services.encoding import accept_encoding
+
+
+class AcceptEncodingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = next((v for k, v in scope["headers"] if k == b"accept-encoding"), b"")
+        token = accept_encoding.set(value.decode("latin-1"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            accept_encoding.reset(token)
@@ -1,125 +1,99 @@
 """
 Módulo de Analítica Avanzada — Inteligencia Territorial y Laboral para Urabá
 """
+from datetime import date, timedelta
+
+import numpy as np
 from fastapi import APIRouter, Query, HTTPException
-from ..database import cached, query_dicts, query_dicts_batch
+from ..config import CACHE_MAX_STALE_SECONDS
+from ..database import cached, aquery_dicts, aquery_dicts_batch, run_sync
+from ..services.cadenas import CADENA_LINKS, CADENA_SECTORES, CADENAS, aggregate_cadenas
+from ..services.clustering import DEFAULT_FEATURES, FEATURES, kmeans, standardize
+from ..services.olap import aget_snapshot, round_half_up
+from ..services.rollup import ofertas_cells, rollup_available
+from ..services.sketches import salary_percentiles
+from ..services.terridata import aget_cube
+from ..services.timeseries import aget_series, growth_pct, seasonal_indices
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
 
 @router.get("/gaps")
-@cached(ttl_seconds=3600)
-def get_gaps(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("socioeconomico",))
+async def get_gaps(
     dane_code: str = Query("05045", description="Código DANE del municipio"),
     indicador: str = Query("Población total", description="Indicador a comparar"),
 ):
     """Brecha entre un municipio y el promedio regional."""
-    sql = """
-        WITH regional_avg AS (
-            SELECT indicador, AVG(dato_numerico) as avg_val, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :indicador
-            GROUP BY indicador, anio
-            ORDER BY anio DESC
-            LIMIT 1
-        ),
-        muni_val AS (
-            SELECT entidad, dato_numerico as muni_val, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :indicador AND dane_code = :dane_code
-            ORDER BY anio DESC
-            LIMIT 1
-        )
-        SELECT
-            m.entidad as municipio,
-            m.muni_val as valor_municipio,
-            r.avg_val as promedio_regional,
-            (m.muni_val - r.avg_val) as brecha_absoluta,
-            CASE WHEN r.avg_val != 0 THEN ((m.muni_val - r.avg_val) / r.avg_val) * 100 ELSE 0 END as brecha_porcentual,
-            m.anio
-        FROM muni_val m, regional_avg r
-    """
-    results = query_dicts(sql, {"dane_code": dane_code, "indicador": indicador})
-    if not results:
+    cube = await aget_cube()
+    valor, anio = cube.latest(indicador, dane_code)
+    promedio, _ = cube.regional_average(indicador)
+    if valor is None or promedio is None:
         raise HTTPException(status_code=404, detail="No se encontraron datos")
-    return results[0]
+    return {
+        "municipio": cube.entity(dane_code),
+        "valor_municipio": valor,
+        "promedio_regional": promedio,
+        "brecha_absoluta": valor - promedio,
+        "brecha_porcentual": (valor - promedio) / promedio * 100 if promedio != 0 else 0,
+        "anio": anio,
+    }
 
 
 @router.get("/ranking")
-@cached(ttl_seconds=3600)
-def get_ranking(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("socioeconomico",))
+async def get_ranking(
     indicador: str = Query("Población total"),
     order: str = Query("desc", enum=["asc", "desc"]),
 ):
     """Ranking de municipios por indicador TerriData."""
-    safe_order = "DESC" if order == "desc" else "ASC"
-    sql = f"""
-        WITH latest_data AS (
-            SELECT DISTINCT ON (entidad)
-                entidad as municipio,
-                dane_code,
-                dato_numerico as valor,
-                anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :indicador
-            ORDER BY entidad, anio DESC
-        )
-        SELECT * FROM latest_data
-        ORDER BY valor {safe_order}
-    """
-    return query_dicts(sql, {"indicador": indicador})
+    rows = (await aget_cube()).column(indicador)
+    valued = sorted((r for r in rows if r["valor"] is not None), key=lambda r: r["valor"], reverse=order == "desc")
+    nulls = [r for r in rows if r["valor"] is None]
+    # NULLs first in descending order and last in ascending, as ORDER BY does
+    return nulls + valued if order == "desc" else valued + nulls
 
 
 @router.get("/laboral/termometro")
-@cached(ttl_seconds=1800)
-def get_termometro_laboral():
+@cached(ttl_seconds=1800, max_stale_seconds=CACHE_MAX_STALE_SECONDS)
+async def get_termometro_laboral():
     """Termómetro Laboral: Intensidad de ofertas recientes por municipio."""
-    sql = """
-        SELECT
-            municipio,
-            COUNT(CASE WHEN fecha_publicacion >= CURRENT_DATE - INTERVAL '7 days' THEN 1 END) as ultimos_7_dias,
-            COUNT(CASE WHEN fecha_publicacion < CURRENT_DATE - INTERVAL '7 days'
-                       AND fecha_publicacion >= CURRENT_DATE - INTERVAL '14 days' THEN 1 END) as anteriores_7_dias,
-            COUNT(CASE WHEN fecha_publicacion >= CURRENT_DATE - INTERVAL '30 days' THEN 1 END) as ultimos_30_dias,
-            COUNT(*) as total
-        FROM empleo.ofertas_laborales
-        GROUP BY municipio
-        ORDER BY total DESC
-    """
-    rows = query_dicts(sql)
-    for r in rows:
-        prev = r.get("anteriores_7_dias", 0) or 1
-        r["tendencia"] = round(((r.get("ultimos_7_dias", 0) - r.get("anteriores_7_dias", 0)) / prev) * 100, 1)
+    series = await aget_series()
+    today = date.today()
+    last_7 = series.window(today - timedelta(days=7))
+    prev_7 = series.window(today - timedelta(days=14), today - timedelta(days=7))
+    last_30 = series.window(today - timedelta(days=30))
+    totals = series.totals()
+    rows = []
+    for i in np.argsort(-totals, kind="stable"):
+        ultimos, anteriores = int(last_7[i]), int(prev_7[i])
+        rows.append({
+            "municipio": series.municipios[i],
+            "ultimos_7_dias": ultimos,
+            "anteriores_7_dias": anteriores,
+            "ultimos_30_dias": int(last_30[i]),
+            "total": int(totals[i]),
+            "tendencia": round((ultimos - anteriores) / (anteriores or 1) * 100, 1),
+        })
     return rows
 
 
 @router.get("/laboral/oferta-demanda")
-@cached(ttl_seconds=3600)
-def get_oferta_demanda():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo", "socioeconomico"))
+async def get_oferta_demanda():
     """Oferta laboral vs demanda potencial (población)."""
-    ofertas, poblacion = query_dicts_batch([
-        ("""
-            SELECT municipio, dane_code, COUNT(*) as vacantes
-            FROM empleo.ofertas_laborales
-            WHERE dane_code IS NOT NULL
-            GROUP BY municipio, dane_code
-            ORDER BY vacantes DESC
-        """, None),
-        ("""
-            SELECT DISTINCT ON (dane_code)
-                dane_code, entidad as municipio, dato_numerico as poblacion, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :ind
-            ORDER BY dane_code, anio DESC
-        """, {"ind": "Población total"}),
-    ])
-
-    # Build lookup
-    pop_map = {p["dane_code"]: p for p in poblacion}
+    ofertas = await aquery_dicts("""
+        SELECT municipio, dane_code, COUNT(*) as vacantes
+        FROM empleo.ofertas_laborales
+        WHERE dane_code IS NOT NULL
+        GROUP BY municipio, dane_code
+        ORDER BY vacantes DESC
+    """)
+    pop_map = (await aget_cube()).by_dane_code("Población total")
     result = []
     for o in ofertas:
         p = pop_map.get(o["dane_code"])
-        pob = p["poblacion"] if p else 0
+        pob = p["valor"] if p else 0
         result.append({
             "municipio": o["municipio"],
             "dane_code": o["dane_code"],
@@ -132,8 +106,8 @@ def get_oferta_demanda():
 
 
 @router.get("/laboral/brecha-skills")
-@cached(ttl_seconds=3600)
-def get_brecha_skills(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo", "socioeconomico"))
+async def get_brecha_skills(dane_code: str = Query(None)):
     """Brecha de habilidades: skills demandadas vs formación disponible en la región."""
     conditions = ["1=1"]
     params = {}
@@ -143,16 +117,15 @@ def get_brecha_skills(dane_code: str = Query(None)):
 
     where = " AND ".join(conditions)
 
-    # Run all 3 queries on a single connection
-    skills, sectores, edu = query_dicts_batch([
-        (f"""
-            SELECT skill, COUNT(*) as demanda
-            FROM empleo.ofertas_laborales, UNNEST(skills) AS skill
-            WHERE {where}
-            GROUP BY skill
-            ORDER BY demanda DESC
-            LIMIT 20
-        """, params),
+    skills_query = (f"""
+        SELECT skill, COUNT(*) as demanda
+        FROM empleo.ofertas_laborales, UNNEST(skills) AS skill
+        WHERE {where}
+        GROUP BY skill
+        ORDER BY demanda DESC
+        LIMIT 20
+    """, params)
+    other_queries = [
         (f"""
             SELECT sector, COUNT(*) as ofertas,
                    COUNT(DISTINCT empresa) as empresas
@@ -169,7 +142,15 @@ def get_brecha_skills(dane_code: str = Query(None)):
             FROM socioeconomico.icfes
             WHERE punt_global IS NOT NULL
         """, None),
-    ])
+    ]
+    # Independent aggregations: fan out over pooled connections; skill demand
+    # comes from the snapshot's posting lists when the numpy engine is on
+    snap = await aget_snapshot()
+    if snap is None:
+        skills, sectores, edu = await aquery_dicts_batch([skills_query, *other_queries], parallel=True)
+    else:
+        skills = [{"skill": s, "demanda": c} for s, c in snap.skill_counts(snap.where(dane_code=dane_code))[:20]]
+        sectores, edu = await aquery_dicts_batch(other_queries, parallel=True)
     edu_row = edu[0] if edu else {}
 
     total_demanda = sum(s["demanda"] for s in skills)
@@ -217,51 +198,38 @@ def _generate_skill_insights(skills, sectores):
 
 
 @router.get("/laboral/dinamismo")
-@cached(ttl_seconds=3600)
-def get_dinamismo_laboral():
-    """Índice de dinamismo laboral: velocidad de publicación de nuevas ofertas."""
-    sql = """
-        WITH monthly AS (
-            SELECT
-                TO_CHAR(fecha_publicacion, 'YYYY-MM') as mes,
-                COUNT(*) as ofertas,
-                COUNT(DISTINCT empresa) as empresas,
-                COUNT(DISTINCT municipio) as municipios,
-                COUNT(DISTINCT sector) as sectores
-            FROM empleo.ofertas_laborales
-            WHERE fecha_publicacion IS NOT NULL
-            GROUP BY TO_CHAR(fecha_publicacion, 'YYYY-MM')
-            ORDER BY mes
-        ),
-        with_growth AS (
-            SELECT
-                mes,
-                ofertas,
-                empresas,
-                municipios,
-                sectores,
-                LAG(ofertas) OVER (ORDER BY mes) as prev_ofertas
-            FROM monthly
-        )
-        SELECT
-            mes,
-            ofertas,
-            empresas,
-            municipios,
-            sectores,
-            CASE WHEN prev_ofertas > 0
-                THEN ROUND(((ofertas - prev_ofertas)::numeric / prev_ofertas) * 100, 1)
-                ELSE NULL
-            END as crecimiento_pct
-        FROM with_growth
-        ORDER BY mes
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_dinamismo_laboral():
+    """Índice de dinamismo laboral: velocidad de publicación de nuevas ofertas.
+
+    Lee la serie diaria en memoria (services.timeseries), agregada por mes.
     """
-    return query_dicts(sql)
+    series = await aget_series()
+    cube = series.monthly()
+    ofertas = cube.sum(axis=(0, 1))
+    named_munis = np.array([m is not None for m in series.municipios], dtype=bool)
+    named_sectores = np.array([s is not None for s in series.sectores], dtype=bool)
+    municipios = (cube.sum(axis=1)[named_munis] > 0).sum(axis=0)
+    sectores = (cube.sum(axis=0)[named_sectores] > 0).sum(axis=0)
+    # Months without offers are skipped; growth is against the previous month listed
+    present = np.flatnonzero(ofertas)
+    crecimiento = growth_pct(ofertas[present])
+    return [
+        {
+            "mes": str(series.months[i]),
+            "ofertas": int(ofertas[i]),
+            "empresas": int(series.empresas_mes[i]),
+            "municipios": int(municipios[i]),
+            "sectores": int(sectores[i]),
+            "crecimiento_pct": None if np.isnan(g) else round(float(g), 1),
+        }
+        for i, g in zip(present, crecimiento)
+    ]
 
 
 @router.get("/laboral/concentracion")
-@cached(ttl_seconds=3600)
-def get_concentracion_laboral():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_concentracion_laboral():
     """Concentración laboral: distribución geográfica de la actividad económica."""
     sql = """
         WITH muni_stats AS (
@@ -290,7 +258,7 @@ def get_concentracion_laboral():
         LEFT JOIN cartografia.limite_municipal lm ON m.dane_code = lm.dane_code
         ORDER BY ofertas DESC
     """
-    rows = query_dicts(sql)
+    rows = await aquery_dicts(sql)
     for r in rows:
         if r.get("salario_promedio"):
             r["salario_promedio"] = int(r["salario_promedio"])
@@ -298,17 +266,17 @@ def get_concentracion_laboral():
 
 
 @router.get("/laboral/sector-municipio")
-@cached(ttl_seconds=3600)
-def get_sector_municipio_matrix():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",), encoded=True)
+async def get_sector_municipio_matrix():
     """Matriz sector × municipio: cuántas ofertas hay por sector en cada municipio."""
-    sql = """
-        SELECT sector, municipio, COUNT(*) as ofertas
-        FROM empleo.ofertas_laborales
+    sql = f"""
+        SELECT sector, municipio, SUM(ofertas)::int as ofertas
+        FROM {ofertas_cells(await run_sync(rollup_available))}
         WHERE sector != 'Otro'
         GROUP BY sector, municipio
         ORDER BY sector, ofertas DESC
     """
-    rows = query_dicts(sql)
+    rows = await aquery_dicts(sql)
 
     # Pivot to matrix format
     sectors = {}
@@ -323,150 +291,92 @@ def get_sector_municipio_matrix():
 
 
 @router.get("/laboral/cadenas-productivas")
-@cached(ttl_seconds=3600)
-def get_cadenas_productivas():
-    """Análisis por cadenas productivas de Urabá: ofertas, empresas y salario por cadena."""
-    CADENAS = {
-        "Banano y Plátano": {
-            "sectores": ["Agroindustria"],
-            "skills": ["Cosecha", "Empaque", "Fitosanidad", "Riego y drenaje",
-                        "Certificaciones agrícolas", "Certificacion organica",
-                        "Cultivo banano/plátano", "Agricultura", "BPM", "HACCP",
-                        "Cadena de frio"],
-        },
-        "Ganadería y Lácteos": {
-            "sectores": ["Agroindustria", "Mantenimiento"],
-            "skills": ["Ganadería", "Veterinaria", "Porcicultura", "Acuicultura"],
-        },
-        "Turismo y Gastronomía": {
-            "sectores": ["Turismo y Gastronomía"],
-            "skills": ["Hotelería", "Guía turístico", "Servicio de habitación",
-                        "Barista/Bartender", "Atención al cliente"],
-        },
-        "Comercio y Logística Portuaria": {
-            "sectores": ["Transporte y Logística", "Comercio y Ventas"],
-            "skills": ["Logística", "Montacargas", "Comercio exterior", "Cadena de frio",
-                        "Aduanas", "Contenedores", "Estiba", "Zona franca",
-                        "Logística marítima"],
-        },
-        "Construcción e Infraestructura": {
-            "sectores": ["Construcción", "Mantenimiento"],
-            "skills": ["AutoCAD", "Soldadura", "Electricidad", "Mecánica",
-                        "Construcción", "Maquinaria pesada", "SST"],
-        },
-        "Servicios y Administrativo": {
-            "sectores": ["Administrativo", "Contabilidad y Finanzas", "Salud",
-                         "Educación", "Recursos Humanos", "Jurídico"],
-            "skills": ["Excel", "SAP", "Contabilidad", "Software contable",
-                        "Facturación", "Inventarios", "Power BI"],
-        },
-    }
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_cadenas_productivas():
+    """Análisis por cadenas productivas de Urabá: ofertas, empresas y salario por cadena.
 
-    # Fetch both queries on a single connection
-    sector_data, skills_data = query_dicts_batch([
+    Las cadenas se definen en services/cadenas.py; las empresas son
+    empleadores distintos por cadena.
+    """
+    snap = await aget_snapshot()
+    if snap is not None:
+        mask = snap.isin("sector", CADENA_SECTORES)
+        cells = snap.cells(["sector", "municipio"], mask)
+        sector_skills = [
+            {"sector": sector, "skill": skill, "demanda": demanda}
+            for sector, counts in snap.skill_counts_by("sector", mask).items()
+            for skill, demanda in counts
+        ]
+        empresas = {cadena: snap.distinct("empresa", snap.isin("sector", cfg["sectores"]))
+                    for cadena, cfg in CADENAS.items()}
+        return aggregate_cadenas(cells, sector_skills, empresas)
+
+    params = {"sectores": CADENA_SECTORES}
+    # Independent aggregations: fan out over pooled connections
+    cells, sector_skills, empresas = await aquery_dicts_batch([
         ("""
             SELECT sector, municipio, COUNT(*) as ofertas,
-                   COUNT(DISTINCT empresa) as empresas,
-                   ROUND(AVG(salario_numerico)) as salario_promedio
+                   SUM(salario_numerico) as salario_suma,
+                   COUNT(salario_numerico) as salario_n
             FROM empleo.ofertas_laborales
-            WHERE sector IS NOT NULL
+            WHERE sector = ANY(:sectores)
             GROUP BY sector, municipio
-        """, None),
+        """, params),
         ("""
             SELECT sector, skill, COUNT(*) as demanda
             FROM empleo.ofertas_laborales, UNNEST(skills) AS skill
-            WHERE sector IS NOT NULL
+            WHERE sector = ANY(:sectores)
             GROUP BY sector, skill
-            ORDER BY sector, demanda DESC
-        """, None),
-    ])
-
-    # Build sector→skills lookup
-    sector_skills = {}
-    for row in skills_data:
-        s = row["sector"]
-        if s not in sector_skills:
-            sector_skills[s] = []
-        sector_skills[s].append({"skill": row["skill"], "demanda": row["demanda"]})
-
-    result = []
-    for cadena_name, cfg in CADENAS.items():
-        cadena_ofertas = 0
-        cadena_empresas = set()
-        salarios = []
-        municipios = {}
-        matched_skills = {}
-
-        for row in sector_data:
-            if row["sector"] in cfg["sectores"]:
-                cadena_ofertas += row["ofertas"]
-                # Approximate unique empresas by municipality
-                cadena_empresas.add(f"{row.get('municipio', '')}_{row['empresas']}")
-                if row.get("salario_promedio"):
-                    salarios.append((row["salario_promedio"], row["ofertas"]))
-                muni = row.get("municipio", "Otro")
-                if muni not in municipios:
-                    municipios[muni] = {"municipio": muni, "ofertas": 0}
-                municipios[muni]["ofertas"] += row["ofertas"]
-
-        # Aggregate skills relevant to this chain
-        for sector in cfg["sectores"]:
-            for sk in sector_skills.get(sector, []):
-                if sk["skill"] in cfg["skills"] or not cfg["skills"]:
-                    sname = sk["skill"]
-                    if sname not in matched_skills:
-                        matched_skills[sname] = 0
-                    matched_skills[sname] += sk["demanda"]
-
-        # Weighted salary average
-        sal_prom = None
-        if salarios:
-            total_w = sum(w for _, w in salarios)
-            sal_prom = int(sum(s * w for s, w in salarios) / total_w) if total_w > 0 else None
-
-        empresas_total = sum(row["empresas"] for row in sector_data if row["sector"] in cfg["sectores"])
-
-        top_skills = sorted(matched_skills.items(), key=lambda x: x[1], reverse=True)[:10]
-        top_municipios = sorted(municipios.values(), key=lambda x: x["ofertas"], reverse=True)
-
-        result.append({
-            "cadena": cadena_name,
-            "sectores": cfg["sectores"],
-            "ofertas": cadena_ofertas,
-            "empresas": empresas_total,
-            "salario_promedio": sal_prom,
-            "top_skills": [{"skill": s, "demanda": d} for s, d in top_skills],
-            "municipios": top_municipios,
-        })
-
-    return sorted(result, key=lambda x: x["ofertas"], reverse=True)
+        """, params),
+        ("""
+            SELECT l.cadena, COUNT(DISTINCT o.empresa) as empresas
+            FROM empleo.ofertas_laborales o
+            JOIN UNNEST(CAST(:link_sectores AS TEXT[]), CAST(:link_cadenas AS TEXT[])) AS l(sector, cadena)
+              ON o.sector = l.sector
+            GROUP BY l.cadena
+        """, CADENA_LINKS),
+    ], parallel=True)
+    return aggregate_cadenas(cells, sector_skills, {r["cadena"]: r["empresas"] for r in empresas})
 
 
 @router.get("/laboral/estacionalidad")
-@cached(ttl_seconds=3600)
-def get_estacionalidad_laboral():
-    """Perfil estacional: ofertas y salario promedio por mes del año (1-12) y sector."""
-    # Run both queries on a single connection
-    rows, general = query_dicts_batch([
-        ("""
-            SELECT EXTRACT(MONTH FROM fecha_publicacion)::int as mes,
-                   sector, COUNT(*) as ofertas,
-                   ROUND(AVG(salario_numerico)) as salario_promedio
-            FROM empleo.ofertas_laborales
-            WHERE fecha_publicacion IS NOT NULL
-            GROUP BY mes, sector
-            ORDER BY mes, ofertas DESC
-        """, None),
-        ("""
-            SELECT EXTRACT(MONTH FROM fecha_publicacion)::int as mes,
-                   COUNT(*) as ofertas,
-                   ROUND(AVG(salario_numerico)) as salario_promedio
-            FROM empleo.ofertas_laborales
-            WHERE fecha_publicacion IS NOT NULL
-            GROUP BY mes
-            ORDER BY mes
-        """, None),
-    ])
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_estacionalidad_laboral():
+    """Perfil estacional: ofertas y salario promedio por mes del año (1-12) y sector.
+
+    `indice_estacional` es el índice de una descomposición multiplicativa
+    (serie mensual / tendencia de media móvil 2×12, promedio por mes del año);
+    con menos de dos años de datos, la razón contra el promedio mensual.
+    """
+    series = await aget_series()
+    monthly = series.monthly()
+    month_of_year = series.month_of_year()
+    # sector × calendar month totals
+    by_sector = np.zeros((len(series.sectores), 12), dtype=np.int64)
+    salario_suma = np.zeros((len(series.sectores), 12))
+    salario_n = np.zeros((len(series.sectores), 12), dtype=np.int64)
+    np.add.at(by_sector.T, month_of_year - 1, monthly.sum(axis=0).T)
+    np.add.at(salario_suma.T, month_of_year - 1, series.salario_suma.sum(axis=0).T)
+    np.add.at(salario_n.T, month_of_year - 1, series.salario_n.sum(axis=0).T)
+    indices = seasonal_indices(monthly.sum(axis=(0, 1)), month_of_year)
+
+    def salario(suma, n):
+        return round_half_up(suma / n) if n else None
+
+    rows = [
+        {"mes": mes + 1, "sector": sector, "ofertas": int(by_sector[i, mes]),
+         "salario_promedio": salario(salario_suma[i, mes], salario_n[i, mes])}
+        for mes in range(12)
+        for i, sector in enumerate(series.sectores)
+        if by_sector[i, mes]
+    ]
+    general = [
+        {"mes": mes + 1, "ofertas": int(by_sector[:, mes].sum()),
+         "salario_promedio": salario(salario_suma[:, mes].sum(), salario_n[:, mes].sum()),
+         "indice": None if np.isnan(indices[mes]) else float(indices[mes])}
+        for mes in range(12)
+        if by_sector[:, mes].any()
+    ]
 
     # Compute average to detect peaks and valleys
     total_ofertas = sum(r["ofertas"] for r in general)
@@ -481,13 +391,15 @@ def get_estacionalidad_laboral():
     for r in general:
         ofertas = r["ofertas"]
         ratio = ofertas / avg_mensual if avg_mensual > 0 else 1
-        clasificacion = "pico" if ratio > 1.2 else ("valle" if ratio < 0.8 else "normal")
+        indice = r["indice"] if r["indice"] is not None else ratio
+        clasificacion = "pico" if indice > 1.2 else ("valle" if indice < 0.8 else "normal")
         perfil_general.append({
             "mes": r["mes"],
             "mes_nombre": MES_NOMBRES.get(r["mes"], str(r["mes"])),
             "ofertas": ofertas,
             "salario_promedio": int(r["salario_promedio"]) if r.get("salario_promedio") else None,
             "ratio": round(ratio, 2),
+            "indice_estacional": round(indice, 2),
             "clasificacion": clasificacion,
         })
 
@@ -520,11 +432,11 @@ def get_estacionalidad_laboral():
 
 
 @router.get("/laboral/informalidad")
-@cached(ttl_seconds=3600)
-def get_informalidad_laboral():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo", "socioeconomico"))
+async def get_informalidad_laboral():
     """Indicador de informalidad laboral por municipio combinando IPM, ofertas y TerriData."""
-    # Run all 3 queries on a single DB connection to avoid pool exhaustion on Vercel
-    ipm_data, proxy_data, pobreza_data = query_dicts_batch([
+    # Independent aggregations: fan out over pooled connections
+    ipm_data, proxy_data = await aquery_dicts_batch([
         # 1. IPM: empleo_informal
         ("""
             SELECT municipio, dane_code, empleo_informal as tasa_ipm
@@ -542,19 +454,15 @@ def get_informalidad_laboral():
             WHERE tipo_contrato IS NOT NULL AND dane_code IS NOT NULL
             GROUP BY municipio, dane_code
         """, None),
-        # 3. Pobreza monetaria from TerriData
-        ("""
-            SELECT DISTINCT ON (dane_code) dane_code, dato_numerico as pobreza_monetaria, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = 'Incidencia de la pobreza monetaria'
-            ORDER BY dane_code, anio DESC
-        """, None),
-    ])
+    ], parallel=True)
 
-    # Build lookups
+    # Build lookups (pobreza monetaria: latest TerriData value per municipio)
     ipm_map = {r["dane_code"]: r for r in ipm_data}
     proxy_map = {r["dane_code"]: r for r in proxy_data}
-    pobreza_map = {r["dane_code"]: r for r in pobreza_data}
+    pobreza_map = {
+        dane: {"pobreza_monetaria": r["valor"], "anio": r["anio"]}
+        for dane, r in (await aget_cube()).by_dane_code("Incidencia de la pobreza monetaria").items()
+    }
 
     all_danes = set()
     for d in [ipm_map, proxy_map, pobreza_map]:
@@ -601,22 +509,33 @@ def get_informalidad_laboral():
     return sorted(result, key=lambda x: x["indice_compuesto"] or 0, reverse=True)
 
 
+# Exact reference medians, when the salary rollup is missing or not yet populated
+SALARIO_REFERENCIA_SQL = """
+    SELECT sector, municipio, nivel_educativo, nivel_experiencia,
+           ROUND(AVG(salario_numerico))::int AS salario_estimado,
+           COUNT(*) AS muestra,
+           ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico))::int AS mediana
+    FROM empleo.ofertas_laborales
+    WHERE salario_numerico > 0
+    GROUP BY sector, municipio, nivel_educativo, nivel_experiencia
+    HAVING COUNT(*) >= 3
+    ORDER BY muestra DESC
+    LIMIT 50
+"""
+
+
 @router.get("/laboral/salario-imputado")
-@cached(ttl_seconds=3600)
-def get_salario_imputado():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_salario_imputado():
     """Tabla de referencia salarial y estadísticas de imputación."""
     # Run both queries on a single DB connection to avoid pool exhaustion on Vercel.
     # Use a safe cobertura query that handles missing salario_imputado column gracefully.
-    referencia, cobertura = query_dicts_batch([
+    # The reference medians merge the salary rollup's histograms (±1%)
+    cells, cobertura = await aquery_dicts_batch([
         ("""
             SELECT sector, municipio, nivel_educativo, nivel_experiencia,
-                   ROUND(AVG(salario_numerico)) as salario_estimado,
-                   COUNT(*) as muestra,
-                   PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana
-            FROM empleo.ofertas_laborales
-            WHERE salario_numerico IS NOT NULL
-            GROUP BY sector, municipio, nivel_educativo, nivel_experiencia
-            HAVING COUNT(*) >= 3
+                   salario_n, salario_suma, salario_sketch
+            FROM empleo.salarios_rollup
         """, None),
         ("""
             SELECT
@@ -632,11 +551,14 @@ def get_salario_imputado():
     con_sal = cob.get("con_salario", 0)
     con_imp = cob.get("con_imputado", 0)
 
-    for r in referencia:
-        if r.get("salario_estimado"):
-            r["salario_estimado"] = int(r["salario_estimado"])
-        if r.get("mediana"):
-            r["mediana"] = int(r["mediana"])
+    referencia = [
+        {**{k: g[k] for k in ("sector", "municipio", "nivel_educativo", "nivel_experiencia")},
+         "salario_estimado": g["salario_promedio"], "muestra": g["muestra"], "mediana": g["p50"]}
+        for g in salary_percentiles(cells, ("sector", "municipio", "nivel_educativo", "nivel_experiencia"),
+                                    qs=(0.5,), min_sample=3)
+    ]
+    if not cells:
+        referencia = await aquery_dicts(SALARIO_REFERENCIA_SQL)
 
     return {
         "tabla_referencia": referencia[:50],
@@ -650,50 +572,64 @@ def get_salario_imputado():
     }
 
 
+def _cluster_profile(centroid, keys) -> str:
+    """Describe a cluster by the features whose centroid is half a standard deviation off the mean."""
+    alto = [FEATURES[k]["name"] for k, z in zip(keys, centroid) if z >= 0.5]
+    bajo = [FEATURES[k]["name"] for k, z in zip(keys, centroid) if z <= -0.5]
+    parts = []
+    if alto:
+        parts.append(f"Por encima del promedio en: {', '.join(alto)}")
+    if bajo:
+        parts.append(f"Por debajo del promedio en: {', '.join(bajo)}")
+    return ". ".join(parts) + "." if parts else "Perfil cercano al promedio regional."
+
+
 @router.get("/clusters")
-@cached(ttl_seconds=3600)
-def get_territorial_clusters():
-    """Agrupamiento de municipios por similitud socioeconómica."""
-    sql = """
-        SELECT
-            entidad as municipio,
-            indicador,
-            dato_numerico as valor
-        FROM socioeconomico.terridata
-        WHERE indicador IN ('Población total', 'Incidencia de la pobreza monetaria', 'Valor agregado municipal')
-        AND anio = (SELECT MAX(anio) FROM socioeconomico.terridata)
-    """
-    data = query_dicts(sql)
-    if not data:
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("socioeconomico",))
+async def get_territorial_clusters(
+    k: int = Query(4, ge=2, le=10, description="Número de clusters"),
+    variables: str = Query(None, description=f"Indicadores (separados por coma): {', '.join(FEATURES)}"),
+):
+    """Agrupamiento de municipios por similitud socioeconómica (k-means sobre indicadores estandarizados)."""
+    keys = [v.strip() for v in variables.split(",") if v.strip()] if variables else list(DEFAULT_FEATURES)
+    invalid = [v for v in keys if v not in FEATURES]
+    if invalid or not keys:
+        raise HTTPException(status_code=400, detail=f"Variable no válida: {', '.join(invalid)}")
+
+    cube = await aget_cube()
+    danes = sorted(cube.by_dane)
+    entities = [cube.by_dane[d] for d in danes]
+    raw = cube.matrix([FEATURES[v]["indicador"] for v in keys])[:, entities].T
+    reported = ~np.isnan(raw).all(axis=1)
+    if not reported.any():
         return {"error": "Datos insuficientes para clustering"}
+    raw = raw[reported]
+    danes = [d for d, keep in zip(danes, reported) if keep]
 
-    import pandas as pd
-    df = pd.DataFrame(data).pivot(index='municipio', columns='indicador', values='valor').reset_index()
-
+    result = kmeans(standardize(raw, [FEATURES[v]["log"] for v in keys]), k)
     clusters = []
-    for _, row in df.iterrows():
-        poblacion = row.get('Población total', 0) or 0
-        pobreza = row.get('Incidencia de la pobreza monetaria', 0) or 0
-        pib = row.get('Valor agregado municipal', 0) or 0
-
-        if poblacion > 100000:
-            cluster = "Nodo Urbano Regional"
-            desc = "Municipios con alta densidad poblacional y servicios centralizados."
-        elif pib > 1000000:
-            cluster = "Eje Agroindustrial"
-            desc = "Municipios con fuerte base económica en banano/plátano y logística."
-        elif pobreza > 50:
-            cluster = "Territorio en Desarrollo"
-            desc = "Municipios con altos retos sociales y brechas de infraestructura."
-        else:
-            cluster = "Ruralidad Emergente"
-            desc = "Municipios con economías en transición y potencial turístico."
-
+    for c, centroid in enumerate(result.centroids):
+        members = raw[result.labels == c]
+        reporting = (~np.isnan(members)).sum(axis=0)
+        sums = np.nansum(members, axis=0)
         clusters.append({
-            "municipio": row['municipio'],
-            "cluster": cluster,
-            "descripcion": desc,
-            "indicadores": {"poblacion": poblacion, "pobreza": pobreza, "pib": pib},
+            "cluster": c,
+            "municipios": int(len(members)),
+            "descripcion": _cluster_profile(centroid, keys),
+            "promedios": {v: round(float(t / n), 2) if n else None for v, t, n in zip(keys, sums, reporting)},
         })
-
-    return clusters
+    return {
+        "k": len(clusters),
+        "variables": keys,
+        "inercia": round(result.inertia, 3),
+        "clusters": clusters,
+        "municipios": [
+            {
+                "municipio": cube.entity(dane),
+                "dane_code": dane,
+                "cluster": int(label),
+                "indicadores": {v: None if np.isnan(x) else float(x) for v, x in zip(keys, row)},
+            }
+            for dane, label, row in zip(danes, result.labels, raw)
+        ],
+    }
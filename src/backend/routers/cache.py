@@ -0,0 +1,23 @@
+"""
+Observabilidad de la caché en memoria del API
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..database import cache_stats
+from ..services import warmup
+
+router = APIRouter(prefix="/api/cache", tags=["Cache"])
+
+
+@router.get("/stats")
+def get_cache_stats():
+    """Contadores por endpoint: aciertos, fallos, desalojos, expiraciones y memoria usada."""
+    return cache_stats()
+
+
+@router.get("/ready")
+def get_cache_readiness():
+    """Estado del precalentamiento de la caché; responde 503 mientras está en curso."""
+    status = warmup.status()
+    ready = status["state"] in ("done", "disabled", "delegated")
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **status})
@@ -2,9 +2,12 @@
 Motor de Cruces Multivariable
 """
 import logging
+
+import numpy as np
 from fastapi import APIRouter, Query
-from ..database import engine, cached, query_dicts
-from sqlalchemy import text
+from ..database import cached, aquery_dicts
+from ..services.correlation import pairwise_counts, pearson_matrix, spearman_matrix
+from ..services.terridata import aget_cube
 
 logger = logging.getLogger("observatorio.crossvar")
 
@@ -23,13 +26,13 @@ VARIABLES = {
 
 
 @router.get("/variables")
-def list_variables():
+async def list_variables():
     return [{"id": k, "name": v["name"]} for k, v in VARIABLES.items()]
 
 
 @router.get("/security-matrix")
-@cached(ttl_seconds=600)
-def security_matrix(dane_code: str = Query(None)):
+@cached(ttl_seconds=600, depends_on=("seguridad",))
+async def security_matrix(dane_code: str = Query(None)):
     where = "WHERE dane_code = :d" if dane_code else "WHERE 1=1"
     parts = []
     for label, table in [
@@ -44,45 +47,23 @@ def security_matrix(dane_code: str = Query(None)):
         )
     sql = " UNION ALL ".join(parts) + " ORDER BY tipo, anio"
     try:
-        return {"data": query_dicts(sql, {"d": dane_code})}
+        return {"data": await aquery_dicts(sql, {"d": dane_code})}
     except Exception as e:
         logger.warning("security_matrix error: %s", e)
         return {"data": []}
 
 
 @router.get("/scatter")
-@cached(ttl_seconds=600)
-def scatter_analysis(var_x: str, var_y: str, dane_code: str = Query(None)):
+@cached(ttl_seconds=600, depends_on=("socioeconomico",))
+async def scatter_analysis(var_x: str, var_y: str, dane_code: str = Query(None)):
     """Scatter plot: compares two TerriData indicators across municipalities."""
     vx = VARIABLES.get(var_x)
     vy = VARIABLES.get(var_y)
     if not vx or not vy:
         return {"points": [], "correlation": 0, "n": 0, "error": "Variable no encontrada"}
 
-    sql = """
-        WITH x_data AS (
-            SELECT DISTINCT ON (entidad)
-                entidad as municipio, codigo_entidad as dane_code,
-                dato_numerico as valor, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :ind_x
-            ORDER BY entidad, anio DESC
-        ),
-        y_data AS (
-            SELECT DISTINCT ON (entidad)
-                entidad as municipio, codigo_entidad as dane_code,
-                dato_numerico as valor, anio
-            FROM socioeconomico.terridata
-            WHERE indicador = :ind_y
-            ORDER BY entidad, anio DESC
-        )
-        SELECT x.municipio as label, x.valor as x, y.valor as y
-        FROM x_data x
-        JOIN y_data y ON x.dane_code = y.dane_code
-        WHERE x.valor IS NOT NULL AND y.valor IS NOT NULL
-    """
     try:
-        points = query_dicts(sql, {"ind_x": vx["indicador"], "ind_y": vy["indicador"]})
+        points = (await aget_cube()).pairs(vx["indicador"], vy["indicador"])
         n = len(points)
         # Compute correlation
         correlation = 0.0
@@ -108,3 +89,25 @@ def scatter_analysis(var_x: str, var_y: str, dane_code: str = Query(None)):
     except Exception as e:
         logger.warning("scatter error: %s", e)
         return {"points": [], "correlation": 0, "n": 0}
+
+
+def _rounded(matrix: np.ndarray) -> list[list[float | None]]:
+    return [[None if np.isnan(v) else round(float(v), 3) for v in row] for row in matrix]
+
+
+@router.get("/correlation-matrix")
+@cached(ttl_seconds=3600, depends_on=("socioeconomico",))
+async def correlation_matrix():
+    """Pearson and Spearman matrices for every pair of TerriData variables.
+
+    Each pair uses the municipalities reporting both (`n`); pairs with fewer
+    than 3 of them are null.
+    """
+    keys = [k for k, v in VARIABLES.items() if v["source"] == "terridata"]
+    X = (await aget_cube()).matrix([VARIABLES[k]["indicador"] for k in keys])
+    return {
+        "variables": [{"id": k, "name": VARIABLES[k]["name"]} for k in keys],
+        "pearson": _rounded(pearson_matrix(X)),
+        "spearman": _rounded(spearman_matrix(X)),
+        "n": pairwise_counts(X).tolist(),
+    }
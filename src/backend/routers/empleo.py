@@ -4,83 +4,108 @@ Router para el mercado laboral y ofertas de empleo en Urabá
 Fuente: empleo.ofertas_laborales (PostgreSQL / Supabase)
 Fallback: SQLite ~/uraba_empleos/empleos_uraba.db
 """
-from fastapi import APIRouter, Query
-from ..database import engine, cached, query_dicts
-from sqlalchemy import text
+from fastapi import APIRouter, HTTPException, Query
+from ..config import CACHE_MAX_STALE_SECONDS
+from ..database import cached, aquery_dicts, aquery_dicts_batch, run_sync
+from ..services.pagination import decode_cursor, encode_cursor, estimate_count, fetch_keyset_page
+from ..services.olap import aget_snapshot
+from ..services.rollup import ofertas_cells, rollup_available
+from ..services.search import fulltext_available, search_clause
+from ..services.sketches import PERCENTILES, histogram_quantile, salary_percentiles
 
 router = APIRouter(prefix="/api/empleo", tags=["Empleo"])
 
+# The SQL engine always counts distinct values exactly; only the numpy snapshot
+# (OLAP_ENGINE=numpy) estimates them with HyperLogLog unless asked not to
+EXACT_DESCRIPTION = ("Solo con OLAP_ENGINE=numpy: conteos distintos exactos en vez de "
+                     "HyperLogLog (±1.6%). El motor SQL siempre cuenta exacto.")
 
-def _table_exists():
-    """Check if the PG table exists."""
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1 FROM empleo.ofertas_laborales LIMIT 1"))
-        return True
-    except Exception:
-        return False
+OFERTAS_COLUMNS = """
+    id, titulo, empresa, salario_texto, salario_numerico,
+    descripcion, municipio, dane_code, fuente, sector, skills,
+    fecha_publicacion, enlace,
+    nivel_experiencia, tipo_contrato, nivel_educativo, modalidad
+"""
 
 
-@router.get("/ofertas")
-@cached(ttl_seconds=3600)
-def get_ofertas(
-    municipio: str = Query(None, description="Filtrar por municipio"),
-    fuente: str = Query(None, description="Filtrar por fuente"),
-    sector: str = Query(None, description="Filtrar por sector"),
-    dane_code: str = Query(None, description="Filtrar por código DANE"),
-    busqueda: str = Query(None, description="Buscar en título o descripción"),
-    tipo_contrato: str = Query(None, description="Filtrar por tipo de contrato"),
-    modalidad: str = Query(None, description="Filtrar por modalidad"),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(25, le=100),
-):
-    """Listado de ofertas laborales con paginación."""
-    conditions = ["1=1"]
+async def _ofertas_filters(municipio, fuente, sector, dane_code, busqueda, tipo_contrato, modalidad):
+    """WHERE fragments shared by /ofertas and /facets, keyed by the filter they
+    come from, plus their parameters and the relevance expression (or None)."""
+    conditions = {}
     params = {}
     if municipio:
-        conditions.append("municipio ILIKE :muni")
+        conditions["municipio"] = "municipio ILIKE :muni"
         params["muni"] = f"%{municipio}%"
     if fuente:
-        conditions.append("fuente = :fuente")
+        conditions["fuente"] = "fuente = :fuente"
         params["fuente"] = fuente
     if sector:
-        conditions.append("sector = :sector")
+        conditions["sector"] = "sector = :sector"
         params["sector"] = sector
     if dane_code:
-        conditions.append("dane_code = :dane")
+        conditions["dane_code"] = "dane_code = :dane"
         params["dane"] = dane_code
+    rank = None
     if busqueda:
-        conditions.append("(titulo ILIKE :q OR descripcion ILIKE :q)")
-        params["q"] = f"%{busqueda}%"
+        condition, rank, search_params = search_clause(busqueda, await run_sync(fulltext_available))
+        conditions["busqueda"] = condition
+        params.update(search_params)
     if tipo_contrato:
-        conditions.append("tipo_contrato = :tipo_contrato")
+        conditions["tipo_contrato"] = "tipo_contrato = :tipo_contrato"
         params["tipo_contrato"] = tipo_contrato
     if modalidad:
-        conditions.append("modalidad = :modalidad")
+        conditions["modalidad"] = "modalidad = :modalidad"
         params["modalidad"] = modalidad
+    return conditions, params, rank
+
+
+@router.get("/ofertas")
+@cached(ttl_seconds=3600, max_entries=1024, depends_on=("empleo",))
+async def get_ofertas(
+    municipio: str = Query(None, description="Filtrar por municipio"),
+    fuente: str = Query(None, description="Filtrar por fuente"),
+    sector: str = Query(None, description="Filtrar por sector"),
+    dane_code: str = Query(None, description="Filtrar por código DANE"),
+    busqueda: str = Query(None, description="Buscar en título o descripción (sin distinguir tildes)"),
+    tipo_contrato: str = Query(None, description="Filtrar por tipo de contrato"),
+    modalidad: str = Query(None, description="Filtrar por modalidad"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(25, le=100),
+    mode: str = Query("offset", pattern="^(offset|cursor)$",
+                      description="offset: páginas numeradas; cursor: paginación por llave (keyset)"),
+    cursor: str = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+):
+    """Listado de ofertas laborales con paginación.
+
+    En modo cursor cada página cuesta O(page_size) a cualquier profundidad y
+    el total es una estimación del planificador (solo en la primera página).
+    Con ``busqueda`` el modo offset ordena por relevancia; el modo cursor
+    conserva el orden por fecha.
+    """
+    conditions, params, rank = await _ofertas_filters(
+        municipio, fuente, sector, dane_code, busqueda, tipo_contrato, modalidad)
+    where = " AND ".join(["1=1", *conditions.values()])
+    if mode == "cursor":
+        return await _ofertas_cursor_page(where, params, cursor, page_size)
 
-    where = " AND ".join(conditions)
     offset = (page - 1) * page_size
     params["lim"] = page_size
     params["off"] = offset
 
-    count_rows = query_dicts(
+    count_rows = await aquery_dicts(
         f"SELECT COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where}", params
     )
     total = count_rows[0]["total"] if count_rows else 0
     total_pages = max(1, -(-total // page_size))
 
     sql = f"""
-        SELECT id, titulo, empresa, salario_texto, salario_numerico,
-               descripcion, municipio, dane_code, fuente, sector, skills,
-               fecha_publicacion, enlace,
-               nivel_experiencia, tipo_contrato, nivel_educativo, modalidad
+        SELECT {OFERTAS_COLUMNS}
         FROM empleo.ofertas_laborales
         WHERE {where}
-        ORDER BY fecha_publicacion DESC NULLS LAST
+        ORDER BY {f"{rank} DESC, " if rank else ""}fecha_publicacion DESC NULLS LAST, id DESC
         LIMIT :lim OFFSET :off
     """
-    items = query_dicts(sql, params)
+    items = await aquery_dicts(sql, params)
     return {
         "items": items,
         "total": total,
@@ -90,10 +115,265 @@ def get_ofertas(
     }
 
 
+async def _ofertas_cursor_page(where: str, params: dict, cursor: str | None, page_size: int) -> dict:
+    """Keyset page ordered by (fecha_publicacion DESC NULLS LAST, id DESC)."""
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # One extra row tells whether another page exists
+    items = await fetch_keyset_page(
+        f"SELECT {OFERTAS_COLUMNS} FROM empleo.ofertas_laborales", where, params,
+        "fecha_publicacion", "id", after, page_size + 1, descending=True,
+    )
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    last = items[-1] if items else None
+    total = None if cursor else await estimate_count(f"empleo.ofertas_laborales WHERE {where}", params)
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(last["fecha_publicacion"], last["id"]) if has_more else None,
+        "page_size": page_size,
+        "total_estimate": total,
+    }
+
+
+FACET_DIMENSIONS = ("fuente", "sector", "tipo_contrato", "modalidad", "nivel_educativo", "municipio")
+# GROUPING(<FACET_DIMENSIONS>) of each single-dimension grouping set
+_FACET_GSET = {
+    (1 << len(FACET_DIMENSIONS)) - 1 - (1 << (len(FACET_DIMENSIONS) - 1 - i)): dim
+    for i, dim in enumerate(FACET_DIMENSIONS)
+}
+
+
+def empleo_facets_sql(conditions: dict[str, str]) -> str:
+    """All facet counts in one scan. Filters that are not facets (dane_code,
+    busqueda) restrict the scan; each facet's counts then use FILTER with
+    every other filter but its own (disjunctive facets)."""
+    def without(dim=None):
+        return " AND ".join(["TRUE", *(c for k, c in conditions.items() if k in FACET_DIMENSIONS and k != dim)])
+
+    base = " AND ".join(["TRUE", *(c for k, c in conditions.items() if k not in FACET_DIMENSIONS)])
+    counts = ",\n               ".join(f"COUNT(*) FILTER (WHERE {without(d)}) AS n_{d}" for d in FACET_DIMENSIONS)
+    dims = ", ".join(FACET_DIMENSIONS)
+    sets = ", ".join(f"({d})" for d in FACET_DIMENSIONS)
+    return f"""
+        SELECT GROUPING({dims}) AS gset, {dims},
+               COUNT(*) FILTER (WHERE {without()}) AS n_total,
+               {counts}
+        FROM empleo.ofertas_laborales
+        WHERE {base}
+        GROUP BY GROUPING SETS ((), {sets})
+    """
+
+
+def _snapshot_facets(snap, municipio, fuente, sector, dane_code, tipo_contrato, modalidad):
+    masks = {
+        "municipio": snap.contains("municipio", municipio) if municipio else None,
+        **{dim: snap.eq(dim, value) if value else None
+           for dim, value in (("fuente", fuente), ("sector", sector),
+                              ("tipo_contrato", tipo_contrato), ("modalidad", modalidad))},
+    }
+    base = snap.where(dane_code=dane_code)
+
+    def without(dim=None):
+        mask = base.copy()
+        for k, m in masks.items():
+            if m is not None and k != dim:
+                mask &= m
+        return mask
+
+    return {
+        "total": int(without().sum()),
+        "facets": {
+            dim: [{"value": v, "count": c} for v, c in snap.count_by(dim, without(dim)) if v is not None]
+            for dim in FACET_DIMENSIONS
+        },
+    }
+
+
+@router.get("/facets")
+@cached(ttl_seconds=3600, max_entries=1024, depends_on=("empleo",))
+async def get_ofertas_facets(
+    municipio: str = Query(None, description="Filtrar por municipio"),
+    fuente: str = Query(None, description="Filtrar por fuente"),
+    sector: str = Query(None, description="Filtrar por sector"),
+    dane_code: str = Query(None, description="Filtrar por código DANE"),
+    busqueda: str = Query(None, description="Buscar en título o descripción (sin distinguir tildes)"),
+    tipo_contrato: str = Query(None, description="Filtrar por tipo de contrato"),
+    modalidad: str = Query(None, description="Filtrar por modalidad"),
+):
+    """Conteos por faceta (fuente, sector, contrato, modalidad, educación,
+    municipio) para los mismos filtros de /ofertas, en una sola pasada.
+
+    Cada faceta ignora su propio filtro, de modo que muestra cuántas ofertas
+    habría al cambiar ese valor manteniendo los demás filtros.
+    """
+    snap = None if busqueda else await aget_snapshot()
+    if snap is not None:
+        return _snapshot_facets(snap, municipio, fuente, sector, dane_code, tipo_contrato, modalidad)
+
+    conditions, params, _ = await _ofertas_filters(
+        municipio, fuente, sector, dane_code, busqueda, tipo_contrato, modalidad)
+    rows = await aquery_dicts(empleo_facets_sql(conditions), params)
+    total = 0
+    facets = {dim: [] for dim in FACET_DIMENSIONS}
+    for r in rows:
+        dim = _FACET_GSET.get(r["gset"])
+        if dim is None:
+            total = r["n_total"]
+        elif r[dim] is not None and r[f"n_{dim}"]:
+            facets[dim].append({"value": r[dim], "count": r[f"n_{dim}"]})
+    for values in facets.values():
+        values.sort(key=lambda f: -f["count"])
+    return {"total": total, "facets": facets}
+
+
+# ── Answers from the in-memory columnar snapshot (OLAP_ENGINE=numpy) ──
+# Each mirrors the SQL of its endpoint below, including NULL groups and order.
+
+_SALARY_BINS = [1300000, 2000000, 3000000, 5000000]
+_SALARY_LABELS = ["< SMMLV", "1-2 SMMLV", "2-3 SMMLV", "3-5 SMMLV", "> 5 SMMLV"]
+
+
+def _empresa_mask(snap, mask):
+    return mask & snap.not_null("empresa") & ~snap.eq("empresa", "No especificada")
+
+
+def _snapshot_stats(snap, dane_code):
+    mask = snap.where(dane_code=dane_code)
+    ss = snap.salary_summary(mask)
+    return {
+        "total_ofertas": int(mask.sum()),
+        "con_salario": ss["con_salario"],
+        "salario_promedio": ss["promedio"] or None,
+        "salario_minimo": ss["minimo"] or None,
+        "salario_maximo": ss["maximo"] or None,
+        "salario_mediana": int(ss["mediana"]) if ss["mediana"] else None,
+        **{
+            key: [{col: v, "total": c} for v, c in snap.count_by(col, mask)]
+            for key, col in (("por_municipio", "municipio"), ("por_fuente", "fuente"), ("por_sector", "sector"))
+        },
+        "top_empresas": [{"empresa": v, "total": c}
+                         for v, c in snap.count_by("empresa", _empresa_mask(snap, mask))[:15]],
+    }
+
+
+def _snapshot_kpis(snap, dane_code, exact):
+    mask = snap.where(dane_code=dane_code)
+    sectores = snap.count_by("sector", mask)
+    empresas = snap.count_by("empresa", _empresa_mask(snap, mask))
+    return {
+        "total_ofertas": int(mask.sum()),
+        "total_empresas": snap.distinct("empresa", mask, exact),
+        "total_sectores": snap.distinct("sector", mask, exact),
+        "salario_promedio": snap.salary_summary(mask)["promedio"] or None,
+        "sector_top": sectores[0][0] if sectores else None,
+        "empresa_top": empresas[0][0] if empresas else None,
+    }
+
+
+def _snapshot_salarios(snap, dane_code):
+    mask = snap.where(dane_code=dane_code) & snap.has_salary
+
+    def by(col, min_ofertas=1):
+        groups = [{col: g[col], "ofertas": g["ofertas"], "promedio": g["promedio"],
+                   "minimo": g["minimo"], "maximo": g["maximo"]}
+                  for g in snap.salary_by(col, mask) if g["ofertas"] >= min_ofertas]
+        return sorted(groups, key=lambda g: -g["promedio"])
+
+    counts = snap.salary_buckets(_SALARY_BINS, mask)
+    return {
+        "por_sector": by("sector", min_ofertas=2),
+        "por_municipio": by("municipio"),
+        "rangos": [{"rango": label, "ofertas": int(c)} for label, c in zip(_SALARY_LABELS, counts) if c],
+    }
+
+
+def _snapshot_distribution(snap, col, label, dane_code):
+    mask = snap.where(dane_code=dane_code) & snap.not_null(col)
+    return [{label: v, "total": c} for v, c in snap.count_by(col, mask)]
+
+
+def _snapshot_by_group(snap, group, mask, exact=True, **distinct):
+    """ofertas, con_salario and salario_promedio per *group*, plus one
+    ``COUNT(DISTINCT col)`` per keyword (``empresas="empresa"``)."""
+    index = {v: i for i, v in enumerate(snap.values[group])}
+    counts = {name: snap.distinct_by(group, col, mask, exact) for name, col in distinct.items()}
+    rows = []
+    for g in snap.salary_by(group, mask):
+        code = index[g[group]]
+        rows.append({
+            group: g[group],
+            "ofertas": g["ofertas"],
+            **{name: int(c[code]) for name, c in counts.items()},
+            "salario_promedio": g["promedio"],
+            "con_salario": g["con_salario"],
+        })
+    return rows
+
+
+# GROUPING(municipio, fuente, sector, empresa) bitmask of each grouping set
+# (a bit is 1 when that column is aggregated away)
+_GSET_TOTAL = 0b1111
+_GSET_EMPRESA = 0b1110
+_GSET_DIMENSION = {0b0111: "municipio", 0b1011: "fuente", 0b1101: "sector", _GSET_EMPRESA: "empresa"}
+
+
+def empleo_stats_sql(where: str) -> str:
+    """Single-scan aggregation behind /stats: the total, the salary summary and
+    the four breakdowns come from one GROUPING SETS pass over the filtered rows.
+    Empresas are ranked in SQL so only the top 15 leave the database. The
+    median is not computed here (see ``SALARIO_SKETCH_SQL``)."""
+    return f"""
+        WITH agg AS (
+            SELECT GROUPING(municipio, fuente, sector, empresa) AS gset,
+                   municipio, fuente, sector, empresa,
+                   COUNT(*) AS total,
+                   COUNT(salario_numerico) AS con_salario,
+                   ROUND(AVG(salario_numerico)) AS promedio,
+                   MIN(salario_numerico) AS minimo,
+                   MAX(salario_numerico) AS maximo
+            FROM empleo.ofertas_laborales
+            WHERE {where}
+            GROUP BY GROUPING SETS ((), (municipio), (fuente), (sector), (empresa))
+        ),
+        ranked AS (
+            SELECT agg.*, ROW_NUMBER() OVER (PARTITION BY gset ORDER BY total DESC) AS rn
+            FROM agg
+            WHERE gset <> {_GSET_EMPRESA} OR (empresa IS NOT NULL AND empresa != 'No especificada')
+        )
+        SELECT * FROM ranked
+        WHERE gset <> {_GSET_EMPRESA} OR rn <= 15
+        ORDER BY gset, total DESC
+    """
+
+
+# Merged salary histogram of the filtered rollup cells, for the /stats median
+SALARIO_SKETCH_SQL = """
+    SELECT key AS bucket, SUM(value::int) AS n
+    FROM empleo.salarios_rollup, jsonb_each_text(salario_sketch)
+    WHERE {where}
+    GROUP BY key
+"""
+# Exact median, when the salary rollup is missing or not yet populated
+SALARIO_MEDIANA_SQL = """
+    SELECT PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) AS mediana
+    FROM empleo.ofertas_laborales
+    WHERE {where} AND salario_numerico > 0
+"""
+
+
 @router.get("/stats")
-@cached(ttl_seconds=3600)
-def get_empleo_stats(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_empleo_stats(dane_code: str = Query(None)):
     """Estadísticas generales del mercado laboral."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_stats(snap, dane_code)
     conditions = ["1=1"]
     params = {}
     if dane_code:
@@ -101,52 +381,23 @@ def get_empleo_stats(dane_code: str = Query(None)):
         params["dane"] = dane_code
     where = " AND ".join(conditions)
 
-    total_rows = query_dicts(
-        f"SELECT COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where}", params
-    )
-    total = total_rows[0]["total"] if total_rows else 0
-
-    por_municipio = query_dicts(f"""
-        SELECT municipio, COUNT(*) as total
-        FROM empleo.ofertas_laborales WHERE {where}
-        GROUP BY municipio ORDER BY total DESC
-    """, params)
-
-    por_fuente = query_dicts(f"""
-        SELECT fuente, COUNT(*) as total
-        FROM empleo.ofertas_laborales WHERE {where}
-        GROUP BY fuente ORDER BY total DESC
-    """, params)
-
-    por_sector = query_dicts(f"""
-        SELECT sector, COUNT(*) as total
-        FROM empleo.ofertas_laborales WHERE {where}
-        GROUP BY sector ORDER BY total DESC
-    """, params)
-
-    emp_cond = f"{where} AND empresa IS NOT NULL AND empresa != 'No especificada'"
-    top_empresas = query_dicts(f"""
-        SELECT empresa, COUNT(*) as total
-        FROM empleo.ofertas_laborales WHERE {emp_cond}
-        GROUP BY empresa ORDER BY total DESC LIMIT 15
-    """, params)
-
-    sal_cond = f"{where} AND salario_numerico IS NOT NULL"
-    con_sal_rows = query_dicts(
-        f"SELECT COUNT(*) as total FROM empleo.ofertas_laborales WHERE {sal_cond}", params
-    )
-    con_salario = con_sal_rows[0]["total"] if con_sal_rows else 0
-
-    sal_rows = query_dicts(f"""
-        SELECT
-            ROUND(AVG(salario_numerico)) as promedio,
-            MIN(salario_numerico) as minimo,
-            MAX(salario_numerico) as maximo,
-            PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salario_numerico) as mediana
-        FROM empleo.ofertas_laborales
-        WHERE {sal_cond}
-    """, params)
-    ss = sal_rows[0] if sal_rows else {}
+    rows, buckets = await aquery_dicts_batch([
+        (empleo_stats_sql(where), params),
+        (SALARIO_SKETCH_SQL.format(where=where), params),
+    ], parallel=True)
+    mediana = histogram_quantile({b["bucket"]: b["n"] for b in buckets}, 0.5)
+    total = con_salario = 0
+    ss = {}
+    breakdowns = {"municipio": [], "fuente": [], "sector": [], "empresa": []}
+    for r in rows:
+        if r["gset"] == _GSET_TOTAL:
+            total, con_salario, ss = r["total"], r["con_salario"], r
+        else:
+            dim = _GSET_DIMENSION[r["gset"]]
+            breakdowns[dim].append({dim: r[dim], "total": r["total"]})
+    if not buckets and con_salario:
+        exact = await aquery_dicts(SALARIO_MEDIANA_SQL.format(where=where), params)
+        mediana = exact[0]["mediana"] if exact else None
 
     return {
         "total_ofertas": total,
@@ -154,22 +405,31 @@ def get_empleo_stats(dane_code: str = Query(None)):
         "salario_promedio": int(ss["promedio"]) if ss.get("promedio") else None,
         "salario_minimo": int(ss["minimo"]) if ss.get("minimo") else None,
         "salario_maximo": int(ss["maximo"]) if ss.get("maximo") else None,
-        "salario_mediana": int(ss["mediana"]) if ss.get("mediana") else None,
-        "por_municipio": por_municipio,
-        "por_fuente": por_fuente,
-        "por_sector": por_sector,
-        "top_empresas": top_empresas,
+        "salario_mediana": round(mediana) if mediana else None,
+        "por_municipio": breakdowns["municipio"],
+        "por_fuente": breakdowns["fuente"],
+        "por_sector": breakdowns["sector"],
+        "top_empresas": breakdowns["empresa"],
     }
 
 
 @router.get("/serie-temporal")
-@cached(ttl_seconds=3600)
-def get_empleo_serie_temporal(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_empleo_serie_temporal(
     dane_code: str = Query(None),
     municipio: str = Query(None),
+    exact: bool = Query(False, description=EXACT_DESCRIPTION),
 ):
     """Serie temporal de ofertas agrupadas por mes."""
-    conditions = ["fecha_publicacion IS NOT NULL"]
+    snap = None if municipio else await aget_snapshot()
+    if snap is not None:
+        mask = snap.where(dane_code=dane_code) & snap.not_null("periodo")
+        rows = _snapshot_by_group(snap, "periodo", mask, exact, empresas="empresa")
+        medianas = snap.salary_median_by("periodo", mask)
+        return sorted(({**{k: r[k] for k in ("periodo", "ofertas", "empresas", "salario_promedio")},
+                        "salario_mediana": medianas.get(r["periodo"])} for r in rows),
+                      key=lambda r: r["periodo"])
+    conditions = ["mes IS NOT NULL"]
     params = {}
     if dane_code:
         conditions.append("dane_code = :dane")
@@ -179,32 +439,60 @@ def get_empleo_serie_temporal(
         params["muni"] = f"%{municipio}%"
 
     where = " AND ".join(conditions)
+    # Monthly rollup: rows scale with months × cells, not with offers
+    cells = ofertas_cells(await run_sync(rollup_available))
     sql = f"""
+        WITH cells AS (
+            SELECT * FROM {cells} WHERE {where}
+        ),
+        distinct_empresas AS (
+            SELECT mes, COUNT(DISTINCT e) AS empresas
+            FROM cells, UNNEST(empresas) AS e
+            GROUP BY mes
+        ),
+        sketches AS (
+            SELECT mes, jsonb_object_agg(bucket, n) AS salario_sketch
+            FROM (
+                SELECT mes, key AS bucket, SUM(value::int) AS n
+                FROM cells, jsonb_each_text(salario_sketch)
+                GROUP BY mes, key
+            ) b
+            GROUP BY mes
+        )
         SELECT
-            TO_CHAR(fecha_publicacion, 'YYYY-MM') as periodo,
-            COUNT(*) as ofertas,
-            COUNT(DISTINCT empresa) as empresas,
-            ROUND(AVG(salario_numerico)) as salario_promedio
-        FROM empleo.ofertas_laborales
-        WHERE {where}
-        GROUP BY TO_CHAR(fecha_publicacion, 'YYYY-MM')
+            TO_CHAR(c.mes, 'YYYY-MM') as periodo,
+            SUM(c.ofertas)::int as ofertas,
+            COALESCE(MAX(e.empresas), 0) as empresas,
+            ROUND(SUM(c.salario_suma)::numeric / NULLIF(SUM(c.salario_n), 0)) as salario_promedio,
+            MAX(s.salario_sketch::text) as salario_sketch
+        FROM cells c
+        LEFT JOIN distinct_empresas e USING (mes)
+        LEFT JOIN sketches s USING (mes)
+        GROUP BY c.mes
         ORDER BY periodo
     """
-    rows = query_dicts(sql, params)
+    rows = await aquery_dicts(sql, params)
     for r in rows:
         if r.get("salario_promedio"):
             r["salario_promedio"] = int(r["salario_promedio"])
+        # Median from the month's merged salary histograms (±1%)
+        mediana = histogram_quantile(r.pop("salario_sketch", None), 0.5)
+        r["salario_mediana"] = round(mediana) if mediana else None
     return rows
 
 
 @router.get("/skills")
-@cached(ttl_seconds=3600)
-def get_skills_demand(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_skills_demand(
     dane_code: str = Query(None),
     sector: str = Query(None),
     limit: int = Query(25, le=50),
 ):
     """Top habilidades demandadas (extraídas de ofertas)."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        counts = snap.skill_counts(snap.where(dane_code=dane_code, sector=sector))
+        return [{"skill": s, "demanda": c} for s, c in counts[:limit]]
     conditions = ["1=1"]
     params = {"lim": limit}
     if dane_code:
@@ -223,15 +511,93 @@ def get_skills_demand(
         ORDER BY demanda DESC
         LIMIT :lim
     """
-    return query_dicts(sql, params)
+    return await aquery_dicts(sql, params)
+
+
+def skills_cooccurrence_sql(where: str) -> str:
+    """Co-occurrence with :skill plus each skill's own frequency (for lift).
+    ``skills @> ARRAY[:skill]`` is served by the GIN index on ``skills``."""
+    return f"""
+        WITH base AS (
+            SELECT skills FROM empleo.ofertas_laborales WHERE {where}
+        ),
+        freq AS (
+            SELECT skill, COUNT(*) AS n FROM base, UNNEST(skills) AS skill GROUP BY skill
+        ),
+        co AS (
+            SELECT skill, COUNT(*) AS n
+            FROM base, UNNEST(skills) AS skill
+            WHERE base.skills @> ARRAY[CAST(:skill AS TEXT)] AND skill <> :skill
+            GROUP BY skill
+        )
+        SELECT co.skill, co.n AS ofertas, freq.n AS frecuencia,
+               (SELECT COUNT(*) FROM base) AS total,
+               (SELECT n FROM freq WHERE skill = :skill) AS base
+        FROM co JOIN freq USING (skill)
+        ORDER BY co.n DESC
+    """
+
+
+@router.get("/skills/co-occurrence")
+@cached(ttl_seconds=3600, max_entries=512, depends_on=("empleo",))
+async def get_skills_cooccurrence(
+    skill: str = Query(..., min_length=1, description="Habilidad de referencia"),
+    dane_code: str = Query(None),
+    sector: str = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+):
+    """Habilidades que se piden junto con ``skill`` en las mismas ofertas.
+
+    ``confianza`` es la fracción de las ofertas con ``skill`` que también piden
+    la otra habilidad; ``lift`` > 1 indica que aparecen juntas más de lo que
+    sus frecuencias harían esperar.
+    """
+    snap = await aget_snapshot()
+    if snap is not None:
+        mask = snap.where(dane_code=dane_code, sector=sector)
+        total = int(mask.sum())
+        base, pairs = snap.co_occurrence(skill, mask)
+        freq = dict(snap.skill_counts(mask)) if pairs else {}
+        pairs = [(s, n, freq[s]) for s, n in pairs[:limit]]
+    else:
+        conditions = ["1=1"]
+        params = {"skill": skill}
+        if dane_code:
+            conditions.append("dane_code = :dane")
+            params["dane"] = dane_code
+        if sector:
+            conditions.append("sector = :sector")
+            params["sector"] = sector
+        rows = await aquery_dicts(skills_cooccurrence_sql(" AND ".join(conditions)), params)
+        total = rows[0]["total"] if rows else 0
+        base = rows[0]["base"] if rows else 0
+        pairs = [(r["skill"], r["ofertas"], r["frecuencia"]) for r in rows[:limit]]
+
+    return {
+        "skill": skill,
+        "ofertas": base,
+        "total_ofertas": total,
+        "coocurrencias": [
+            {
+                "skill": s,
+                "ofertas": n,
+                "confianza": round(n / base, 3),
+                "lift": round(n * total / (base * f), 2),
+            }
+            for s, n, f in pairs
+        ],
+    }
 
 
 @router.get("/salarios")
-@cached(ttl_seconds=3600)
-def get_salary_analysis(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_salary_analysis(
     dane_code: str = Query(None),
 ):
     """Análisis de salarios por sector y municipio."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_salarios(snap, dane_code)
     conditions = ["salario_numerico IS NOT NULL"]
     params = {}
     if dane_code:
@@ -240,67 +606,110 @@ def get_salary_analysis(
 
     where = " AND ".join(conditions)
 
-    with engine.connect() as conn:
-        por_sector = conn.execute(text(f"""
-            SELECT sector,
-                   COUNT(*) as ofertas,
-                   ROUND(AVG(salario_numerico)) as promedio,
-                   MIN(salario_numerico) as minimo,
-                   MAX(salario_numerico) as maximo
-            FROM empleo.ofertas_laborales
-            WHERE {where}
-            GROUP BY sector
-            HAVING COUNT(*) >= 2
-            ORDER BY promedio DESC
-        """), params).fetchall()
-
-        por_municipio = conn.execute(text(f"""
-            SELECT municipio,
-                   COUNT(*) as ofertas,
-                   ROUND(AVG(salario_numerico)) as promedio,
-                   MIN(salario_numerico) as minimo,
-                   MAX(salario_numerico) as maximo
-            FROM empleo.ofertas_laborales
-            WHERE {where}
-            GROUP BY municipio
-            ORDER BY promedio DESC
-        """), params).fetchall()
-
-        rangos = conn.execute(text(f"""
-            SELECT
-                CASE
-                    WHEN salario_numerico < 1300000 THEN '< SMMLV'
-                    WHEN salario_numerico < 2000000 THEN '1-2 SMMLV'
-                    WHEN salario_numerico < 3000000 THEN '2-3 SMMLV'
-                    WHEN salario_numerico < 5000000 THEN '3-5 SMMLV'
-                    ELSE '> 5 SMMLV'
-                END as rango,
-                COUNT(*) as ofertas
-            FROM empleo.ofertas_laborales
-            WHERE {where}
-            GROUP BY rango
-            ORDER BY MIN(salario_numerico)
-        """), params).fetchall()
+    por_sector = await aquery_dicts(f"""
+        SELECT sector,
+               COUNT(*) as ofertas,
+               ROUND(AVG(salario_numerico)) as promedio,
+               MIN(salario_numerico) as minimo,
+               MAX(salario_numerico) as maximo
+        FROM empleo.ofertas_laborales
+        WHERE {where}
+        GROUP BY sector
+        HAVING COUNT(*) >= 2
+        ORDER BY promedio DESC
+    """, params)
+
+    por_municipio = await aquery_dicts(f"""
+        SELECT municipio,
+               COUNT(*) as ofertas,
+               ROUND(AVG(salario_numerico)) as promedio,
+               MIN(salario_numerico) as minimo,
+               MAX(salario_numerico) as maximo
+        FROM empleo.ofertas_laborales
+        WHERE {where}
+        GROUP BY municipio
+        ORDER BY promedio DESC
+    """, params)
+
+    rangos = await aquery_dicts(f"""
+        SELECT
+            CASE
+                WHEN salario_numerico < 1300000 THEN '< SMMLV'
+                WHEN salario_numerico < 2000000 THEN '1-2 SMMLV'
+                WHEN salario_numerico < 3000000 THEN '2-3 SMMLV'
+                WHEN salario_numerico < 5000000 THEN '3-5 SMMLV'
+                ELSE '> 5 SMMLV'
+            END as rango,
+            COUNT(*) as ofertas
+        FROM empleo.ofertas_laborales
+        WHERE {where}
+        GROUP BY rango
+        ORDER BY MIN(salario_numerico)
+    """, params)
 
     return {
-        "por_sector": [
-            {"sector": r[0], "ofertas": r[1], "promedio": int(r[2]), "minimo": r[3], "maximo": r[4]}
-            for r in por_sector
-        ],
-        "por_municipio": [
-            {"municipio": r[0], "ofertas": r[1], "promedio": int(r[2]), "minimo": r[3], "maximo": r[4]}
-            for r in por_municipio
-        ],
-        "rangos": [{"rango": r[0], "ofertas": r[1]} for r in rangos],
+        "por_sector": [{**r, "promedio": int(r["promedio"])} for r in por_sector],
+        "por_municipio": [{**r, "promedio": int(r["promedio"])} for r in por_municipio],
+        "rangos": rangos,
+    }
+
+
+SALARIO_DIMENSIONES = ("sector", "municipio", "nivel_educativo", "nivel_experiencia")
+
+
+@router.get("/salarios/percentiles")
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_salary_percentiles(
+    dane_code: str = Query(None),
+    sector: str = Query(None),
+    municipio: str = Query(None),
+    nivel_educativo: str = Query(None),
+    nivel_experiencia: str = Query(None),
+    por: str = Query(None, description="Agrupar por: sector, municipio, nivel_educativo y/o nivel_experiencia (separados por coma)"),
+    min_muestra: int = Query(1, ge=1, description="Mínimo de salarios por grupo"),
+):
+    """Mediana y percentiles salariales (p10/p25/p50/p75/p90) por cualquier
+    combinación de sector × municipio × nivel educativo × experiencia.
+
+    Se leen de los histogramas de empleo.salarios_rollup (±1%), sin ordenar
+    los salarios de cada oferta.
+    """
+    by = [d.strip() for d in por.split(",") if d.strip()] if por else []
+    invalid = [d for d in by if d not in SALARIO_DIMENSIONES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Dimensión no válida: {', '.join(invalid)}")
+    conditions = ["1=1"]
+    params = {}
+    filters = {"dane_code": dane_code, "sector": sector, "municipio": municipio,
+               "nivel_educativo": nivel_educativo, "nivel_experiencia": nivel_experiencia}
+    for col, value in filters.items():
+        if value:
+            conditions.append(f"{col} = :{col}")
+            params[col] = value
+    cells = await aquery_dicts(f"""
+        SELECT sector, municipio, nivel_educativo, nivel_experiencia,
+               salario_n, salario_suma, salario_sketch
+        FROM empleo.salarios_rollup
+        WHERE {" AND ".join(conditions)}
+    """, params)
+    return {
+        "percentiles": [f"p{round(q * 100)}" for q in PERCENTILES],
+        "grupos": salary_percentiles(cells, by, min_sample=min_muestra),
     }
 
 
 @router.get("/sectores")
-@cached(ttl_seconds=3600)
-def get_sectores_detalle(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_sectores_detalle(
     dane_code: str = Query(None),
+    exact: bool = Query(False, description=EXACT_DESCRIPTION),
 ):
     """Desglose detallado por sector económico."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        rows = _snapshot_by_group(snap, "sector", snap.where(dane_code=dane_code), exact,
+                                  empresas="empresa", municipios="municipio")
+        return sorted(rows, key=lambda r: -r["ofertas"])
     conditions = ["1=1"]
     params = {}
     if dane_code:
@@ -308,20 +717,29 @@ def get_sectores_detalle(
         params["dane"] = dane_code
 
     where = " AND ".join(conditions)
+    cells = ofertas_cells(await run_sync(rollup_available))
     sql = f"""
+        WITH cells AS (
+            SELECT * FROM {cells} WHERE {where}
+        ),
+        distinct_empresas AS (
+            SELECT sector, COUNT(DISTINCT e) AS empresas
+            FROM cells, UNNEST(empresas) AS e
+            GROUP BY sector
+        )
         SELECT
-            sector,
-            COUNT(*) as ofertas,
-            COUNT(DISTINCT empresa) as empresas,
-            COUNT(DISTINCT municipio) as municipios,
-            ROUND(AVG(salario_numerico)) as salario_promedio,
-            COUNT(CASE WHEN salario_numerico IS NOT NULL THEN 1 END) as con_salario
-        FROM empleo.ofertas_laborales
-        WHERE {where}
-        GROUP BY sector
+            c.sector,
+            SUM(c.ofertas)::int as ofertas,
+            COALESCE(MAX(e.empresas), 0) as empresas,
+            COUNT(DISTINCT c.municipio) as municipios,
+            ROUND(SUM(c.salario_suma)::numeric / NULLIF(SUM(c.salario_n), 0)) as salario_promedio,
+            SUM(c.salario_n)::int as con_salario
+        FROM cells c
+        LEFT JOIN distinct_empresas e ON e.sector IS NOT DISTINCT FROM c.sector
+        GROUP BY c.sector
         ORDER BY ofertas DESC
     """
-    rows = query_dicts(sql, params)
+    rows = await aquery_dicts(sql, params)
     for r in rows:
         if r.get("salario_promedio"):
             r["salario_promedio"] = int(r["salario_promedio"])
@@ -329,12 +747,22 @@ def get_sectores_detalle(
 
 
 @router.get("/empresas")
-@cached(ttl_seconds=3600)
-def get_empresas_ranking(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_empresas_ranking(
     dane_code: str = Query(None),
     limit: int = Query(20, le=50),
+    exact: bool = Query(False, description=EXACT_DESCRIPTION),
 ):
     """Ranking de empresas que más contratan."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        mask = _empresa_mask(snap, snap.where(dane_code=dane_code))
+        # Only the top empresas need distinct counts
+        top = [empresa for empresa, _ in snap.count_by("empresa", mask)[:limit]]
+        mask &= snap.isin("empresa", top)
+        rows = _snapshot_by_group(snap, "empresa", mask, exact, sectores="sector", municipios="municipio")
+        return [{k: r[k] for k in ("empresa", "ofertas", "sectores", "municipios", "salario_promedio")}
+                for r in sorted(rows, key=lambda r: -r["ofertas"])[:limit]]
     conditions = ["empresa IS NOT NULL", "empresa != 'No especificada'"]
     params = {"lim": limit}
     if dane_code:
@@ -355,7 +783,7 @@ def get_empresas_ranking(
         ORDER BY ofertas DESC
         LIMIT :lim
     """
-    rows = query_dicts(sql, params)
+    rows = await aquery_dicts(sql, params)
     for r in rows:
         if r.get("salario_promedio"):
             r["salario_promedio"] = int(r["salario_promedio"])
@@ -363,8 +791,8 @@ def get_empresas_ranking(
 
 
 @router.get("/mapa-calor")
-@cached(ttl_seconds=3600)
-def get_empleo_heatmap():
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_empleo_heatmap():
     """Datos para mapa de calor de ofertas por municipio (usando centroides)."""
     sql = """
         SELECT
@@ -379,24 +807,30 @@ def get_empleo_heatmap():
         GROUP BY o.municipio, o.dane_code, lm.geom
         ORDER BY ofertas DESC
     """
-    return query_dicts(sql)
+    return await aquery_dicts(sql)
 
 
 @router.get("/fuentes")
-def list_fuentes():
+async def list_fuentes():
     """Listar fuentes de empleo disponibles."""
     sql = """
         SELECT fuente, COUNT(*) as total
         FROM empleo.ofertas_laborales
         GROUP BY fuente ORDER BY total DESC
     """
-    return query_dicts(sql)
+    return await aquery_dicts(sql)
 
 
 @router.get("/kpis")
-@cached(ttl_seconds=3600)
-def get_empleo_kpis(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_empleo_kpis(
+    dane_code: str = Query(None),
+    exact: bool = Query(False, description=EXACT_DESCRIPTION),
+):
     """KPIs principales del mercado laboral para el dashboard."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_kpis(snap, dane_code, exact)
     conditions = ["1=1"]
     params = {}
     if dane_code:
@@ -404,91 +838,103 @@ def get_empleo_kpis(dane_code: str = Query(None)):
         params["dane"] = dane_code
 
     where = " AND ".join(conditions)
-    with engine.connect() as conn:
-        row = conn.execute(text(f"""
-            SELECT
-                COUNT(*) as total_ofertas,
-                COUNT(DISTINCT empresa) as total_empresas,
-                COUNT(DISTINCT sector) as total_sectores,
-                ROUND(AVG(salario_numerico)) as salario_promedio,
-                (SELECT sector FROM empleo.ofertas_laborales WHERE {where}
-                 GROUP BY sector ORDER BY COUNT(*) DESC LIMIT 1) as sector_top,
-                (SELECT empresa FROM empleo.ofertas_laborales
-                 WHERE {where} AND empresa IS NOT NULL AND empresa != 'No especificada'
-                 GROUP BY empresa ORDER BY COUNT(*) DESC LIMIT 1) as empresa_top
-            FROM empleo.ofertas_laborales
-            WHERE {where}
-        """), params).fetchone()
+    rows = await aquery_dicts(f"""
+        SELECT
+            COUNT(*) as total_ofertas,
+            COUNT(DISTINCT empresa) as total_empresas,
+            COUNT(DISTINCT sector) as total_sectores,
+            ROUND(AVG(salario_numerico)) as salario_promedio,
+            (SELECT sector FROM empleo.ofertas_laborales WHERE {where}
+             GROUP BY sector ORDER BY COUNT(*) DESC LIMIT 1) as sector_top,
+            (SELECT empresa FROM empleo.ofertas_laborales
+             WHERE {where} AND empresa IS NOT NULL AND empresa != 'No especificada'
+             GROUP BY empresa ORDER BY COUNT(*) DESC LIMIT 1) as empresa_top
+        FROM empleo.ofertas_laborales
+        WHERE {where}
+    """, params)
+    row = rows[0] if rows else None
 
     return {
-        "total_ofertas": row[0] if row else 0,
-        "total_empresas": row[1] if row else 0,
-        "total_sectores": row[2] if row else 0,
-        "salario_promedio": int(row[3]) if row and row[3] else None,
-        "sector_top": row[4] if row else None,
-        "empresa_top": row[5] if row else None,
+        "total_ofertas": row["total_ofertas"] if row else 0,
+        "total_empresas": row["total_empresas"] if row else 0,
+        "total_sectores": row["total_sectores"] if row else 0,
+        "salario_promedio": int(row["salario_promedio"]) if row and row["salario_promedio"] else None,
+        "sector_top": row["sector_top"] if row else None,
+        "empresa_top": row["empresa_top"] if row else None,
     }
 
 
 @router.get("/experiencia")
-@cached(ttl_seconds=3600)
-def get_experiencia_dist(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_experiencia_dist(dane_code: str = Query(None)):
     """Distribución por nivel de experiencia requerida."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_distribution(snap, "nivel_experiencia", "nivel", dane_code)
     conditions = ["nivel_experiencia IS NOT NULL"]
     params = {}
     if dane_code:
         conditions.append("dane_code = :dane")
         params["dane"] = dane_code
     where = " AND ".join(conditions)
-    return query_dicts(
+    return await aquery_dicts(
         f"SELECT nivel_experiencia as nivel, COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where} GROUP BY nivel_experiencia ORDER BY total DESC",
         params,
     )
 
 
 @router.get("/contratos")
-@cached(ttl_seconds=3600)
-def get_contratos_dist(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_contratos_dist(dane_code: str = Query(None)):
     """Distribución por tipo de contrato."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_distribution(snap, "tipo_contrato", "tipo", dane_code)
     conditions = ["tipo_contrato IS NOT NULL"]
     params = {}
     if dane_code:
         conditions.append("dane_code = :dane")
         params["dane"] = dane_code
     where = " AND ".join(conditions)
-    return query_dicts(
+    return await aquery_dicts(
         f"SELECT tipo_contrato as tipo, COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where} GROUP BY tipo_contrato ORDER BY total DESC",
         params,
     )
 
 
 @router.get("/educacion")
-@cached(ttl_seconds=3600)
-def get_educacion_dist(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_educacion_dist(dane_code: str = Query(None)):
     """Distribución por nivel educativo requerido."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_distribution(snap, "nivel_educativo", "nivel", dane_code)
     conditions = ["nivel_educativo IS NOT NULL"]
     params = {}
     if dane_code:
         conditions.append("dane_code = :dane")
         params["dane"] = dane_code
     where = " AND ".join(conditions)
-    return query_dicts(
+    return await aquery_dicts(
         f"SELECT nivel_educativo as nivel, COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where} GROUP BY nivel_educativo ORDER BY total DESC",
         params,
     )
 
 
 @router.get("/modalidad")
-@cached(ttl_seconds=3600)
-def get_modalidad_dist(dane_code: str = Query(None)):
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_modalidad_dist(dane_code: str = Query(None)):
     """Distribución por modalidad de trabajo."""
+    snap = await aget_snapshot()
+    if snap is not None:
+        return _snapshot_distribution(snap, "modalidad", "modalidad", dane_code)
     conditions = ["modalidad IS NOT NULL"]
     params = {}
     if dane_code:
         conditions.append("dane_code = :dane")
         params["dane"] = dane_code
     where = " AND ".join(conditions)
-    return query_dicts(
+    return await aquery_dicts(
         f"SELECT modalidad, COUNT(*) as total FROM empleo.ofertas_laborales WHERE {where} GROUP BY modalidad ORDER BY total DESC",
         params,
     )
@@ -534,8 +980,8 @@ SKILL_CATEGORIES = {
 
 
 @router.get("/skills-categorized")
-@cached(ttl_seconds=3600)
-def get_skills_categorized(
+@cached(ttl_seconds=3600, max_stale_seconds=CACHE_MAX_STALE_SECONDS, depends_on=("empleo",))
+async def get_skills_categorized(
     dane_code: str = Query(None),
     limit: int = Query(50, le=100),
 ):
@@ -547,14 +993,19 @@ def get_skills_categorized(
         params["dane"] = dane_code
     where = " AND ".join(conditions)
 
-    skills = query_dicts(f"""
-        SELECT skill, COUNT(*) as demanda
-        FROM empleo.ofertas_laborales, UNNEST(skills) AS skill
-        WHERE {where}
-        GROUP BY skill
-        ORDER BY demanda DESC
-        LIMIT :lim
-    """, params)
+    snap = await aget_snapshot()
+    if snap is not None:
+        skills = [{"skill": s, "demanda": c}
+                  for s, c in snap.skill_counts(snap.where(dane_code=dane_code))[:limit]]
+    else:
+        skills = await aquery_dicts(f"""
+            SELECT skill, COUNT(*) as demanda
+            FROM empleo.ofertas_laborales, UNNEST(skills) AS skill
+            WHERE {where}
+            GROUP BY skill
+            ORDER BY demanda DESC
+            LIMIT :lim
+        """, params)
 
     # Build reverse lookup: skill -> category
     skill_to_cat = {}
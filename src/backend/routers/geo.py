@@ -3,14 +3,14 @@ Endpoints geoespaciales — manzanas con datos, heatmaps, filtros espaciales
 """
 import math
 from fastapi import APIRouter, HTTPException, Query
-from ..database import engine, query_dicts, query_geojson
-from sqlalchemy import text
+from ..database import aquery_dicts, aquery_geojson
+from ..services.pagination import decode_cursor, encode_cursor, estimate_count, fetch_keyset_page
 
 router = APIRouter(prefix="/api/geo", tags=["Geoespacial"])
 
 
 @router.get("/manzanas")
-def get_manzanas(
+async def get_manzanas(
     dane_code: str = Query(None, description="Filtrar por código DANE del municipio (ej: 05045)"),
     min_pop: int = Query(0, description="Población mínima"),
     max_pop: int = Query(999999, description="Población máxima"),
@@ -35,13 +35,13 @@ def get_manzanas(
         LIMIT :lim
     """
     try:
-        return query_geojson(sql, params)
+        return await aquery_geojson(sql, params)
     except Exception:
         return {"type": "FeatureCollection", "features": []}
 
 
 @router.get("/edificaciones")
-def get_edificaciones(
+async def get_edificaciones(
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     building_type: str = Query(None, description="Filtro tipo edificación"),
     limit: int = Query(5000, le=10000),
@@ -60,11 +60,11 @@ def get_edificaciones(
         
     where = "WHERE " + " AND ".join(conditions)
     sql = f"SELECT geom, id, building, name, amenity FROM cartografia.osm_edificaciones {where} LIMIT :lim"
-    return query_geojson(sql, params)
+    return await aquery_geojson(sql, params)
 
 
 @router.get("/vias")
-def get_vias(
+async def get_vias(
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     highway_type: str = Query(None, description="Tipo de vía (primary, secondary, residential, etc)"),
     limit: int = Query(5000, le=10000),
@@ -83,11 +83,11 @@ def get_vias(
 
     where = "WHERE " + " AND ".join(conditions)
     sql = f"SELECT geom, id, highway, name, surface, lanes FROM cartografia.osm_vias {where} LIMIT :lim"
-    return query_geojson(sql, params)
+    return await aquery_geojson(sql, params)
 
 
 @router.get("/amenidades")
-def get_amenidades(
+async def get_amenidades(
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     amenity_type: str = Query(None, description="Tipo de amenidad (school, hospital, etc)"),
 ):
@@ -105,11 +105,11 @@ def get_amenidades(
 
     where = "WHERE " + " AND ".join(conditions)
     sql = f"SELECT geom, id, amenity, name, phone, website FROM cartografia.osm_amenidades {where} LIMIT 2000"
-    return query_geojson(sql, params)
+    return await aquery_geojson(sql, params)
 
 
 @router.get("/places")
-def get_google_places(
+async def get_google_places(
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     category: str = Query(None, description="Categoría (Restaurantes, Bancos, etc)"),
     min_rating: float = Query(0, description="Rating mínimo"),
@@ -138,11 +138,11 @@ def get_google_places(
         WHERE {where}
         LIMIT :lim
     """
-    return query_geojson(sql, params)
+    return await aquery_geojson(sql, params)
 
 
 @router.get("/places/directory")
-def get_places_directory(
+async def get_places_directory(
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     category: str = Query(None, description="Categoría"),
     search: str = Query(None, description="Búsqueda por nombre o dirección"),
@@ -151,6 +151,9 @@ def get_places_directory(
     sort_order: str = Query("asc", description="asc o desc"),
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
+    mode: str = Query("offset", pattern="^(offset|cursor)$",
+                      description="offset: páginas numeradas; cursor: paginación por llave (keyset)"),
+    cursor: str = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
 ):
     """Directorio paginado de negocios para el dashboard."""
     conditions = ["1=1"]
@@ -171,16 +174,46 @@ def get_places_directory(
 
     where = " AND ".join(conditions)
 
-    # Count total
-    count_sql = f"SELECT COUNT(*) as total FROM servicios.google_places_regional WHERE {where}"
-    count_row = query_dicts(count_sql, params)
-    total = count_row[0]["total"] if count_row else 0
-
     # Sorting
     allowed_sort = {"name": "name", "category": "category", "rating": "rating", "user_ratings_total": "user_ratings_total"}
     sort_col = allowed_sort.get(sort_by, "name")
     order = "DESC" if sort_order.lower() == "desc" else "ASC"
 
+    if mode == "cursor":
+        after = None
+        if cursor:
+            try:
+                cur_sort, cur_order, *after = decode_cursor(cursor, 4)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+            if (cur_sort, cur_order) != (sort_col, order):
+                raise HTTPException(status_code=400,
+                                    detail="El cursor corresponde a otro orden (sort_by/sort_order)")
+        items = await fetch_keyset_page(
+            """SELECT place_id, name, category, address, rating,
+                      user_ratings_total, lat, lon
+               FROM servicios.google_places_regional""",
+            where, params, sort_col, "place_id", after, page_size + 1,
+            descending=order == "DESC",
+        )
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        last = items[-1] if items else None
+        total = None if cursor else await estimate_count(
+            f"servicios.google_places_regional WHERE {where}", params)
+        return {
+            "items": items,
+            "next_cursor": (encode_cursor(sort_col, order, last[sort_col], last["place_id"])
+                            if has_more else None),
+            "page_size": page_size,
+            "total_estimate": total,
+        }
+
+    # Count total
+    count_sql = f"SELECT COUNT(*) as total FROM servicios.google_places_regional WHERE {where}"
+    count_row = await aquery_dicts(count_sql, params)
+    total = count_row[0]["total"] if count_row else 0
+
     offset = (page - 1) * page_size
     params["lim"] = page_size
     params["off"] = offset
@@ -190,10 +223,10 @@ def get_places_directory(
                user_ratings_total, lat, lon
         FROM servicios.google_places_regional
         WHERE {where}
-        ORDER BY {sort_col} {order} NULLS LAST
+        ORDER BY {sort_col} {order} NULLS LAST, place_id {order}
         LIMIT :lim OFFSET :off
     """
-    items = query_dicts(sql, params)
+    items = await aquery_dicts(sql, params)
 
     return {
         "items": items,
@@ -205,16 +238,14 @@ def get_places_directory(
 
 
 @router.get("/places/categories")
-def get_places_categories():
+async def get_places_categories():
     """Listar categorías de Google Places con conteos."""
     sql = "SELECT category, COUNT(*) as count FROM servicios.google_places_regional GROUP BY category ORDER BY count DESC"
-    with engine.connect() as conn:
-        rows = conn.execute(text(sql)).fetchall()
-    return [{"category": r[0], "count": r[1]} for r in rows]
+    return await aquery_dicts(sql)
 
 
 @router.get("/places/heatmap")
-def get_places_heatmap(
+async def get_places_heatmap(
     dane_code: str = Query(None),
     category: str = Query(None)
 ):
@@ -236,24 +267,23 @@ def get_places_heatmap(
         FROM servicios.google_places_regional
         {where}
     """
-    with engine.connect() as conn:
-        rows = conn.execute(text(sql), params).fetchall()
-    return [{"lat": float(r[0]), "lon": float(r[1]), "weight": int(r[2])} for r in rows]
+    rows = await aquery_dicts(sql, params)
+    return [{"lat": float(r["lat"]), "lon": float(r["lon"]), "weight": int(r["weight"])} for r in rows]
 
 
 @router.get("/uraba")
-def get_uraba_region():
+async def get_uraba_region():
     """Municipios de la región de Urabá para contexto regional."""
     sql = """
         SELECT geometry, "MpCodigo" as codigo, "MpNombre" as nombre,
                "MpArea" as area_km2, "Depto" as departamento
         FROM cartografia.igac_uraba
     """
-    return query_geojson(sql, geom_col="geometry")
+    return await aquery_geojson(sql, geom_col="geometry")
 
 
 @router.get("/municipios/centroids")
-def get_municipios_centroids():
+async def get_municipios_centroids():
     """Centroides de los municipios de Urabá para labels en el mapa."""
     sql = """
         SELECT dane_code, nombre,
@@ -262,9 +292,8 @@ def get_municipios_centroids():
         FROM cartografia.limite_municipal
         ORDER BY nombre
     """
-    with engine.connect() as conn:
-        rows = conn.execute(text(sql)).fetchall()
+    rows = await aquery_dicts(sql)
     return [
-        {"dane_code": r[0], "nombre": r[1], "lat": float(r[2]), "lon": float(r[3])}
+        {"dane_code": r["dane_code"], "nombre": r["nombre"], "lat": float(r["lat"]), "lon": float(r["lon"])}
         for r in rows
     ]
@@ -2,8 +2,7 @@
 Gestión de capas — catálogo de todas las capas disponibles
 """
 from fastapi import APIRouter, HTTPException, Query
-from ..database import engine, cached, query_geojson
-from sqlalchemy import text
+from ..database import cached, aquery_dicts, aquery_dicts_batch, aquery_geojson
 
 router = APIRouter(prefix="/api/layers", tags=["Capas"])
 
@@ -86,24 +85,24 @@ LAYERS_CATALOG = [
 
 
 @router.get("")
-@cached(ttl_seconds=600)
-def list_layers():
+@cached(ttl_seconds=600, depends_on=("cartografia", "servicios"))
+async def list_layers():
     """Listar todas las capas disponibles con conteo de registros."""
-    counts = {}
-    with engine.connect() as conn:
-        for layer in LAYERS_CATALOG:
-            try:
-                cnt = conn.execute(
-                    text(f"SELECT COUNT(*) FROM {layer['schema']}.{layer['table']}")
-                ).scalar()
-                counts[layer["id"]] = cnt
-            except Exception:
-                counts[layer["id"]] = 0
+    # One connection, one SAVEPOINT per layer: a missing table counts as 0
+    results = await aquery_dicts_batch([
+        (f"SELECT COUNT(*) AS cnt FROM {layer['schema']}.{layer['table']}", None)
+        for layer in LAYERS_CATALOG
+    ])
+    counts = {
+        layer["id"]: rows[0]["cnt"] if rows else 0
+        for layer, rows in zip(LAYERS_CATALOG, results)
+    }
     return [{**layer, "record_count": counts.get(layer["id"], 0)} for layer in LAYERS_CATALOG]
 
 
 @router.get("/{layer_id}/geojson")
-def get_layer_geojson(
+@cached(ttl_seconds=3600, max_bytes=64 * 1024 * 1024, depends_on=("cartografia", "servicios"), encoded=True)
+async def get_layer_geojson(
     layer_id: str,
     dane_code: str = Query(None, description="Filtrar por código DANE"),
     limit: int = 5000
@@ -129,36 +128,33 @@ def get_layer_geojson(
     
     where = "WHERE " + " AND ".join(conditions)
     sql = f"SELECT * FROM {layer['schema']}.{layer['table']} {where} LIMIT :lim"
-    return query_geojson(sql, params, geom_col=gc)
+    return await aquery_geojson(sql, params, geom_col=gc)
 
 
 @router.get("/{layer_id}/stats")
-def get_layer_stats(layer_id: str):
+async def get_layer_stats(layer_id: str):
     """Estadísticas básicas de una capa (bbox, conteo, columnas)."""
     layer = next((l for l in LAYERS_CATALOG if l["id"] == layer_id), None)
     if not layer:
         raise HTTPException(status_code=404, detail=f"Capa '{layer_id}' no encontrada")
 
     gc = layer.get("geom_col", "geom")
-    with engine.connect() as conn:
-        count = conn.execute(
-            text(f"SELECT COUNT(*) FROM {layer['schema']}.{layer['table']}")
-        ).scalar()
-        bbox = conn.execute(
-            text(f"SELECT ST_Extent({gc})::text FROM {layer['schema']}.{layer['table']}")
-        ).scalar()
-        cols = conn.execute(
-            text(
-                "SELECT column_name, data_type FROM information_schema.columns "
-                "WHERE table_schema = :s AND table_name = :t ORDER BY ordinal_position"
-            ),
-            {"s": layer["schema"], "t": layer["table"]},
-        ).fetchall()
+    count = (await aquery_dicts(
+        f"SELECT COUNT(*) AS cnt FROM {layer['schema']}.{layer['table']}"
+    ))[0]["cnt"]
+    bbox = (await aquery_dicts(
+        f"SELECT ST_Extent({gc})::text AS bbox FROM {layer['schema']}.{layer['table']}"
+    ))[0]["bbox"]
+    cols = await aquery_dicts(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = :s AND table_name = :t ORDER BY ordinal_position",
+        {"s": layer["schema"], "t": layer["table"]},
+    )
 
     return {
         "layer_id": layer_id,
         "name": layer["name"],
         "record_count": count,
         "bbox": bbox,
-        "columns": [{"name": c[0], "type": c[1]} for c in cols],
+        "columns": [{"name": c["column_name"], "type": c["data_type"]} for c in cols],
     }
@@ -3,8 +3,9 @@ Resumen ejecutivo regional y por municipio
 """
 import logging
 from fastapi import APIRouter, Query
-from ..database import engine, cached, query_dicts
+from ..database import engine, cached, aquery_dicts, run_sync
 from sqlalchemy import text
+from ..services.terridata import get_cube
 
 logger = logging.getLogger("observatorio.stats")
 
@@ -37,16 +38,19 @@ def _safe_row(conn, sql, params):
         return None
 
 
-def _terridata_value(conn, indicador, params, where):
+def _terridata_value(cube, indicador, dane):
     """Get latest numeric value from TerriData for a given indicator."""
-    sql = f"SELECT dato_numerico, anio FROM socioeconomico.terridata {where} AND indicador = :ind ORDER BY anio DESC LIMIT 1"
-    row = _safe_row(conn, sql, {**params, "ind": indicador})
-    return (row[0], row[1]) if row and row[0] is not None else (None, None)
+    return cube.latest(indicador, dane) if cube is not None else (None, None)
 
 
 @router.get("/summary")
-@cached(ttl_seconds=600)
-def get_summary(dane_code: str = Query(None)):
+@cached(ttl_seconds=600, depends_on=("socioeconomico", "seguridad", "servicios", "cartografia"))
+async def get_summary(dane_code: str = Query(None)):
+    # ~20 dependent scalar lookups with fallbacks on one connection; runs off the event loop
+    return await run_sync(_build_summary, dane_code)
+
+
+def _build_summary(dane_code: str | None) -> dict:
     dane = dane_code.zfill(5) if dane_code and dane_code.isdigit() else dane_code
 
     stats = {
@@ -59,9 +63,15 @@ def get_summary(dane_code: str = Query(None)):
     params = {"dane": dane} if dane else {}
     where = "WHERE dane_code = :dane" if dane else "WHERE 1=1"
 
+    try:
+        cube = get_cube()
+    except Exception as e:
+        logger.warning("TerriData cube unavailable: %s", e)
+        cube = None
+
     with engine.connect() as conn:
         # 1. Población total (TerriData)
-        pop, pop_year = _terridata_value(conn, "Población total", params, where)
+        pop, pop_year = _terridata_value(cube, "Población total", dane)
         stats["poblacion_total"] = int(pop) if pop else None
         stats["poblacion_anio"] = pop_year
 
@@ -79,7 +89,7 @@ def get_summary(dane_code: str = Query(None)):
         val = _safe_scalar(conn, f"SELECT COUNT(*) FROM socioeconomico.establecimientos_educativos {where}", params)
         if not val:
             # Fallback: TerriData "Número de sedes educativas" or similar
-            td_val, _ = _terridata_value(conn, "Número de sedes educativas en el sector oficial", params, where)
+            td_val, _ = _terridata_value(cube, "Número de sedes educativas en el sector oficial", dane)
             val = int(td_val) if td_val else 0
         stats["establecimientos_educativos"] = val
 
@@ -87,7 +97,7 @@ def get_summary(dane_code: str = Query(None)):
         val = _safe_scalar(
             conn, f"SELECT SUM(total_matricula) FROM socioeconomico.establecimientos_educativos {where}", params)
         if not val:
-            td_val, _ = _terridata_value(conn, "Cobertura neta en educación", params, where)
+            td_val, _ = _terridata_value(cube, "Cobertura neta en educación", dane)
             stats["matricula_total"] = int(td_val) if td_val else 0
         else:
             stats["matricula_total"] = val
@@ -103,7 +113,7 @@ def get_summary(dane_code: str = Query(None)):
         # 8. Homicidios (tabla seguridad → fallback TerriData tasa)
         h_val = _safe_scalar(conn, f"SELECT SUM(cantidad) FROM seguridad.homicidios {where}", params, default=None)
         if not h_val:
-            td_val, _ = _terridata_value(conn, "Tasa de homicidios por cada 100.000 habitantes", params, where)
+            td_val, _ = _terridata_value(cube, "Tasa de homicidios por cada 100.000 habitantes", dane)
             if td_val and pop:
                 h_val = int(td_val * pop / 100000)
             else:
@@ -113,7 +123,7 @@ def get_summary(dane_code: str = Query(None)):
         # 9. Hurtos (tabla seguridad → fallback TerriData tasa)
         hu_val = _safe_scalar(conn, f"SELECT SUM(cantidad) FROM seguridad.hurtos {where}", params, default=None)
         if not hu_val:
-            td_val, _ = _terridata_value(conn, "Tasa de hurto común por cada 100.000 habitantes", params, where)
+            td_val, _ = _terridata_value(cube, "Tasa de hurto común por cada 100.000 habitantes", dane)
             if td_val and pop:
                 hu_val = int(td_val * pop / 100000)
             else:
@@ -123,7 +133,7 @@ def get_summary(dane_code: str = Query(None)):
         # 10. Violencia intrafamiliar
         vif_val = _safe_scalar(conn, f"SELECT SUM(cantidad) FROM seguridad.violencia_intrafamiliar {where}", params, default=None)
         if not vif_val:
-            td_val, _ = _terridata_value(conn, "Tasa de violencia intrafamiliar por cada 100.000 habitantes", params, where)
+            td_val, _ = _terridata_value(cube, "Tasa de violencia intrafamiliar por cada 100.000 habitantes", dane)
             if td_val and pop:
                 vif_val = int(td_val * pop / 100000)
             else:
@@ -140,8 +150,8 @@ def get_summary(dane_code: str = Query(None)):
         icfes_avg = round(icfes_row[0], 1) if icfes_row and icfes_row[0] else None
         if not icfes_avg:
             # Fallback: TerriData Saber 11 scores
-            td_mat, _ = _terridata_value(conn, "Puntaje promedio Pruebas Saber 11 - Matemáticas", params, where)
-            td_lec, _ = _terridata_value(conn, "Puntaje promedio Pruebas Saber 11 - Lectura crítica", params, where)
+            td_mat, _ = _terridata_value(cube, "Puntaje promedio Pruebas Saber 11 - Matemáticas", dane)
+            td_lec, _ = _terridata_value(cube, "Puntaje promedio Pruebas Saber 11 - Lectura crítica", dane)
             if td_mat and td_lec:
                 icfes_avg = round((td_mat + td_lec) / 2, 1)
         stats["icfes"] = {"promedio_global": icfes_avg} if icfes_avg else None
@@ -163,18 +173,18 @@ def get_summary(dane_code: str = Query(None)):
 
 @router.get("/catalog-summary")
 @cached(ttl_seconds=3600)
-def get_catalog_summary():
+async def get_catalog_summary():
     try:
-        with engine.connect() as conn:
-            # Safer query for record count
-            sql = """
-                SELECT COUNT(*) as tables, 
-                       COALESCE(SUM(n_live_tup), 0) as records 
-                FROM pg_stat_user_tables 
-                WHERE schemaname IN ('cartografia','socioeconomico','seguridad','servicios','catastro')
-            """
-            row = conn.execute(text(sql)).fetchone()
-            return {"tables": row[0] or 0, "records": int(row[1]) if row and row[1] else 0}
+        # Safer query for record count
+        sql = """
+            SELECT COUNT(*) as tables, 
+                   COALESCE(SUM(n_live_tup), 0) as records 
+            FROM pg_stat_user_tables 
+            WHERE schemaname IN ('cartografia','socioeconomico','seguridad','servicios','catastro')
+        """
+        rows = await aquery_dicts(sql)
+        row = rows[0] if rows else {}
+        return {"tables": row.get("tables") or 0, "records": int(row["records"]) if row.get("records") else 0}
     except Exception as e: 
         print(f"Catalog summary error: {e}")
         return {"tables": 0, "records": 0}
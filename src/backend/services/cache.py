@@ -0,0 +1,510 @@
+"""
+In-process cache engine for the Observatorio API.
+
+Each ``@cached`` endpoint gets its own namespace with an entry budget and a
+byte budget. Entries are evicted in LRU order when either budget is exceeded,
+and expired entries are swept periodically so idle keys do not pin memory.
+Per-namespace counters (hits, misses, evictions, expirations) are exposed
+through ``CacheRegistry.stats()`` for sizing against real traffic.
+
+Concurrent misses on the same key are coalesced by ``SingleFlight``: one
+caller computes the value while the others wait for its result, so an
+expiring hot entry triggers a single database aggregation instead of one
+per in-flight request.
+
+Namespaces can also serve stale-while-revalidate: once an entry's TTL has
+passed it is still returned (up to a maximum staleness) while a background
+thread recomputes it, keeping latency flat across TTL boundaries.
+
+A registry may be given a shared backend (see ``shared_cache``). The
+in-process store then acts as an L1 tier in front of it: L1 misses are
+looked up in the shared tier before computing, and new values are written
+through to both.
+
+Coroutine endpoints use ``aload``, the asyncio counterpart of ``load``:
+misses are coalesced with ``AsyncSingleFlight`` and stale entries are
+refreshed in a background task on the running event loop.
+"""
+import asyncio
+import logging
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("observatorio.cache")
+
+
+def estimate_size(value) -> int:
+    """Approximate the memory footprint of a cached value in bytes."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    stored_at: float
+    expires_at: float
+    size: int
+    fresh_until: float = None
+
+    def __post_init__(self):
+        if self.fresh_until is None:
+            self.fresh_until = self.expires_at
+
+    def is_fresh(self, now: float) -> bool:
+        return self.fresh_until > now
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    rejected: int = 0
+    coalesced: int = 0
+    shared_hits: int = 0
+    stale_hits: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    refresh_seconds_total: float = 0.0
+    refresh_seconds_max: float = 0.0
+    last_refresh_seconds: float = None
+
+    def record_refresh(self, seconds: float):
+        self.refreshes += 1
+        self.refresh_seconds_total += seconds
+        self.refresh_seconds_max = max(self.refresh_seconds_max, seconds)
+        self.last_refresh_seconds = seconds
+
+    def as_dict(self) -> dict:
+        d = dict(self.__dict__)
+        for k in ("refresh_seconds_total", "refresh_seconds_max", "last_refresh_seconds"):
+            if d[k] is not None:
+                d[k] = round(d[k], 4)
+        return d
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent callers share it."""
+
+    def __init__(self):
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return ``(result, shared)``; *shared* is True for callers that waited."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def is_running(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of ``SingleFlight``: one computation per key per event loop."""
+
+    def __init__(self):
+        self._calls: dict = {}
+
+    async def do(self, key, fn):
+        """Await ``fn()`` once per key; returns ``(result, shared)`` like ``SingleFlight.do``."""
+        loop = asyncio.get_running_loop()
+        fut = self._calls.get(key)
+        if fut is not None and fut.get_loop() is loop:
+            return await asyncio.shield(fut), True
+
+        fut = self._calls[key] = loop.create_future()
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                fut.cancel()
+            else:
+                fut.set_exception(e)
+                fut.exception()  # retrieved here; waiters re-raise it
+            raise
+        else:
+            fut.set_result(result)
+        finally:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+        return result, False
+
+    def is_running(self, key) -> bool:
+        return key in self._calls
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+@dataclass
+class CacheNamespace:
+    """
+    LRU/TTL store for a single endpoint.
+
+    Args:
+        name: Namespace identifier (usually ``module.function``).
+        max_entries: Max number of keys kept before evicting the LRU entry.
+        max_bytes: Max approximate payload bytes kept before evicting.
+    """
+
+    name: str
+    max_entries: int
+    max_bytes: int
+    stats: CacheStats = field(default_factory=CacheStats)
+    backend: object = None
+
+    def __post_init__(self):
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.flight = SingleFlight()
+        self.aflight = AsyncSingleFlight()
+        self._tasks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def get(self, key, now: float = None):
+        """Return the live entry for *key* (refreshing its LRU position) or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry.expires_at <= now:
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry
+
+    def peek(self, key, now: float = None):
+        """Return the entry for *key* only if it is still fresh, without touching
+        counters or LRU order."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry if entry is not None and entry.is_fresh(now) else None
+
+    def load(self, key, compute, ttl_seconds: float, max_stale_seconds: float = 0):
+        """Return the cached value for *key*, computing it once across threads on a miss.
+
+        With *max_stale_seconds* > 0 an expired entry keeps being served for
+        that long after its TTL while a background thread refreshes it.
+        """
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is not None:
+            if entry.is_fresh(now):
+                return entry.value
+            with self._lock:
+                self.stats.stale_hits += 1
+            self._refresh_in_background(key, compute, ttl_seconds, max_stale_seconds)
+            return entry.value
+
+        def leader():
+            entry = self._recheck(key)
+            if entry is not None:
+                return entry.value
+            value = compute()
+            self.set(key, value, ttl_seconds, max_stale_seconds=max_stale_seconds)
+            return value
+
+        value, shared = self.flight.do(key, leader)
+        if shared:
+            with self._lock:
+                self.stats.coalesced += 1
+        return value
+
+    async def aload(self, key, compute, ttl_seconds: float, max_stale_seconds: float = 0):
+        """``load`` for coroutine computations: *compute* is an async callable."""
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is not None:
+            if entry.is_fresh(now):
+                return entry.value
+            with self._lock:
+                self.stats.stale_hits += 1
+            self._arefresh_in_background(key, compute, ttl_seconds, max_stale_seconds)
+            return entry.value
+
+        async def leader():
+            entry = self._recheck(key)
+            if entry is not None:
+                return entry.value
+            value = await compute()
+            self.set(key, value, ttl_seconds, max_stale_seconds=max_stale_seconds)
+            return value
+
+        value, shared = await self.aflight.do(key, leader)
+        if shared:
+            with self._lock:
+                self.stats.coalesced += 1
+        return value
+
+    def _lookup(self, key, now: float):
+        entry = self.get(key, now)
+        if entry is None and self.backend is not None:
+            entry = self._load_shared(key, now)
+        return entry
+
+    def _recheck(self, key):
+        # A previous leader (or another worker) may have filled the entry meanwhile
+        now = time.time()
+        entry = self.peek(key, now)
+        if entry is None and self.backend is not None:
+            entry = self._load_shared(key, now)
+        return entry if entry is not None and entry.is_fresh(now) else None
+
+    def _load_shared(self, key, now: float):
+        entry = self.backend.get(self.name, key, now)
+        if entry is None:
+            return None
+        with self._lock:
+            self.stats.shared_hits += 1
+            self._store(key, entry)
+        return entry
+
+    def _refresh_in_background(self, key, compute, ttl_seconds, max_stale_seconds):
+        if self.flight.is_running(key):
+            return
+
+        def refresh():
+            started = time.perf_counter()
+            value = compute()
+            self.set(key, value, ttl_seconds, max_stale_seconds=max_stale_seconds)
+            with self._lock:
+                self.stats.record_refresh(time.perf_counter() - started)
+
+        def run():
+            try:
+                self.flight.do(key, refresh)
+            except Exception as e:
+                with self._lock:
+                    self.stats.refresh_errors += 1
+                logger.warning("Background refresh failed for %s: %s", self.name, e)
+
+        threading.Thread(target=run, name=f"cache-refresh:{self.name}", daemon=True).start()
+
+    def _arefresh_in_background(self, key, compute, ttl_seconds, max_stale_seconds):
+        if self.aflight.is_running(key):
+            return
+
+        async def refresh():
+            started = time.perf_counter()
+            value = await compute()
+            self.set(key, value, ttl_seconds, max_stale_seconds=max_stale_seconds)
+            with self._lock:
+                self.stats.record_refresh(time.perf_counter() - started)
+
+        async def run():
+            try:
+                await self.aflight.do(key, refresh)
+            except Exception as e:
+                with self._lock:
+                    self.stats.refresh_errors += 1
+                logger.warning("Background refresh failed for %s: %s", self.name, e)
+
+        # Keep a reference so the task is not garbage-collected mid-flight
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def set(self, key, value, ttl_seconds: float, now: float = None,
+            max_stale_seconds: float = 0) -> bool:
+        """Store *value* under *key*. Returns False if it exceeds the byte budget."""
+        now = time.time() if now is None else now
+        blob = self.backend.dumps(value) if self.backend is not None else None
+        size = len(blob) if blob is not None else estimate_size(value)
+        entry = CacheEntry(
+            value, now, now + ttl_seconds + max_stale_seconds, size,
+            fresh_until=now + ttl_seconds,
+        )
+        if blob is not None:
+            self.backend.set(self.name, key, blob, entry)
+        with self._lock:
+            return self._store(key, entry)
+
+    def _store(self, key, entry: CacheEntry) -> bool:
+        if key in self._entries:
+            self._remove(key)
+        if entry.size > self.max_bytes:
+            self.stats.rejected += 1
+            return False
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        return True
+
+    def purge_expired(self, now: float = None) -> int:
+        """Drop every expired entry. Returns how many were removed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.expires_at <= now]
+            for k in stale:
+                self._remove(k)
+            self.stats.expirations += len(stale)
+            return len(stale)
+
+    def purge_where(self, predicate) -> int:
+        """Drop every entry whose key satisfies *predicate*."""
+        with self._lock:
+            doomed = [k for k in self._entries if predicate(k)]
+            for k in doomed:
+                self._remove(k)
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "in_flight": self.flight.in_flight() + self.aflight.in_flight(),
+                **self.stats.as_dict(),
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.stats.evictions += 1
+
+
+class CacheRegistry:
+    """
+    Collection of cache namespaces with shared defaults and periodic sweeping.
+
+    Args:
+        max_entries: Default per-namespace entry budget.
+        max_bytes: Default per-namespace byte budget.
+        sweep_interval: Seconds between active expiry sweeps across namespaces.
+        backend: Optional shared tier placed behind every namespace.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024,
+                 sweep_interval: float = 60.0, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.backend = backend
+        self._namespaces: dict[str, CacheNamespace] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_interval
+
+    def namespace(self, name: str, max_entries: int = None, max_bytes: int = None) -> CacheNamespace:
+        """Get or create the namespace *name*, applying any explicit budgets."""
+        with self._lock:
+            ns = self._namespaces.get(name)
+            if ns is None:
+                ns = CacheNamespace(
+                    name,
+                    max_entries or self.max_entries,
+                    max_bytes or self.max_bytes,
+                    backend=self.backend,
+                )
+                self._namespaces[name] = ns
+            else:
+                if max_entries:
+                    ns.max_entries = max_entries
+                if max_bytes:
+                    ns.max_bytes = max_bytes
+            return ns
+
+    def maybe_sweep(self, now: float = None) -> int:
+        """Purge expired entries in every namespace if the sweep interval elapsed."""
+        now = time.time() if now is None else now
+        if now < self._next_sweep:
+            return 0
+        self._next_sweep = now + self.sweep_interval
+        purged = sum(ns.purge_expired(now) for ns in list(self._namespaces.values()))
+        if self.backend is not None:
+            self.backend.purge_expired(now)
+        return purged
+
+    def clear(self):
+        """Drop all cached entries, including the shared tier (counters are kept)."""
+        for ns in list(self._namespaces.values()):
+            ns.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def reset_stats(self):
+        for ns in list(self._namespaces.values()):
+            ns.stats = CacheStats()
+
+    def stats(self) -> dict:
+        namespaces = {name: ns.snapshot() for name, ns in sorted(self._namespaces.items())}
+        totals = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        for snap in namespaces.values():
+            for k in totals:
+                totals[k] += snap[k]
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_ratio"] = round(totals["hits"] / lookups, 4) if lookups else None
+        shared = self.backend.stats() if self.backend is not None else {"backend": "memory"}
+        return {"totals": totals, "namespaces": namespaces, "shared": shared}
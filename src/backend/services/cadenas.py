@@ -0,0 +1,114 @@
+"""
+Cadenas productivas de Urabá and their aggregation.
+
+Each cadena is a set of sectors plus the skills that characterize it. The
+definitions are compiled once into lookups — sector -> cadenas
+(``SECTOR_CADENAS``), skill -> cadenas (``SKILL_CADENAS``) and
+(sector, skill) -> cadenas — so ``aggregate_cadenas`` is a single pass over
+the ``sector × municipio`` cells and ``sector × skill`` demand, touching each
+row once per cadena it belongs to instead of scanning every row per cadena.
+
+Distinct employers per cadena cannot be derived from per-sector counts (an
+empresa hiring in two sectors of a cadena would count twice), so they are
+computed where the offers are: in SQL by joining the ``CADENA_LINKS``
+(sector, cadena) pairs, or from the columnar snapshot.
+"""
+from collections import Counter, defaultdict
+
+CADENAS = {
+    "Banano y Plátano": {
+        "sectores": ["Agroindustria"],
+        "skills": ["Cosecha", "Empaque", "Fitosanidad", "Riego y drenaje",
+                   "Certificaciones agrícolas", "Certificacion organica",
+                   "Cultivo banano/plátano", "Agricultura", "BPM", "HACCP",
+                   "Cadena de frio"],
+    },
+    "Ganadería y Lácteos": {
+        "sectores": ["Agroindustria", "Mantenimiento"],
+        "skills": ["Ganadería", "Veterinaria", "Porcicultura", "Acuicultura"],
+    },
+    "Turismo y Gastronomía": {
+        "sectores": ["Turismo y Gastronomía"],
+        "skills": ["Hotelería", "Guía turístico", "Servicio de habitación",
+                   "Barista/Bartender", "Atención al cliente"],
+    },
+    "Comercio y Logística Portuaria": {
+        "sectores": ["Transporte y Logística", "Comercio y Ventas"],
+        "skills": ["Logística", "Montacargas", "Comercio exterior", "Cadena de frio",
+                   "Aduanas", "Contenedores", "Estiba", "Zona franca",
+                   "Logística marítima"],
+    },
+    "Construcción e Infraestructura": {
+        "sectores": ["Construcción", "Mantenimiento"],
+        "skills": ["AutoCAD", "Soldadura", "Electricidad", "Mecánica",
+                   "Construcción", "Maquinaria pesada", "SST"],
+    },
+    "Servicios y Administrativo": {
+        "sectores": ["Administrativo", "Contabilidad y Finanzas", "Salud",
+                     "Educación", "Recursos Humanos", "Jurídico"],
+        "skills": ["Excel", "SAP", "Contabilidad", "Software contable",
+                   "Facturación", "Inventarios", "Power BI"],
+    },
+}
+
+
+def _compile(field: str) -> dict[str, tuple[str, ...]]:
+    lookup = defaultdict(list)
+    for cadena, cfg in CADENAS.items():
+        for value in cfg[field]:
+            lookup[value].append(cadena)
+    return {value: tuple(cadenas) for value, cadenas in lookup.items()}
+
+
+SECTOR_CADENAS = _compile("sectores")
+SKILL_CADENAS = _compile("skills")
+_SECTOR_SKILL_CADENAS = {
+    (sector, skill): tuple(c for c in by_sector if c in by_skill)
+    for sector, by_sector in SECTOR_CADENAS.items()
+    for skill, by_skill in SKILL_CADENAS.items()
+    if set(by_sector) & set(by_skill)
+}
+CADENA_SECTORES = sorted(SECTOR_CADENAS)
+# (sector, cadena) pairs as parallel arrays, for UNNEST joins in SQL
+CADENA_LINKS = {
+    "link_sectores": [s for s, cadenas in SECTOR_CADENAS.items() for _ in cadenas],
+    "link_cadenas": [c for cadenas in SECTOR_CADENAS.values() for c in cadenas],
+}
+
+
+def aggregate_cadenas(cells, sector_skills, empresas: dict) -> list[dict]:
+    """Per-cadena ofertas, empresas, salario promedio, top skills and
+    municipios, largest cadenas first.
+
+    *cells* are ``{sector, municipio, ofertas, salario_suma, salario_n}``
+    rows, *sector_skills* ``{sector, skill, demanda}`` rows and *empresas*
+    the distinct employers per cadena.
+    """
+    totals = {c: {"ofertas": 0, "salario_suma": 0, "salario_n": 0} for c in CADENAS}
+    municipios = {c: Counter() for c in CADENAS}
+    skills = {c: Counter() for c in CADENAS}
+    for row in cells:
+        for cadena in SECTOR_CADENAS.get(row["sector"], ()):
+            total = totals[cadena]
+            total["ofertas"] += row["ofertas"]
+            total["salario_suma"] += row["salario_suma"] or 0
+            total["salario_n"] += row["salario_n"]
+            municipios[cadena][row["municipio"]] += row["ofertas"]
+    for row in sector_skills:
+        for cadena in _SECTOR_SKILL_CADENAS.get((row["sector"], row["skill"]), ()):
+            skills[cadena][row["skill"]] += row["demanda"]
+
+    result = [
+        {
+            "cadena": cadena,
+            "sectores": cfg["sectores"],
+            "ofertas": totals[cadena]["ofertas"],
+            "empresas": empresas.get(cadena, 0),
+            "salario_promedio": (int(totals[cadena]["salario_suma"] / totals[cadena]["salario_n"])
+                                 if totals[cadena]["salario_n"] else None),
+            "top_skills": [{"skill": s, "demanda": d} for s, d in skills[cadena].most_common(10)],
+            "municipios": [{"municipio": m, "ofertas": o} for m, o in municipios[cadena].most_common()],
+        }
+        for cadena, cfg in CADENAS.items()
+    ]
+    return sorted(result, key=lambda r: r["ofertas"], reverse=True)
@@ -0,0 +1,115 @@
+"""
+Territorial clustering: k-means over standardized TerriData indicators.
+
+Each municipio is a feature vector of latest values (from the TerriData
+cube) for a configurable set of ``FEATURES``. Heavy-tailed magnitudes
+(population, value added) are log-transformed, every feature is
+standardized to z-scores, and values a municipio does not report are
+imputed with the feature mean (z = 0), so they pull it toward no cluster.
+
+``kmeans`` is Lloyd's algorithm in NumPy: squared distances for all points
+× centroids are one matrix product per iteration, centroids are updated with
+``bincount`` sums. Seeding is k-means++ from a fixed ``seed`` with
+``n_init`` restarts (lowest inertia wins), so results are deterministic for
+the same data. Clusters are renumbered by size, largest first.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# Selectable features: key -> label, TerriData indicador and whether to log-transform
+FEATURES = {
+    "poblacion": {"name": "Población", "indicador": "Población total", "log": True},
+    "pobreza": {"name": "Pobreza monetaria", "indicador": "Incidencia de la pobreza monetaria", "log": False},
+    "valor_agregado": {"name": "Valor agregado", "indicador": "Valor agregado municipal", "log": True},
+    "ipm": {"name": "IPM", "indicador": "Índice de pobreza multidimensional - IPM", "log": False},
+    "homicidios": {"name": "Tasa de homicidios", "indicador": "Tasa de homicidios por cada 100.000 habitantes",
+                   "log": False},
+    "icfes": {"name": "Puntaje ICFES", "indicador": "Puntaje promedio Pruebas Saber 11 - Matemáticas",
+              "log": False},
+}
+DEFAULT_FEATURES = ("poblacion", "pobreza", "valor_agregado")
+
+
+@dataclass
+class KMeansResult:
+    labels: np.ndarray      # cluster per point, 0 = largest cluster
+    centroids: np.ndarray   # k × features, in the (standardized) input space
+    inertia: float          # sum of squared distances to the assigned centroid
+    iterations: int
+
+
+def standardize(X: np.ndarray, log: list[bool] | None = None) -> np.ndarray:
+    """Column z-scores of points × features *X*, NaN imputed as 0 (the mean).
+    Columns flagged in *log* are ``log1p``-transformed first (negatives clipped)."""
+    X = np.array(X, dtype=np.float64)
+    if log is not None:
+        flagged = np.asarray(log, dtype=bool)
+        X[:, flagged] = np.log1p(np.clip(X[:, flagged], 0, None))
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(X, axis=0) if X.size else np.zeros(X.shape[1])
+        std = np.nanstd(X, axis=0) if X.size else np.ones(X.shape[1])
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+    Z = (X - np.nan_to_num(mean)) / std
+    return np.nan_to_num(Z, nan=0.0)
+
+
+def _sq_distances(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    d = (X * X).sum(1)[:, None] - 2 * X @ centroids.T + (centroids * centroids).sum(1)[None, :]
+    return np.maximum(d, 0.0)
+
+
+def _kmeans_pp(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = [X[rng.integers(len(X))]]
+    closest = _sq_distances(X, centroids[0][None, :])[:, 0]
+    for _ in range(1, k):
+        total = closest.sum()
+        i = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centroids.append(X[i])
+        closest = np.minimum(closest, _sq_distances(X, X[i][None, :])[:, 0])
+    return np.array(centroids)
+
+
+def _lloyd(X: np.ndarray, centroids: np.ndarray, max_iter: int, tol: float):
+    k = len(centroids)
+    for iteration in range(1, max_iter + 1):
+        distances = _sq_distances(X, centroids)
+        labels = distances.argmin(1)
+        counts = np.bincount(labels, minlength=k)
+        updated = np.stack([np.bincount(labels, weights=X[:, f], minlength=k) for f in range(X.shape[1])], axis=1)
+        empty = counts == 0
+        updated[~empty] /= counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters on the points farthest from their centroid
+            farthest = np.argsort(distances[np.arange(len(X)), labels])[::-1][:empty.sum()]
+            updated[empty] = X[farthest]
+        shift = ((updated - centroids) ** 2).sum()
+        centroids = updated
+        if shift <= tol:
+            break
+    distances = _sq_distances(X, centroids)
+    labels = distances.argmin(1)
+    return labels, centroids, float(distances[np.arange(len(X)), labels].sum()), iteration
+
+
+def kmeans(X: np.ndarray, k: int, seed: int = 0, n_init: int = 4,
+           max_iter: int = 100, tol: float = 1e-8) -> KMeansResult:
+    """k-means of the rows of *X* (at most ``len(X)`` clusters)."""
+    X = np.asarray(X, dtype=np.float64)
+    if not len(X):
+        raise ValueError("k-means needs at least one point")
+    k = max(1, min(k, len(X)))
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(n_init):
+        run = _lloyd(X, _kmeans_pp(X, k, rng), max_iter, tol)
+        if best is None or run[2] < best[2]:
+            best = run
+    labels, centroids, inertia, iterations = best
+    # Stable numbering: largest cluster first, ties by first member
+    counts = np.bincount(labels, minlength=k)
+    first = np.array([np.flatnonzero(labels == c)[0] if counts[c] else len(X) for c in range(k)])
+    order = np.lexsort((first, -counts))
+    remap = np.empty(k, dtype=np.int64)
+    remap[order] = np.arange(k)
+    return KMeansResult(remap[labels], centroids[order], inertia, iterations)
@@ -0,0 +1,62 @@
+"""
+Pearson and Spearman correlation matrices with pairwise-complete data.
+
+*X* is a ``variables × observations`` float matrix with NaN for missing
+values; every pair of variables is correlated over the observations where
+both are present. Pearson needs only pairwise sums, so the whole matrix is a
+handful of matrix products over the presence mask ``M`` (``n = M·Mᵀ``,
+``Σx = (X·M)·Mᵀ``, ``Σxy = X·Xᵀ`` with missing values zeroed). Spearman ranks
+depend on which observations are kept, so each pair is re-ranked over its
+own complete observations (average ranks for ties), which is what
+``pandas.DataFrame.corr(method="spearman")`` does.
+"""
+import numpy as np
+
+# Fewest complete observations for a correlation to be reported
+MIN_OBSERVATIONS = 3
+
+
+def pairwise_counts(X: np.ndarray) -> np.ndarray:
+    """Observations where both variables are present, per pair."""
+    present = (~np.isnan(X)).astype(np.float64)
+    return (present @ present.T).astype(np.int64)
+
+
+def pearson_matrix(X: np.ndarray, min_observations: int = MIN_OBSERVATIONS) -> np.ndarray:
+    """Pairwise-complete Pearson r (NaN when undefined or under-sampled)."""
+    present = (~np.isnan(X)).astype(np.float64)
+    Z = np.where(present > 0, X, 0.0)
+    n = present @ present.T
+    sx = Z @ present.T          # Σx_i over the observations shared with j
+    sxx = (Z * Z) @ present.T
+    sxy = Z @ Z.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Centered sums: n·Σxy − Σx·Σy etc.
+        cov = n * sxy - sx * sx.T
+        var = (n * sxx - sx * sx) * (n * sxx.T - sx.T * sx.T)
+        r = cov / np.sqrt(var)
+    r[(n < min_observations) | ~(var > 0)] = np.nan
+    np.fill_diagonal(r, np.where(np.isnan(np.diag(r)), np.nan, 1.0))
+    return np.clip(r, -1.0, 1.0)
+
+
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """1-based ranks of *values*, ties sharing their average rank."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return ((ends - counts + 1 + ends) / 2)[inverse]
+
+
+def spearman_matrix(X: np.ndarray, min_observations: int = MIN_OBSERVATIONS) -> np.ndarray:
+    """Pairwise-complete Spearman rho (NaN when undefined or under-sampled)."""
+    k = X.shape[0]
+    rho = np.full((k, k), np.nan)
+    present = ~np.isnan(X)
+    for i in range(k):
+        for j in range(i, k):
+            both = present[i] & present[j]
+            if both.sum() < min_observations:
+                continue
+            ranks = np.vstack([average_ranks(X[i, both]), average_ranks(X[j, both])])
+            rho[i, j] = rho[j, i] = pearson_matrix(ranks, min_observations)[0, 1]
+    return rho
@@ -0,0 +1,89 @@
+"""
+Pre-encoded response bodies for the endpoint cache.
+
+``@cached(encoded=True)`` stores an ``EncodedPayload`` instead of the Python
+value: the JSON bytes FastAPI would have produced, plus gzip and (when the
+optional ``brotli`` package is installed) brotli variants. A cache hit then
+picks the variant matching the request's ``Accept-Encoding`` and returns it
+as a ready ``Response`` — no ``jsonable_encoder``, ``json.dumps`` or
+compression per request.
+
+The request's ``Accept-Encoding`` reaches the endpoint through the
+``accept_encoding`` context variable, set by ``AcceptEncodingMiddleware``.
+"""
+import gzip
+import json
+from contextvars import ContextVar
+from dataclasses import dataclass
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# None outside of an HTTP request (direct calls, warmup, tests)
+accept_encoding: ContextVar[str | None] = ContextVar("accept_encoding", default=None)
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+def _accepted(header: str) -> set[str]:
+    """Codings the client accepts (q=0 entries excluded)."""
+    codings = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        try:
+            q = float(params.strip().removeprefix("q=")) if params.strip() else 1.0
+        except ValueError:
+            q = 1.0
+        if coding and q > 0:
+            codings.add(coding)
+    return codings
+
+
+@dataclass(frozen=True)
+class EncodedPayload:
+    identity: bytes
+    gzip: bytes = None
+    br: bytes = None
+    media_type: str = "application/json"
+
+    @classmethod
+    def encode(cls, value, media_type: str = "application/json") -> "EncodedPayload":
+        """Serialize *value* exactly like FastAPI's JSONResponse, then compress it."""
+        body = json.dumps(
+            jsonable_encoder(value), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":"),
+        ).encode("utf-8")
+        if len(body) < COMPRESS_MIN_BYTES:
+            return cls(body, media_type=media_type)
+        return cls(
+            body,
+            gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+            br=brotli.compress(body, quality=BROTLI_QUALITY) if brotli else None,
+            media_type=media_type,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.identity) + len(self.gzip or b"") + len(self.br or b"")
+
+    def decode(self):
+        return json.loads(self.identity)
+
+    def response(self, accept: str) -> Response:
+        """Build the response for a request sending ``Accept-Encoding: accept``."""
+        codings = _accepted(accept or "")
+        headers = {"Vary": "Accept-Encoding"}
+        if self.br is not None and "br" in codings:
+            body, headers["Content-Encoding"] = self.br, "br"
+        elif self.gzip is not None and ("gzip" in codings or "*" in codings):
+            body, headers["Content-Encoding"] = self.gzip, "gzip"
+        else:
+            body = self.identity
+        return Response(body, headers=headers, media_type=self.media_type)
@@ -0,0 +1,304 @@
+"""
+In-process columnar snapshot of ``empleo.ofertas_laborales``.
+
+With ``OLAP_ENGINE=numpy`` the empleo aggregation endpoints answer from an
+``OfertasSnapshot`` instead of a database round-trip. The snapshot holds one
+NumPy array per column: the low-cardinality text columns are dictionary
+encoded (``int32`` codes into a list of distinct values, NULL included as a
+value of its own, like ``GROUP BY`` treats it), salaries are ``float64`` with
+NaN for NULL, and the publication month is a ``'YYYY-MM'`` categorical.
+
+Filters become boolean masks and group-bys become ``np.bincount`` over the
+codes, so every breakdown is a few vectorized passes over ~10^5 elements.
+
+``skills`` is held as an inverted index: one sorted ``int32`` posting list of
+row positions per skill. Filtered skill demand is the mask gathered at each
+posting list, and co-occurrence with a skill is the same gather restricted
+to that skill's rows — no ``UNNEST`` of the whole table.
+
+Distinct counts are HyperLogLog estimates by default (``exact=False``): each
+dictionary value is hashed once, and per-group registers are filled with one
+``np.maximum.at`` — see ``services.sketches`` for the error bound.
+
+The snapshot is loaded with a single query and reloaded per ``empleo`` data
+version (``services.versioned``). If loading fails the endpoints keep using
+SQL.
+"""
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..config import OLAP_ENGINE
+from .sketches import HLL_REGISTERS, hll_estimate, hll_position
+from .versioned import VersionedSingleton
+
+CATEGORICAL = (
+    "municipio", "dane_code", "sector", "fuente", "empresa",
+    "tipo_contrato", "nivel_educativo", "nivel_experiencia", "modalidad", "periodo",
+)
+# Wait this long before retrying a failed load
+RETRY_SECONDS = 60
+
+SNAPSHOT_SQL = """
+    SELECT municipio, dane_code, sector, fuente, empresa,
+           tipo_contrato, nivel_educativo, nivel_experiencia, modalidad,
+           salario_numerico, TO_CHAR(fecha_publicacion, 'YYYY-MM') AS periodo, skills
+    FROM empleo.ofertas_laborales
+"""
+
+
+class OfertasSnapshot:
+    """Dictionary-encoded, column-oriented copy of the offers table."""
+
+    def __init__(self, rows: list[dict], version=None):
+        self.version = version
+        self.loaded_at = time.time()
+        self.n = len(rows)
+        self.values: dict[str, list] = {}
+        self.codes: dict[str, np.ndarray] = {}
+        for col in CATEGORICAL:
+            index = {}
+            self.codes[col] = np.fromiter(
+                (index.setdefault(r.get(col), len(index)) for r in rows), dtype=np.int32, count=self.n)
+            self.values[col] = list(index)
+        self.salario = np.fromiter(
+            (np.nan if r.get("salario_numerico") is None else r["salario_numerico"] for r in rows),
+            dtype=np.float64, count=self.n)
+        postings: dict[str, list[int]] = {}
+        for i, r in enumerate(rows):
+            for skill in set(r.get("skills") or ()):
+                postings.setdefault(skill, []).append(i)
+        self.postings = {s: np.array(p, dtype=np.int32) for s, p in postings.items()}
+        self._hll: dict[str, tuple] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return (self.salario.nbytes + sum(c.nbytes for c in self.codes.values())
+                + sum(p.nbytes for p in self.postings.values()))
+
+    # -- masks --------------------------------------------------------------
+
+    def eq(self, col: str, value) -> "np.ndarray":
+        """Rows where ``col = value`` (``value=None`` selects NULLs)."""
+        try:
+            code = self.values[col].index(value)
+        except ValueError:
+            return np.zeros(self.n, dtype=bool)
+        return self.codes[col] == code
+
+    def contains(self, col: str, text: str) -> "np.ndarray":
+        """Rows where ``col ILIKE '%text%'`` (matched once per distinct value)."""
+        needle = text.lower()
+        codes = [i for i, v in enumerate(self.values[col]) if v is not None and needle in v.lower()]
+        return np.isin(self.codes[col], codes)
+
+    def isin(self, col: str, values) -> "np.ndarray":
+        """Rows where ``col IN (values)``."""
+        index = {v: i for i, v in enumerate(self.values[col])}
+        return np.isin(self.codes[col], [index[v] for v in values if v in index])
+
+    def not_null(self, col: str) -> "np.ndarray":
+        return ~self.eq(col, None)
+
+    def where(self, **equals) -> "np.ndarray":
+        """AND of ``col = value`` for every non-None keyword."""
+        mask = np.ones(self.n, dtype=bool)
+        for col, value in equals.items():
+            if value is not None:
+                mask &= self.eq(col, value)
+        return mask
+
+    @property
+    def has_salary(self) -> "np.ndarray":
+        return ~np.isnan(self.salario)
+
+    # -- aggregates -----------------------------------------------------------
+
+    def count_by(self, col: str, mask) -> list[tuple]:
+        """``SELECT col, COUNT(*) ... GROUP BY col ORDER BY COUNT(*) DESC``."""
+        counts = np.bincount(self.codes[col][mask], minlength=len(self.values[col]))
+        order = np.argsort(-counts, kind="stable")
+        return [(self.values[col][i], int(counts[i])) for i in order if counts[i]]
+
+    def distinct(self, col: str, mask, exact: bool = True) -> int:
+        """``COUNT(DISTINCT col)`` (NULLs not counted); HyperLogLog when not *exact*."""
+        if not exact:
+            group = np.zeros(self.n, dtype=np.int32)
+            return int(self._approx_distinct(group, 1, col, mask)[0])
+        return int(np.unique(self.codes[col][mask & self.not_null(col)]).size)
+
+    def distinct_by(self, group: str, col: str, mask, exact: bool = True) -> "np.ndarray":
+        """``COUNT(DISTINCT col)`` per code of *group*; HyperLogLog when not *exact*."""
+        if not exact:
+            return self._approx_distinct(self.codes[group], len(self.values[group]), col, mask)
+        m = mask & self.not_null(col)
+        width = len(self.values[col])
+        pairs = np.unique(self.codes[group][m].astype(np.int64) * width + self.codes[col][m])
+        return np.bincount(pairs // width, minlength=len(self.values[group]))
+
+    def _hll_positions(self, col: str) -> tuple:
+        """(register, rank) per dictionary code of *col*, hashed once per snapshot."""
+        if col not in self._hll:
+            positions = [hll_position(v) if v is not None else (0, 0) for v in self.values[col]]
+            self._hll[col] = (np.array([p[0] for p in positions], dtype=np.int64),
+                              np.array([p[1] for p in positions], dtype=np.uint8))
+        return self._hll[col]
+
+    def _approx_distinct(self, group_codes, n_groups: int, col: str, mask) -> "np.ndarray":
+        m = mask & self.not_null(col)
+        # Registers only for the groups present, so wide groupings stay small
+        present, slot = np.unique(group_codes[m], return_inverse=True)
+        registers = np.zeros((present.size, HLL_REGISTERS), dtype=np.uint8)
+        index, rank = self._hll_positions(col)
+        codes = self.codes[col][m]
+        np.maximum.at(registers, (slot, index[codes]), rank[codes])
+        estimates = np.zeros(n_groups, dtype=np.int64)
+        estimates[present] = np.rint(hll_estimate(registers)).astype(np.int64)
+        return estimates
+
+    def salary_by(self, col: str, mask) -> list[dict]:
+        """Per group of *col*: ofertas, con_salario, promedio, minimo, maximo.
+
+        Groups are returned in code order; callers sort as their SQL did.
+        """
+        k = len(self.values[col])
+        codes = self.codes[col][mask]
+        sal = self.salario[mask]
+        paid = ~np.isnan(sal)
+        ofertas = np.bincount(codes, minlength=k)
+        con = np.bincount(codes[paid], minlength=k)
+        total = np.bincount(codes[paid], weights=sal[paid], minlength=k)
+        low = np.full(k, np.inf)
+        high = np.full(k, -np.inf)
+        np.minimum.at(low, codes[paid], sal[paid])
+        np.maximum.at(high, codes[paid], sal[paid])
+        return [
+            {
+                col: self.values[col][i],
+                "ofertas": int(ofertas[i]),
+                "con_salario": int(con[i]),
+                "promedio": round_half_up(total[i] / con[i]) if con[i] else None,
+                "minimo": int(low[i]) if con[i] else None,
+                "maximo": int(high[i]) if con[i] else None,
+            }
+            for i in np.flatnonzero(ofertas)
+        ]
+
+    def cells(self, cols: list[str], mask) -> list[dict]:
+        """``SELECT cols, COUNT(*) AS ofertas, SUM(salario) AS salario_suma,
+        COUNT(salario) AS salario_n ... GROUP BY cols``."""
+        # One mixed-radix int64 key per row, so the group-by is a 1-D unique
+        key = np.zeros(int(mask.sum()), dtype=np.int64)
+        for col in cols:
+            key = key * len(self.values[col]) + self.codes[col][mask]
+        keys, inverse = np.unique(key, return_inverse=True)
+        sal = self.salario[mask]
+        paid = ~np.isnan(sal)
+        ofertas = np.bincount(inverse, minlength=keys.size)
+        suma = np.bincount(inverse[paid], weights=sal[paid], minlength=keys.size)
+        con = np.bincount(inverse[paid], minlength=keys.size)
+        codes = {}
+        for col in reversed(cols):
+            keys, codes[col] = np.divmod(keys, len(self.values[col]))
+        return [
+            {**{col: self.values[col][codes[col][i]] for col in cols},
+             "ofertas": int(ofertas[i]), "salario_suma": int(suma[i]) if con[i] else None,
+             "salario_n": int(con[i])}
+            for i in range(ofertas.size)
+        ]
+
+    def skill_counts(self, mask) -> list[tuple]:
+        """``SELECT skill, COUNT(*) ... UNNEST(skills) GROUP BY skill ORDER BY 2 DESC``."""
+        counts = [(s, int(np.count_nonzero(mask[p]))) for s, p in self.postings.items()]
+        return sorted((c for c in counts if c[1]), key=lambda c: -c[1])
+
+    def skill_counts_by(self, group: str, mask) -> dict:
+        """Skill demand per value of *group*: ``{value: [(skill, count), ...]}``, each sorted desc."""
+        k = len(self.values[group])
+        result = {}
+        for skill, rows in self.postings.items():
+            counts = np.bincount(self.codes[group][rows[mask[rows]]], minlength=k)
+            for code in np.flatnonzero(counts):
+                result.setdefault(self.values[group][code], []).append((skill, int(counts[code])))
+        return {g: sorted(v, key=lambda c: -c[1]) for g, v in result.items()}
+
+    def co_occurrence(self, skill: str, mask) -> tuple[int, list[tuple]]:
+        """Offers in *mask* requiring *skill*, and how many of those require each other skill."""
+        if skill not in self.postings:
+            return 0, []
+        rows = self.postings[skill]
+        selected = np.zeros(self.n, dtype=bool)
+        selected[rows[mask[rows]]] = True
+        pairs = [(s, int(np.count_nonzero(selected[p]))) for s, p in self.postings.items() if s != skill]
+        return int(selected.sum()), sorted((c for c in pairs if c[1]), key=lambda c: -c[1])
+
+    def salary_median_by(self, col: str, mask) -> dict:
+        """Exact median salary per value of *col* (groups without salaries omitted)."""
+        m = mask & self.has_salary
+        codes, sal = self.codes[col][m], self.salario[m]
+        order = np.lexsort((sal, codes))
+        codes, sal = codes[order], sal[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if codes.size else np.array([], dtype=int)
+        ends = np.r_[starts[1:], codes.size]
+        return {
+            self.values[col][codes[s]]: round_half_up(np.median(sal[s:e]))
+            for s, e in zip(starts, ends)
+        }
+
+    def salary_buckets(self, bounds: list, mask) -> list[int]:
+        """Salaried rows per ``[bounds[i-1], bounds[i])`` bucket (len(bounds) + 1 buckets)."""
+        sal = self.salario[mask & self.has_salary]
+        return np.bincount(np.searchsorted(bounds, sal, side="right"), minlength=len(bounds) + 1).tolist()
+
+    def salary_summary(self, mask) -> dict:
+        sal = self.salario[mask & self.has_salary]
+        if not sal.size:
+            return {"con_salario": 0, "promedio": None, "minimo": None, "maximo": None, "mediana": None}
+        return {
+            "con_salario": int(sal.size),
+            "promedio": round_half_up(sal.mean()),
+            "minimo": int(sal.min()),
+            "maximo": int(sal.max()),
+            "mediana": float(np.median(sal)),  # PERCENTILE_CONT(0.5)
+        }
+
+
+def round_half_up(value: float) -> int:
+    """Postgres ``ROUND(numeric)`` for non-negative values (Python rounds half to even)."""
+    return int(np.floor(value + 0.5))
+
+
+def enabled() -> bool:
+    return OLAP_ENGINE == "numpy" and np is not None
+
+
+def _build(version) -> OfertasSnapshot:
+    from ..database import query_dicts
+
+    return OfertasSnapshot(query_dicts(SNAPSHOT_SQL), version)
+
+
+# Optional: a failed load leaves the endpoints on SQL, and is retried after RETRY_SECONDS
+_store: VersionedSingleton[OfertasSnapshot] = VersionedSingleton(
+    "OLAP snapshot", "empleo", _build,
+    describe=lambda snap: f"{snap.n} rows, {snap.nbytes / 1024:.1f} KB",
+    optional=True, retry_seconds=RETRY_SECONDS,
+)
+
+
+def get_snapshot() -> OfertasSnapshot | None:
+    """The current snapshot, or None when the numpy engine is off or unavailable."""
+    return _store.get() if enabled() else None
+
+
+async def aget_snapshot() -> OfertasSnapshot | None:
+    """``get_snapshot`` for coroutines: only a (re)load leaves the event loop."""
+    return await _store.aget() if enabled() else None
+
+
+def reset():
+    """Drop the snapshot (tests, manual invalidation)."""
+    _store.reset()
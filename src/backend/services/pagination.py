@@ -0,0 +1,125 @@
+"""
+Keyset (cursor) pagination helpers.
+
+``LIMIT/OFFSET`` pages cost O(offset) and need a ``COUNT(*)`` per request.
+In cursor mode a page is instead ``WHERE (sort_col, id) > (last row)
+ORDER BY sort_col, id LIMIT n``, which an index on ``(sort_col, id)`` serves
+in O(page_size) at any depth. The cursor is the last row's sort key, encoded
+as opaque URL-safe base64 JSON (dates keep their type so asyncpg binds them
+correctly).
+
+Totals in cursor mode come from the planner's row estimate, which costs a
+single ``EXPLAIN`` instead of a scan.
+"""
+import base64
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+logger = logging.getLogger("observatorio.pagination")
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+def encode_cursor(*values) -> str:
+    """Opaque cursor for the row whose sort key is *values*."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Inverse of ``encode_cursor``. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return [_decode_value(v) for v in values]
+
+
+def keyset_condition(sort_col: str, id_col: str, last_value, last_id,
+                     descending: bool = False) -> tuple[str, dict]:
+    """WHERE fragment selecting rows after ``(last_value, last_id)`` in the order
+    ``sort_col {ASC|DESC} NULLS LAST, id_col {ASC|DESC}``.
+
+    For a non-NULL ``last_value`` this is the row-value comparison
+    ``(sort_col, id_col) < (:ks_v, :ks_id)`` (``>`` when ascending), which the
+    planner turns into an index range bound. It never matches NULL sort keys:
+    the trailing NULL block is read separately once the range is exhausted
+    (see ``fetch_keyset_page``).
+
+    Returns ``(sql, params)`` using the ``:ks_v`` / ``:ks_id`` placeholders.
+    """
+    op = "<" if descending else ">"
+    params = {"ks_id": last_id}
+    if last_value is None:
+        # Already inside the trailing NULL block: only the id order remains
+        return f"({sort_col} IS NULL AND {id_col} {op} :ks_id)", params
+    params["ks_v"] = last_value
+    return f"(({sort_col}, {id_col}) {op} (:ks_v, :ks_id))", params
+
+
+async def fetch_keyset_page(select_from: str, where: str, params: dict,
+                            sort_col: str, id_col: str, after: list | None,
+                            limit: int, descending: bool = False) -> list[dict]:
+    """Up to *limit* rows of ``<select_from> WHERE <where>`` following the
+    ``(sort_value, id)`` pair *after* (``None`` for the first page), ordered by
+    ``sort_col NULLS LAST, id_col`` in the given direction.
+
+    Past a non-NULL cursor the page is a range scan over non-NULL keys; only
+    when that range runs out before *limit* does a second query continue into
+    the NULL block, from its head.
+    """
+    from ..database import aquery_dicts
+
+    order = "DESC" if descending else "ASC"
+    order_by = f"ORDER BY {sort_col} {order} NULLS LAST, {id_col} {order}"
+
+    async def run(cond: str, extra: dict, n: int) -> list[dict]:
+        return await aquery_dicts(
+            f"{select_from} WHERE {where}{cond} {order_by} LIMIT :lim",
+            {**params, **extra, "lim": n},
+        )
+
+    if after is None:
+        return await run("", {}, limit)
+    cond, ks_params = keyset_condition(sort_col, id_col, *after, descending=descending)
+    rows = await run(f" AND {cond}", ks_params, limit)
+    if after[0] is not None and len(rows) < limit:
+        rows += await run(f" AND {sort_col} IS NULL", {}, limit - len(rows))
+    return rows
+
+
+async def estimate_count(from_where: str, params: dict = None) -> int | None:
+    """Planner row estimate for ``SELECT 1 FROM <from_where>`` (None if unavailable)."""
+    from ..database import aquery_dicts
+
+    try:
+        rows = await aquery_dicts(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {from_where}", params)
+        plan = next(iter(rows[0].values()))
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.debug("Row estimate unavailable: %s", e)
+        return None
@@ -0,0 +1,43 @@
+"""
+Probes for optional schema objects added by migrations.
+
+Endpoints that use a migration's table or column (the full-text column, the
+offer rollups) keep a fallback until it is applied. ``probe_schema`` runs a
+``SELECT ... LIMIT 0`` naming those objects on the sync engine and remembers
+the answer: success for good, failure for ``retry_seconds``, so applying the
+migration needs no restart.
+"""
+import logging
+import time
+
+from sqlalchemy import text
+
+logger = logging.getLogger("observatorio.probe")
+
+RETRY_SECONDS = 300
+
+# sql -> (available, checked_at)
+_results: dict[str, tuple[bool, float]] = {}
+
+
+def probe_schema(sql: str, fallback: str, retry_seconds: float = RETRY_SECONDS) -> bool:
+    """Whether *sql* runs; *fallback* describes what callers do otherwise (logged)."""
+    available, checked_at = _results.get(sql, (None, 0.0))
+    if available or (available is False and time.time() - checked_at < retry_seconds):
+        return available
+    from ..database import engine
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(sql))
+        available = True
+    except Exception as e:
+        logger.info("%s: %s", fallback, e)
+        available = False
+    _results[sql] = (available, time.time())
+    return available
+
+
+def reset():
+    """Forget every probe (tests, manual invalidation)."""
+    _results.clear()
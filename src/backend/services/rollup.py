@@ -0,0 +1,43 @@
+"""
+Source of the monthly offer cells read by the empleo aggregates.
+
+``empleo.ofertas_rollup_mensual`` (migration 21, sketches from migration 22,
+populated by ``etl/23_rebuild_rollup.py``) holds one row per month ×
+municipio × dane_code × sector × fuente. The endpoints that read it sum
+``ofertas`` / ``salario_suma`` / ``salario_n``, unnest ``empresas`` and merge
+``salario_sketch``, so any relation with those columns gives the same answer.
+
+Until the rollup exists, ``ofertas_cells`` returns a per-offer projection of
+``empleo.ofertas_laborales`` with the rollup's columns: every offer is a cell
+of its own, which is the raw-table aggregate the endpoints ran before the
+rollup, at its old cost.
+"""
+from .probe import probe_schema
+from .sketches import SALARY_SKETCH_GAMMA
+
+ROLLUP_TABLE = "empleo.ofertas_rollup_mensual"
+# One cell per offer; salaries count only when they get a sketch bucket
+# (etl_sync.salary_bucket), as in the rollup
+RAW_CELLS = f"""(
+    SELECT DATE_TRUNC('month', fecha_publicacion)::date AS mes,
+           municipio, dane_code, sector, fuente,
+           1 AS ofertas,
+           CASE WHEN salario_numerico > 0 THEN salario_numerico END AS salario_suma,
+           COALESCE(salario_numerico > 0, FALSE)::int AS salario_n,
+           ARRAY_REMOVE(ARRAY[empresa], NULL) AS empresas,
+           CASE WHEN salario_numerico > 0
+                THEN jsonb_build_object(CEIL(LN(salario_numerico) / LN({SALARY_SKETCH_GAMMA}))::int::text, 1)
+                ELSE '{{}}'::jsonb END AS salario_sketch
+    FROM empleo.ofertas_laborales
+) AS ofertas_cells"""
+
+
+def rollup_available() -> bool:
+    """Whether the monthly rollup (with sketches) exists (probed once, sync engine)."""
+    return probe_schema(f"SELECT salario_sketch FROM {ROLLUP_TABLE} LIMIT 0",
+                        "Monthly rollup unavailable, aggregating empleo.ofertas_laborales")
+
+
+def ofertas_cells(available: bool) -> str:
+    """FROM item for the monthly offer cells: the rollup, or the per-offer fallback."""
+    return ROLLUP_TABLE if available else RAW_CELLS
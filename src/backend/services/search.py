@@ -0,0 +1,39 @@
+"""
+Full-text search over job offers.
+
+``empleo.ofertas_laborales.search_tsv`` (migration 19) is a stored generated
+``tsvector`` over ``titulo`` (weight A) and ``descripcion`` (weight B) with a
+GIN index, so Postgres keeps it current on every ETL insert/update. It uses
+the ``public.es_unaccent`` text search configuration: Spanish stemming and
+stopwords, with ``unaccent`` applied first, so "tecnico" finds "Técnico" and
+"pequeño" finds "pequeno" — the same folding ``etl_sync._normalize`` applies.
+
+Until the migration is applied the filter falls back to the old ILIKE scan.
+"""
+from .probe import probe_schema
+
+SEARCH_CONFIG = "public.es_unaccent"
+
+
+def fulltext_available() -> bool:
+    """Whether the ``search_tsv`` column exists (probed once, sync engine)."""
+    return probe_schema("SELECT search_tsv FROM empleo.ofertas_laborales LIMIT 0",
+                        "Full-text index unavailable, using ILIKE")
+
+
+def search_clause(q: str, fulltext: bool) -> tuple[str, str | None, dict]:
+    """
+    Filter for the ``busqueda`` parameter.
+
+    Returns ``(condition, rank_expr, params)``; ``rank_expr`` is None for the
+    ILIKE fallback, which has no relevance order.
+    """
+    if not fulltext:
+        return "(titulo ILIKE :q OR descripcion ILIKE :q)", None, {"q": f"%{q}%"}
+    # websearch syntax: "frase exacta", OR, -excluir; never raises on user input
+    query = f"websearch_to_tsquery('{SEARCH_CONFIG}', :q)"
+    return (
+        f"search_tsv @@ {query}",
+        f"ts_rank_cd(search_tsv, {query})",
+        {"q": q},
+    )
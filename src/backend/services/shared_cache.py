@@ -0,0 +1,128 @@
+"""
+Node-local shared cache tier for multi-worker deployments.
+
+``uvicorn --workers N`` runs N processes, each with its own in-memory cache.
+``SQLiteCacheBackend`` keeps a second tier in a local SQLite file (WAL mode)
+that every worker on the node reads and writes, so an aggregation computed
+by one worker is reused by the others. Writes are single ``INSERT OR
+REPLACE`` statements, which SQLite applies atomically across processes, and
+each row carries its own TTL metadata.
+"""
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+
+from .cache import CacheEntry
+
+logger = logging.getLogger("observatorio.cache")
+
+
+class SQLiteCacheBackend:
+    """
+    Shared L2 cache stored in a local SQLite file.
+
+    Args:
+        path: Database file; all workers on the node must use the same path.
+        busy_timeout_ms: How long a writer waits for another worker's lock.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 2000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace   TEXT NOT NULL,
+                    key_hash    BLOB NOT NULL,
+                    value       BLOB NOT NULL,
+                    stored_at   REAL NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    expires_at  REAL NOT NULL,
+                    PRIMARY KEY (namespace, key_hash)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key_hash(key) -> bytes:
+        return hashlib.sha256(pickle.dumps(key, protocol=4)).digest()
+
+    @staticmethod
+    def dumps(value) -> bytes | None:
+        """Serialize *value* for storage, or None if it cannot be pickled."""
+        try:
+            return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+
+    def get(self, namespace: str, key, now: float = None) -> CacheEntry | None:
+        """Return the unexpired entry for *key*, or None."""
+        now = time.time() if now is None else now
+        try:
+            row = self._conn().execute(
+                "SELECT value, stored_at, fresh_until, expires_at FROM cache_entries "
+                "WHERE namespace = ? AND key_hash = ? AND expires_at > ?",
+                (namespace, self._key_hash(key), now),
+            ).fetchone()
+            if row is None:
+                return None
+            blob, stored_at, fresh_until, expires_at = row
+            return CacheEntry(pickle.loads(blob), stored_at, expires_at, len(blob), fresh_until=fresh_until)
+        except Exception as e:
+            logger.warning("Shared cache read failed for %s: %s", namespace, e)
+            return None
+
+    def set(self, namespace: str, key, blob: bytes, entry: CacheEntry) -> bool:
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key_hash, value, stored_at, fresh_until, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, self._key_hash(key), blob, entry.stored_at, entry.fresh_until, entry.expires_at),
+            )
+            return True
+        except Exception as e:
+            logger.warning("Shared cache write failed for %s: %s", namespace, e)
+            return False
+
+    def purge_expired(self, now: float = None) -> int:
+        now = time.time() if now is None else now
+        try:
+            return self._conn().execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        except Exception as e:
+            logger.warning("Shared cache purge failed: %s", e)
+            return 0
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache_entries")
+
+    def stats(self) -> dict:
+        row = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries"
+        ).fetchone()
+        return {"backend": "sqlite", "path": self.path, "entries": row[0], "bytes": row[1]}
+
+
+def make_backend(kind: str, path: str):
+    """Build the shared cache tier named by CACHE_BACKEND (None for memory-only)."""
+    if kind == "sqlite":
+        try:
+            return SQLiteCacheBackend(path)
+        except Exception as e:
+            logger.error("Could not open shared cache at %s, using memory only: %s", path, e)
+            return None
+    return None
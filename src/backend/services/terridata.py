@@ -0,0 +1,170 @@
+"""
+Latest-value cube of ``socioeconomico.terridata``.
+
+Most TerriData consumers want "the most recent value of indicator X for
+entity Y". Instead of each endpoint running its own ``DISTINCT ON ... ORDER
+BY anio DESC`` over the whole table, ``TerriDataCube`` holds one dense
+``indicator × entity`` matrix of latest values (``float64``, NaN when the
+latest row has no numeric value) and one of their years (0 when the entity
+never reported the indicator), with dict index maps for both axes.
+
+Lookups are then O(1) (``latest``) or one row slice (``column``,
+``regional_average``). Entities are TerriData's ``entidad``; ``dane_code``
+resolves to the entity whose ``codigo_entidad`` is that code, falling back to
+the first entity loaded from that municipality's file.
+
+The cube is built from a single query and rebuilt per ``socioeconomico``
+data version (``services.versioned``).
+"""
+import time
+
+import numpy as np
+
+from .versioned import VersionedSingleton
+
+CUBE_SQL = """
+    SELECT DISTINCT ON (indicador, entidad)
+        indicador, entidad, codigo_entidad, dane_code, dato_numerico, anio
+    FROM socioeconomico.terridata
+    WHERE indicador IS NOT NULL AND entidad IS NOT NULL AND anio IS NOT NULL
+    ORDER BY indicador, entidad, anio DESC
+"""
+
+
+class TerriDataCube:
+    """Dense indicator × entity matrix of latest values and years."""
+
+    def __init__(self, rows: list[dict], version=None):
+        self.version = version
+        self.loaded_at = time.time()
+        self.indicators: dict[str, int] = {}
+        self.entities: dict[str, int] = {}
+        self.dane_codes: list[str | None] = []
+        own: dict[str, int] = {}
+        for r in rows:
+            self.indicators.setdefault(r["indicador"], len(self.indicators))
+            entity = r["entidad"]
+            if entity not in self.entities:
+                self.entities[entity] = len(self.entities)
+                self.dane_codes.append(r["dane_code"])
+            if r.get("codigo_entidad") is not None and r["dane_code"] \
+                    and int(r["codigo_entidad"]) == int(r["dane_code"]):
+                own[r["dane_code"]] = self.entities[entity]
+                self.dane_codes[self.entities[entity]] = r["dane_code"]
+        self.names = list(self.entities)
+        self.by_dane: dict[str, int] = {}
+        for e, dane in enumerate(self.dane_codes):
+            if dane:
+                self.by_dane.setdefault(dane, e)
+        self.by_dane.update(own)
+
+        shape = (len(self.indicators), len(self.entities))
+        self.values = np.full(shape, np.nan)
+        self.years = np.zeros(shape, dtype=np.int32)
+        for r in rows:
+            i, e = self.indicators[r["indicador"]], self.entities[r["entidad"]]
+            self.years[i, e] = r["anio"]
+            if r["dato_numerico"] is not None:
+                self.values[i, e] = r["dato_numerico"]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.years.nbytes
+
+    def latest(self, indicador: str, dane_code: str | None) -> tuple:
+        """``(value, year)`` of the latest row for *dane_code* ((None, None) if
+        absent). Without a dane_code, any entity reporting the latest year."""
+        i = self.indicators.get(indicador)
+        if i is None:
+            return None, None
+        if dane_code is None:
+            e = int(np.argmax(self.years[i]))
+        elif dane_code in self.by_dane:
+            e = self.by_dane[dane_code]
+        else:
+            return None, None
+        if not self.years[i, e] or np.isnan(self.values[i, e]):
+            return None, None
+        return float(self.values[i, e]), int(self.years[i, e])
+
+    def entity(self, dane_code: str) -> str | None:
+        e = self.by_dane.get(dane_code)
+        return None if e is None else self.names[e]
+
+    def pairs(self, ind_x: str, ind_y: str) -> list[dict]:
+        """``{label, x, y}`` for entities with numeric latest values of both indicators."""
+        i, j = self.indicators.get(ind_x), self.indicators.get(ind_y)
+        if i is None or j is None:
+            return []
+        x, y = self.values[i], self.values[j]
+        both = (self.years[i] > 0) & (self.years[j] > 0) & ~np.isnan(x) & ~np.isnan(y)
+        return [{"label": self.names[e], "x": float(x[e]), "y": float(y[e])} for e in np.flatnonzero(both)]
+
+    def matrix(self, indicadores: list[str]) -> np.ndarray:
+        """``len(indicadores) × entities`` latest values (NaN rows for unknown indicators)."""
+        X = np.full((len(indicadores), len(self.entities)), np.nan)
+        for row, indicador in enumerate(indicadores):
+            i = self.indicators.get(indicador)
+            if i is not None:
+                X[row] = self.values[i]
+        return X
+
+    def column(self, indicador: str) -> list[dict]:
+        """``{municipio, dane_code, valor, anio}`` per entity reporting *indicador*."""
+        i = self.indicators.get(indicador)
+        if i is None:
+            return []
+        values, years = self.values[i], self.years[i]
+        return [
+            {"municipio": self.names[e], "dane_code": self.dane_codes[e],
+             "valor": None if np.isnan(values[e]) else float(values[e]), "anio": int(years[e])}
+            for e in np.flatnonzero(years)
+        ]
+
+    def by_dane_code(self, indicador: str) -> dict[str, dict]:
+        """``column`` keyed by dane_code, one entity per code (see module docstring)."""
+        i = self.indicators.get(indicador)
+        if i is None:
+            return {}
+        return {
+            dane: {"municipio": self.names[e], "valor": float(self.values[i, e]), "anio": int(self.years[i, e])}
+            for dane, e in self.by_dane.items()
+            if self.years[i, e] and not np.isnan(self.values[i, e])
+        }
+
+    def regional_average(self, indicador: str) -> tuple:
+        """``(mean, year)`` over the entities reporting the indicator's latest year."""
+        i = self.indicators.get(indicador)
+        if i is None or not self.years[i].any():
+            return None, None
+        year = int(self.years[i].max())
+        values = self.values[i, self.years[i] == year]
+        values = values[~np.isnan(values)]
+        return (float(values.mean()) if values.size else None), year
+
+
+def _build(version) -> TerriDataCube:
+    from ..database import query_dicts
+
+    return TerriDataCube(query_dicts(CUBE_SQL), version)
+
+
+_store: VersionedSingleton[TerriDataCube] = VersionedSingleton(
+    "TerriData cube", "socioeconomico", _build,
+    describe=lambda cube: (f"{len(cube.indicators)} indicators × {len(cube.entities)} entities, "
+                           f"{cube.nbytes / 1024:.1f} KB"),
+)
+
+
+def get_cube() -> TerriDataCube:
+    return _store.get()
+
+
+async def aget_cube() -> TerriDataCube:
+    """``get_cube`` for coroutines: only a rebuild leaves the event loop."""
+    return await _store.aget()
+
+
+def reset():
+    """Drop the cube (tests, manual invalidation)."""
+    _store.reset()
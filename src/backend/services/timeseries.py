@@ -0,0 +1,221 @@
+"""
+In-memory daily time series of job offers per municipio × sector.
+
+``DailySeries`` loads ``empleo.ofertas_rollup_diario`` (maintained
+incrementally by the sync ETL) into dense arrays: ``counts[m, s, d]`` offers
+per municipio × sector × day over the contiguous span of publication days,
+``undated[m, s]`` for offers without a date, and per-month salary count/sum.
+Municipio and sector are dictionary encoded with NULL as a value of its own,
+like ``GROUP BY`` treats it.
+
+Everything the labour-dynamism endpoints need is a vectorized reduction of
+those arrays:
+
+- rolling windows (termometro) are differences of per-municipio prefix sums,
+  so any ``[from, to)`` day range costs O(municipios);
+- monthly totals are ``np.add.reduceat`` over month boundaries, and growth
+  rates a shifted division (dinamismo);
+- seasonal indices are a classical multiplicative decomposition
+  (estacionalidad): the monthly series divided by its centered 2×12 moving
+  average trend, averaged per calendar month and normalized to mean 1. Series
+  shorter than two years fall back to each calendar month's mean over the
+  overall mean.
+
+Distinct employers per month cannot be summed from daily counts; they are
+read once per load from the monthly rollup's exact ``empresas`` sets.
+
+Until migrations 21 and 25 create the rollups, the same rows are aggregated
+from ``empleo.ofertas_laborales`` at load time.
+
+The store is rebuilt per ``empleo`` data version (``services.versioned``).
+"""
+import logging
+import time
+
+import numpy as np
+
+from .versioned import VersionedSingleton
+
+logger = logging.getLogger("observatorio.timeseries")
+
+DAILY_SQL = """
+    SELECT dia, municipio, sector, ofertas, salario_suma, salario_n
+    FROM empleo.ofertas_rollup_diario
+"""
+EMPRESAS_MES_SQL = """
+    SELECT TO_CHAR(mes, 'YYYY-MM') AS mes, COUNT(DISTINCT e) AS empresas
+    FROM empleo.ofertas_rollup_mensual, UNNEST(empresas) AS e
+    WHERE mes IS NOT NULL
+    GROUP BY mes
+"""
+# Fallbacks without the rollups; salaries count only when positive, as in them
+RAW_DAILY_SQL = """
+    SELECT DATE(fecha_publicacion) AS dia, municipio, sector, COUNT(*) AS ofertas,
+           COALESCE(SUM(salario_numerico) FILTER (WHERE salario_numerico > 0), 0) AS salario_suma,
+           COUNT(*) FILTER (WHERE salario_numerico > 0) AS salario_n
+    FROM empleo.ofertas_laborales
+    GROUP BY 1, municipio, sector
+"""
+RAW_EMPRESAS_MES_SQL = """
+    SELECT TO_CHAR(fecha_publicacion, 'YYYY-MM') AS mes, COUNT(DISTINCT empresa) AS empresas
+    FROM empleo.ofertas_laborales
+    WHERE fecha_publicacion IS NOT NULL
+    GROUP BY 1
+"""
+
+
+def growth_pct(values: np.ndarray) -> np.ndarray:
+    """Percent change of each element over the previous one (NaN for the
+    first element and after zeros)."""
+    values = np.asarray(values, dtype=np.float64)
+    growth = np.full(values.shape, np.nan)
+    prev = values[:-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth[1:] = np.where(prev > 0, (values[1:] - prev) / prev * 100, np.nan)
+    return growth
+
+
+def seasonal_indices(monthly: np.ndarray, month_of_year: np.ndarray) -> np.ndarray:
+    """Twelve seasonal indices (mean 1, NaN for months never observed) of a
+    contiguous monthly series whose elements fall in *month_of_year* (1-12)."""
+    monthly = np.asarray(monthly, dtype=np.float64)
+    month_of_year = np.asarray(month_of_year)
+    if len(monthly) >= 24:
+        # Centered 2x12 moving average: the trend-cycle with the annual cycle removed
+        weights = np.r_[0.5, np.ones(11), 0.5] / 12
+        trend = np.convolve(monthly, weights, mode="valid")
+        ratios, months = monthly[6:-6], month_of_year[6:-6]
+        valid = trend > 0
+        ratios, months = ratios[valid] / trend[valid], months[valid]
+    else:
+        mean = monthly.mean() if len(monthly) else 0
+        ratios = monthly / mean if mean > 0 else np.zeros(len(monthly))
+        months = month_of_year
+    sums = np.bincount(months - 1, weights=ratios, minlength=12) if len(months) else np.zeros(12)
+    seen = np.bincount(months - 1, minlength=12) if len(months) else np.zeros(12)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        indices = np.where(seen > 0, sums / seen, np.nan)
+        observed = indices[~np.isnan(indices)]
+        if observed.size and observed.mean() > 0:
+            indices = indices / observed.mean()
+    return indices
+
+
+class DailySeries:
+    """Dense municipio × sector × day offer counts with monthly salary totals."""
+
+    def __init__(self, rows: list[dict], empresas_mes: list[dict] = (), version=None):
+        self.version = version
+        self.loaded_at = time.time()
+        munis = {r["municipio"] for r in rows}
+        sectors = {r["sector"] for r in rows}
+        # Sorted values, NULL last
+        self.municipios = sorted(munis - {None}) + ([None] if None in munis else [])
+        self.sectores = sorted(sectors - {None}) + ([None] if None in sectors else [])
+        m_index = {v: i for i, v in enumerate(self.municipios)}
+        s_index = {v: i for i, v in enumerate(self.sectores)}
+        shape = (len(self.municipios), len(self.sectores))
+
+        dated = [r for r in rows if r["dia"] is not None]
+        # Encode each distinct day once (date objects or ISO strings)
+        day_number = {v: int(np.datetime64(str(v)[:10], "D").astype(np.int64)) for v in {r["dia"] for r in dated}}
+        days = np.fromiter((day_number[r["dia"]] for r in dated), dtype=np.int64, count=len(dated)).astype("datetime64[D]")
+        self.start = days.min() if len(days) else np.datetime64("today", "D")
+        n_days = int((days.max() - self.start).astype(int)) + 1 if len(days) else 0
+        self.days = self.start + np.arange(n_days)
+        self.months = np.unique(self.days.astype("datetime64[M]")) if n_days else np.array([], "datetime64[M]")
+        if len(self.months):
+            self.months = np.arange(self.months[0], self.months[-1] + 1)
+
+        self.counts = np.zeros(shape + (n_days,), dtype=np.int32)
+        self.undated = np.zeros(shape, dtype=np.int32)
+        self.salario_suma = np.zeros(shape + (len(self.months),))
+        self.salario_n = np.zeros(shape + (len(self.months),), dtype=np.int32)
+        m = np.fromiter((m_index[r["municipio"]] for r in dated), dtype=np.int64, count=len(dated))
+        s = np.fromiter((s_index[r["sector"]] for r in dated), dtype=np.int64, count=len(dated))
+        d = (days - self.start).astype(np.int64)
+        month = (days.astype("datetime64[M]") - self.months[0]).astype(np.int64) if len(days) else d
+
+        def scatter(target, position, field):
+            weights = np.fromiter((r[field] or 0 for r in dated), dtype=np.float64, count=len(dated))
+            flat = np.ravel_multi_index((m, s, position), target.shape) if len(dated) else position
+            target += np.bincount(flat, weights=weights, minlength=target.size).reshape(target.shape).astype(target.dtype)
+
+        scatter(self.counts, d, "ofertas")
+        scatter(self.salario_suma, month, "salario_suma")
+        scatter(self.salario_n, month, "salario_n")
+        for r in rows:
+            if r["dia"] is None:
+                self.undated[m_index[r["municipio"]], s_index[r["sector"]]] += r["ofertas"]
+
+        # Per-municipio prefix sums over days: any day window is one subtraction
+        per_muni = self.counts.sum(axis=1)
+        self._cumulative = np.concatenate([np.zeros((shape[0], 1), dtype=np.int64), per_muni.cumsum(1)], axis=1)
+        # Month boundaries on the day axis, for reduceat
+        self._month_starts = (np.maximum((self.months.astype("datetime64[D]") - self.start).astype(np.int64), 0)
+                              if n_days else np.array([], dtype=np.int64))
+        self.empresas_mes = np.zeros(len(self.months), dtype=np.int64)
+        for r in empresas_mes:
+            i = int((np.datetime64(r["mes"], "M") - self.months[0]).astype(int)) if len(self.months) else -1
+            if 0 <= i < len(self.months):
+                self.empresas_mes[i] = r["empresas"]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.counts, self.undated, self.salario_suma, self.salario_n,
+                                      self._cumulative, self.empresas_mes))
+
+    def _day_index(self, day) -> int:
+        i = int((np.datetime64(day, "D") - self.start).astype(int))
+        return min(max(i, 0), len(self.days))
+
+    def window(self, start=None, end=None) -> np.ndarray:
+        """Offers per municipio published in ``[start, end)`` (open ends unbounded)."""
+        lo = 0 if start is None else self._day_index(start)
+        hi = len(self.days) if end is None else self._day_index(end)
+        return self._cumulative[:, max(hi, lo)] - self._cumulative[:, lo]
+
+    def totals(self) -> np.ndarray:
+        """All offers per municipio, undated included."""
+        return self._cumulative[:, -1] + self.undated.sum(axis=1)
+
+    def monthly(self) -> np.ndarray:
+        """``counts`` summed per calendar month: municipio × sector × month."""
+        if not len(self.days):
+            return np.zeros(self.counts.shape[:2] + (0,), dtype=np.int64)
+        return np.add.reduceat(self.counts, self._month_starts, axis=2, dtype=np.int64)
+
+    def month_of_year(self) -> np.ndarray:
+        return (self.months.astype(np.int64) % 12) + 1
+
+
+def _build(version) -> DailySeries:
+    from ..database import query_dicts
+
+    try:
+        rows, empresas_mes = query_dicts(DAILY_SQL), query_dicts(EMPRESAS_MES_SQL)
+    except Exception as e:
+        logger.info("Offer rollups unavailable, aggregating empleo.ofertas_laborales: %s", e)
+        rows, empresas_mes = query_dicts(RAW_DAILY_SQL), query_dicts(RAW_EMPRESAS_MES_SQL)
+    return DailySeries(rows, empresas_mes, version)
+
+
+_store: VersionedSingleton[DailySeries] = VersionedSingleton(
+    "Daily series", "empleo", _build,
+    describe=lambda series: (f"{len(series.municipios)} municipios × {len(series.sectores)} sectores × "
+                             f"{len(series.days)} days, {series.nbytes / 1024:.1f} KB"),
+)
+
+
+def get_series() -> DailySeries:
+    return _store.get()
+
+
+async def aget_series() -> DailySeries:
+    """``get_series`` for coroutines: only a rebuild leaves the event loop."""
+    return await _store.aget()
+
+
+def reset():
+    """Drop the store (tests, manual invalidation)."""
+    _store.reset()
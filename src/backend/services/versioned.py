@@ -0,0 +1,107 @@
+"""
+In-process structures rebuilt when their schema's data version changes.
+
+The OLAP snapshot (``services.olap``), the TerriData cube
+(``services.terridata``) and the daily offers series
+(``services.timeseries``) are each one object built from a query and kept
+until the ETL bumps the schema they read (see ``database.get_data_versions``).
+``VersionedSingleton`` holds that object and decides when to rebuild it:
+
+- with a known version, when the object was built for another one;
+- without versions (meta.data_versions unavailable), when it is older than
+  ``UNVERSIONED_MAX_AGE_SECONDS``.
+
+Builds are serialized, so concurrent requests for a new version build once.
+A failed rebuild keeps serving the previous object. With no previous object
+the error is raised, or swallowed (returning None) for ``optional`` stores
+whose callers have a fallback; ``retry_seconds`` defers the next attempt.
+
+Built objects must expose ``version`` and ``loaded_at``.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Generic, TypeVar
+
+logger = logging.getLogger("observatorio.versioned")
+
+# Age limit when meta.data_versions is unavailable
+UNVERSIONED_MAX_AGE_SECONDS = 3600
+
+T = TypeVar("T")
+
+
+class VersionedSingleton(Generic[T]):
+    """
+    One lazily built object per data version of *schema*.
+
+    Args:
+        label: Name used in log messages ("TerriData cube").
+        schema: Schema whose data version identifies the object.
+        build: ``build(version) -> T``; runs in a worker thread.
+        describe: ``describe(obj) -> str`` summary for the build log line.
+        optional: Return None instead of raising when the first build fails.
+        retry_seconds: After a failed build, serve what there is for this long.
+    """
+
+    def __init__(self, label: str, schema: str, build: Callable[[object], T],
+                 describe: Callable[[T], str] = None, optional: bool = False,
+                 retry_seconds: float = 0.0):
+        self.label = label
+        self.schema = schema
+        self.build = build
+        self.describe = describe
+        self.optional = optional
+        self.retry_seconds = retry_seconds
+        self.value: T | None = None
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, value: T | None, version) -> bool:
+        if value is None:
+            return False
+        if version is None:
+            return time.time() - value.loaded_at < UNVERSIONED_MAX_AGE_SECONDS
+        return value.version == version
+
+    def load(self, version) -> T | None:
+        """Build (once per version, across threads) and publish a new object."""
+        with self._lock:
+            if self.current(self.value, version):
+                return self.value
+            if time.time() - self._failed_at < self.retry_seconds:
+                return self.value
+            started = time.perf_counter()
+            try:
+                value = self.build(version)
+            except Exception as e:
+                self._failed_at = time.time()
+                if self.value is None and not self.optional:
+                    raise
+                logger.warning("%s build failed, serving the previous one: %s", self.label, e)
+                return self.value
+            self.value = value
+            logger.info("%s built%s, %.0f ms (%s v%s)", self.label,
+                        f": {self.describe(value)}" if self.describe else "",
+                        (time.perf_counter() - started) * 1000, self.schema, version)
+            return value
+
+    def get(self) -> T | None:
+        from ..database import get_data_versions
+
+        version = get_data_versions().get(self.schema)
+        value = self.value
+        return value if self.current(value, version) else self.load(version)
+
+    async def aget(self) -> T | None:
+        """``get`` for coroutines: only a rebuild leaves the event loop."""
+        from ..database import aget_data_versions, run_sync
+
+        version = (await aget_data_versions()).get(self.schema)
+        value = self.value
+        return value if self.current(value, version) else await run_sync(self.load, version)
+
+    def reset(self):
+        """Drop the object (tests, manual invalidation)."""
+        with self._lock:
+            self.value, self._failed_at = None, 0.0
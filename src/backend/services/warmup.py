@@ -0,0 +1,195 @@
+"""
+Startup cache warm-up for the dashboard endpoints.
+
+After a cold start every ``@cached`` endpoint is empty, so the first visitor
+of each municipality pays for the aggregation queries. ``run_warmup`` calls
+the dashboard endpoints for every ``dane_code`` in ``stats.MUNICIPIOS`` plus
+the regional view (``dane_code=None``) as a task on the server's event loop.
+At most ``concurrency`` endpoints run at once, and each runs under
+``database.serial_batches`` so its batches do not fan out: warm-up holds at
+most ``concurrency`` pooled connections.
+
+With the SQLite tier (``CACHE_BACKEND=sqlite``) every worker on the node
+reads the entries one worker computes, so only the worker that takes the
+node-local warm-up lock runs the plan; the others report ``delegated`` and
+fill their in-memory tier from the shared one on first use. With per-process
+caches every worker warms its own.
+
+Endpoints are called the way FastAPI calls them (every parameter passed as a
+keyword, ``Query()`` defaults resolved), so the cache keys match real
+requests. Progress is kept in ``status()`` for the readiness endpoint.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import time
+
+from ..config import CACHE_BACKEND, CACHE_SQLITE_PATH
+
+logger = logging.getLogger("observatorio.warmup")
+
+# (router module, endpoint) pairs warmed once per municipality and regionally
+PER_MUNICIPIO = [
+    ("stats", "get_summary"),
+    ("empleo", "get_empleo_stats"),
+    ("empleo", "get_empleo_kpis"),
+    ("empleo", "get_empleo_serie_temporal"),
+    ("empleo", "get_skills_demand"),
+    ("empleo", "get_salary_analysis"),
+    ("empleo", "get_sectores_detalle"),
+    ("empleo", "get_empresas_ranking"),
+    ("empleo", "get_experiencia_dist"),
+    ("empleo", "get_contratos_dist"),
+    ("empleo", "get_educacion_dist"),
+    ("empleo", "get_modalidad_dist"),
+    ("empleo", "get_skills_categorized"),
+    ("analytics", "get_brecha_skills"),
+]
+
+# Endpoints without a municipality filter, warmed once
+REGIONAL = [
+    ("layers", "list_layers"),
+    ("empleo", "get_empleo_heatmap"),
+    ("analytics", "get_ranking"),
+    ("analytics", "get_termometro_laboral"),
+    ("analytics", "get_oferta_demanda"),
+    ("analytics", "get_dinamismo_laboral"),
+    ("analytics", "get_concentracion_laboral"),
+    ("analytics", "get_sector_municipio_matrix"),
+    ("analytics", "get_cadenas_productivas"),
+    ("analytics", "get_estacionalidad_laboral"),
+    ("analytics", "get_informalidad_laboral"),
+    ("analytics", "get_salario_imputado"),
+    ("analytics", "get_territorial_clusters"),
+    ("crossvar", "correlation_matrix"),
+]
+
+_status = {
+    "state": "idle",
+    "total": 0,
+    "completed": 0,
+    "failed": 0,
+    "started_at": None,
+    "finished_at": None,
+    "duration_seconds": None,
+}
+_lock = threading.Lock()
+# Open file holding the node's warm-up lock; the OS releases it when the worker exits
+_node_lock = None
+
+
+def _default_kwargs(fn) -> dict:
+    """Keyword arguments FastAPI would pass when no query parameters are given."""
+    kwargs = {}
+    for name, param in inspect.signature(fn).parameters.items():
+        default = param.default
+        if default is inspect.Parameter.empty:
+            continue
+        # Query(...) / Path(...) defaults are FieldInfo objects carrying the real default
+        kwargs[name] = getattr(default, "default", default)
+    return kwargs
+
+
+def build_plan() -> list[tuple[str, object, dict]]:
+    """The endpoint × dane_code matrix as ``(label, fn, kwargs)`` calls."""
+    from importlib import import_module
+    from ..routers.stats import MUNICIPIOS
+
+    def endpoint(module, name):
+        return getattr(import_module(f"..routers.{module}", __package__), name)
+
+    plan = []
+    for module, name in PER_MUNICIPIO:
+        fn = endpoint(module, name)
+        base = _default_kwargs(fn)
+        for dane in [None, *MUNICIPIOS]:
+            plan.append((f"{module}.{name}[{dane or 'regional'}]", fn, {**base, "dane_code": dane}))
+    for module, name in REGIONAL:
+        fn = endpoint(module, name)
+        plan.append((f"{module}.{name}", fn, _default_kwargs(fn)))
+    return plan
+
+
+def status() -> dict:
+    with _lock:
+        return dict(_status)
+
+
+def _update(**changes):
+    with _lock:
+        _status.update(changes)
+
+
+async def run_warmup(concurrency: int = 2, plan: list = None) -> dict:
+    """Execute the warm-up plan, returning once every call has finished."""
+    from ..database import run_sync, serial_batches
+
+    plan = build_plan() if plan is None else plan
+    started = time.time()
+    _update(state="running", total=len(plan), completed=0, failed=0,
+            started_at=started, finished_at=None, duration_seconds=None)
+    budget = asyncio.Semaphore(max(1, concurrency))
+
+    async def warm(label, fn, kwargs):
+        failed = 0
+        async with budget:
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    await fn(**kwargs)
+                else:
+                    await run_sync(fn, **kwargs)
+            except Exception as e:
+                logger.warning("Warm-up failed for %s: %s", label, e)
+                failed = 1
+        with _lock:
+            _status["completed"] += 1
+            _status["failed"] += failed
+
+    with serial_batches():
+        # The gathered tasks inherit the serial-batch context
+        await asyncio.gather(*(warm(*item) for item in plan))
+
+    finished = time.time()
+    _update(state="done", finished_at=finished, duration_seconds=round(finished - started, 3))
+    result = status()
+    logger.info("Cache warm-up done: %d calls, %d failed, %.1fs",
+                result["total"], result["failed"], result["duration_seconds"])
+    return result
+
+
+def claim_node() -> bool:
+    """Whether this worker should run the warm-up: always with per-process
+    caches, only for the first worker to lock the node with the SQLite tier."""
+    global _node_lock
+    if CACHE_BACKEND != "sqlite":
+        return True
+    if _node_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:  # no flock (Windows): every worker warms
+        return True
+    f = open(f"{CACHE_SQLITE_PATH}.warmup.lock", "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _node_lock = f
+    return True
+
+
+def start_warmup(concurrency: int = 2) -> asyncio.Task | None:
+    """Schedule the warm-up on the running loop so startup is not delayed
+    (None when another worker on the node warms the shared tier)."""
+    if not claim_node():
+        _update(state="delegated")
+        logger.info("Cache warm-up delegated to another worker (shared SQLite tier)")
+        return None
+    _update(state="running")
+    return asyncio.get_running_loop().create_task(run_warmup(concurrency), name="cache-warmup")
+
+
+def mark_disabled():
+    _update(state="disabled")
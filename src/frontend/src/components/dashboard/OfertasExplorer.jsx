@@ -12,7 +12,7 @@ function debounce(fn, ms) {
 
 export default function OfertasExplorer() {
   const {
-    ofertasExplorer, ofertasExplorerLoading,
+    ofertasExplorer, ofertasExplorerLoading, ofertasFacets,
     fetchOfertasExplorer,
     empleoData,
   } = useStore()
@@ -64,9 +64,14 @@ export default function OfertasExplorer() {
     URL.revokeObjectURL(url)
   }
 
-  // Get sector options from empleoData
-  const sectorOptions = empleoData?.sectores?.map(s => s.sector) || []
-  const fuenteOptions = empleoData?.stats?.por_fuente?.map(f => f.fuente) || []
+  // Filter options with counts from /facets; empleoData until the first response
+  const facetOptions = (dim, fallback) =>
+    ofertasFacets?.facets?.[dim] || fallback.map(value => ({ value, count: null }))
+  const facetLabel = (f) => (f.count == null ? f.value : `${f.value} (${f.count})`)
+  const sectorOptions = facetOptions('sector', empleoData?.sectores?.map(s => s.sector) || [])
+  const fuenteOptions = facetOptions('fuente', empleoData?.stats?.por_fuente?.map(f => f.fuente) || [])
+  const contratoOptions = facetOptions('tipo_contrato', ['Indefinido', 'Fijo', 'Prestacion de servicios', 'Obra o labor', 'Aprendizaje'])
+  const modalidadOptions = facetOptions('modalidad', ['Presencial', 'Remoto', 'Hibrido'])
 
   const data = ofertasExplorer
   const items = data?.items || []
@@ -103,25 +108,19 @@ export default function OfertasExplorer() {
         />
         <select value={sector} onChange={e => handleFilter('sector', e.target.value, setSector)} style={selectStyle}>
           <option value="">Todos los sectores</option>
-          {sectorOptions.map(s => <option key={s} value={s}>{s}</option>)}
+          {sectorOptions.map(s => <option key={s.value} value={s.value}>{facetLabel(s)}</option>)}
         </select>
         <select value={fuente} onChange={e => handleFilter('fuente', e.target.value, setFuente)} style={selectStyle}>
           <option value="">Todas las fuentes</option>
-          {fuenteOptions.map(f => <option key={f} value={f}>{f}</option>)}
+          {fuenteOptions.map(f => <option key={f.value} value={f.value}>{facetLabel(f)}</option>)}
         </select>
         <select value={tipoContrato} onChange={e => handleFilter('tipo_contrato', e.target.value, setTipoContrato)} style={selectStyle}>
           <option value="">Todo contrato</option>
-          <option value="Indefinido">Indefinido</option>
-          <option value="Fijo">Fijo</option>
-          <option value="Prestacion de servicios">Prestacion de servicios</option>
-          <option value="Obra o labor">Obra o labor</option>
-          <option value="Aprendizaje">Aprendizaje</option>
+          {contratoOptions.map(c => <option key={c.value} value={c.value}>{facetLabel(c)}</option>)}
         </select>
         <select value={modalidad} onChange={e => handleFilter('modalidad', e.target.value, setModalidad)} style={selectStyle}>
           <option value="">Toda modalidad</option>
-          <option value="Presencial">Presencial</option>
-          <option value="Remoto">Remoto</option>
-          <option value="Hibrido">Hibrido</option>
+          {modalidadOptions.map(m => <option key={m.value} value={m.value}>{facetLabel(m)}</option>)}
         </select>
       </div>
 
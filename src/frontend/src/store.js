@@ -157,6 +157,9 @@ export const useStore = create((set, get) => ({
   ofertasExplorer: null,
   ofertasExplorerLoading: false,
   ofertasExplorerParams: { page: 1, search: '', sector: null, fuente: null },
+  ofertasExplorerCursors: [null],
+  ofertasExplorerTotal: null,
+  ofertasFacets: null,
   sectorMunicipioMatrix: null,
   ofertaDemandaData: null,
   enrichmentData: null,
@@ -440,11 +443,35 @@ export const useStore = create((set, get) => ({
     if (merged.fuente) qs.set('fuente', merged.fuente)
     if (merged.tipo_contrato) qs.set('tipo_contrato', merged.tipo_contrato)
     if (merged.modalidad) qs.set('modalidad', merged.modalidad)
-    qs.set('page', String(merged.page || 1))
+    // Facet counts only change with the filters, i.e. when going back to page 1
+    if ((merged.page || 1) === 1) {
+      safeFetch(`${API}/empleo/facets?${qs}`)
+        .then(facets => set({ ofertasFacets: facets }))
+        .catch(e => console.error('fetchOfertasFacets:', e))
+    }
+    // Keyset pagination: cursors[i] opens page i + 1 (the UI only steps one page at a time)
+    const page = merged.page || 1
+    const cursors = page === 1 ? [null] : get().ofertasExplorerCursors
+    qs.set('mode', 'cursor')
     qs.set('page_size', '25')
+    if (cursors[page - 1]) qs.set('cursor', cursors[page - 1])
     try {
       const data = await safeFetch(`${API}/empleo/ofertas?${qs}`)
-      set({ ofertasExplorer: data, ofertasExplorerLoading: false })
+      const nextCursors = cursors.slice(0, page)
+      if (data.next_cursor) nextCursors.push(data.next_cursor)
+      const total = page === 1 ? data.total_estimate : get().ofertasExplorerTotal
+      const lastPage = data.next_cursor ? page + 1 : page
+      const totalPages = data.next_cursor
+        ? Math.max(lastPage, Math.ceil((total || 0) / data.page_size))
+        : page
+      // On the last page the exact count is known; elsewhere it is the planner estimate
+      const shownTotal = data.next_cursor ? (total || 0) : (page - 1) * data.page_size + data.items.length
+      set({
+        ofertasExplorer: { ...data, page, total: shownTotal, total_pages: totalPages },
+        ofertasExplorerCursors: nextCursors,
+        ofertasExplorerTotal: total,
+        ofertasExplorerLoading: false,
+      })
     } catch (e) {
       console.error('fetchOfertasExplorer:', e)
       set({ ofertasExplorerLoading: false })
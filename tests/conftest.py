@@ -2,6 +2,7 @@
 Shared fixtures for the Observatorio Laboral test suite.
 Uses a SQLite in-memory database to avoid depending on PostgreSQL.
 """
+import importlib
 import os
 import pytest
 from unittest.mock import patch, MagicMock
@@ -12,16 +13,14 @@ os.environ["DATABASE_URL"] = "sqlite://"
 os.environ["SENTRY_DSN"] = ""
 os.environ["RATE_LIMIT_RPM"] = "10000"  # Effectively disable rate limiting in tests
 os.environ["RATE_LIMIT_BPS"] = "10000"
+os.environ["CACHE_WARMUP"] = "0"
 
 
 @pytest.fixture()
 def mock_query_dicts():
-    """Patch query_dicts and query_dicts_batch everywhere they're imported."""
+    """Patch query_dicts and query_dicts_batch (the async variants delegate to them)."""
     with patch("src.backend.database.query_dicts") as db_mock, \
-         patch("src.backend.routers.empleo.query_dicts", db_mock), \
-         patch("src.backend.routers.analytics.query_dicts", db_mock), \
-         patch("src.backend.database.query_dicts_batch") as batch_mock, \
-         patch("src.backend.routers.analytics.query_dicts_batch", batch_mock):
+         patch("src.backend.database.query_dicts_batch") as batch_mock:
         # Expose both mocks via the fixture; tests that only need query_dicts
         # can use it as before. Tests needing batch can access .batch.
         db_mock.batch = batch_mock
@@ -46,10 +45,41 @@ def client(mock_engine):
         yield c
 
 
+def _store_installer(service: str, factory: str, doc: str):
+    """Fixture installing ``<service>.<factory>(*args)`` as the service's
+    versioned store value (see services/versioned.py)."""
+    @pytest.fixture()
+    def install_fixture(monkeypatch):
+        module = importlib.import_module(f"src.backend.services.{service}")
+
+        def install(*args):
+            value = getattr(module, factory)(*args)
+            monkeypatch.setattr(module._store, "value", value)
+            return value
+
+        return install
+
+    install_fixture.__doc__ = doc
+    return install_fixture
+
+
+terridata_cube = _store_installer(
+    "terridata", "TerriDataCube", "Install a TerriData latest-value cube built from the given rows.")
+daily_series = _store_installer(
+    "timeseries", "DailySeries", "Install a daily offers time-series store built from the given rollup rows.")
+
+
 @pytest.fixture(autouse=True)
 def clear_cache():
-    """Clear the in-memory cache between tests."""
+    """Clear the in-memory cache (and the TerriData cube / daily series / schema probes) between tests."""
     from src.backend.database import _cache
+    from src.backend.services import probe, terridata, timeseries
     _cache.clear()
+    terridata.reset()
+    timeseries.reset()
+    probe.reset()
     yield
     _cache.clear()
+    terridata.reset()
+    timeseries.reset()
+    probe.reset()
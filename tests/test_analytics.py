@@ -1,62 +1,89 @@
 """Tests for the analytics router endpoints."""
+from datetime import date, timedelta
 from unittest.mock import patch
 
 
+def td(indicador, entidad, dane_code, valor, anio, codigo_entidad=None):
+    """One cube source row (latest per indicador × entidad)."""
+    return {"indicador": indicador, "entidad": entidad, "dane_code": dane_code,
+            "codigo_entidad": codigo_entidad if codigo_entidad is not None else int(dane_code),
+            "dato_numerico": valor, "anio": anio}
+
+
 class TestGaps:
-    def test_gaps_returns_brecha(self, client, mock_query_dicts):
-        mock_query_dicts.return_value = [{
-            "municipio": "Apartadó",
-            "valor_municipio": 200000,
-            "promedio_regional": 150000,
-            "brecha_absoluta": 50000,
-            "brecha_porcentual": 33.3,
-            "anio": 2023,
-        }]
+    def test_gaps_returns_brecha(self, client, terridata_cube):
+        terridata_cube([
+            td("Población total", "Apartadó", "05045", 200000, 2023),
+            td("Población total", "Turbo", "05837", 100000, 2023),
+            td("Población total", "Necoclí", "05490", 70000, 2021),
+        ])
         resp = client.get("/api/analytics/gaps?dane_code=05045&indicador=Población total")
         assert resp.status_code == 200
         data = resp.json()
         assert data["municipio"] == "Apartadó"
+        assert data["promedio_regional"] == 150000  # latest year only
         assert data["brecha_absoluta"] == 50000
+        assert round(data["brecha_porcentual"], 1) == 33.3
+        assert data["anio"] == 2023
 
-    def test_gaps_not_found(self, client, mock_query_dicts):
-        mock_query_dicts.return_value = []
+    def test_gaps_not_found(self, client, terridata_cube):
+        terridata_cube([td("Población total", "Apartadó", "05045", 200000, 2023)])
         resp = client.get("/api/analytics/gaps?dane_code=99999")
         assert resp.status_code == 404
 
 
 class TestRanking:
-    def test_ranking_returns_ordered_list(self, client, mock_query_dicts):
-        mock_query_dicts.return_value = [
-            {"municipio": "Apartadó", "dane_code": "05045", "valor": 200000, "anio": 2023},
-            {"municipio": "Turbo", "dane_code": "05837", "valor": 180000, "anio": 2023},
-        ]
+    ROWS = [
+        td("Población total", "Turbo", "05837", 180000, 2023),
+        td("Población total", "Apartadó", "05045", 200000, 2023),
+        td("Población total", "Necoclí", "05490", None, 2022),
+    ]
+
+    def test_ranking_returns_ordered_list(self, client, terridata_cube):
+        terridata_cube(self.ROWS)
         resp = client.get("/api/analytics/ranking?indicador=Población total&order=desc")
         assert resp.status_code == 200
         data = resp.json()
-        assert len(data) == 2
-        assert data[0]["valor"] >= data[1]["valor"]
+        assert [r["municipio"] for r in data] == ["Necoclí", "Apartadó", "Turbo"]  # NULLS FIRST
+        assert data[1] == {"municipio": "Apartadó", "dane_code": "05045", "valor": 200000, "anio": 2023}
+
+    def test_ranking_ascending_nulls_last(self, client, terridata_cube):
+        terridata_cube(self.ROWS)
+        data = client.get("/api/analytics/ranking?indicador=Población total&order=asc").json()
+        assert [r["valor"] for r in data] == [180000, 200000, None]
+
+
+def day(dia, municipio, sector, ofertas, salario_suma=0, salario_n=0):
+    """One empleo.ofertas_rollup_diario row."""
+    return {"dia": dia, "municipio": municipio, "sector": sector, "ofertas": ofertas,
+            "salario_suma": salario_suma, "salario_n": salario_n}
 
 
 class TestTermometro:
-    def test_termometro_laboral(self, client, mock_query_dicts):
-        mock_query_dicts.return_value = [
-            {"municipio": "Apartadó", "ultimos_7_dias": 10, "anteriores_7_dias": 8,
-             "ultimos_30_dias": 40, "total": 100},
-        ]
+    def test_termometro_laboral(self, client, mock_query_dicts, daily_series):
+        today = date.today()
+        daily_series([
+            day(today - timedelta(days=2), "Apartadó", "Salud", 10),
+            day(today - timedelta(days=10), "Apartadó", "Salud", 8),
+            day(today - timedelta(days=20), "Apartadó", "Agro", 22),
+            day(today - timedelta(days=400), "Apartadó", "Agro", 50),
+            day(None, "Apartadó", None, 10),
+            day(today - timedelta(days=3), "Turbo", "Agro", 4),
+        ])
         resp = client.get("/api/analytics/laboral/termometro")
         assert resp.status_code == 200
+        assert mock_query_dicts.call_count == 0
         data = resp.json()
-        assert len(data) == 1
-        assert "tendencia" in data[0]
-        assert data[0]["tendencia"] == 25.0  # (10-8)/8*100
+        assert [r["municipio"] for r in data] == ["Apartadó", "Turbo"]
+        assert data[0] == {"municipio": "Apartadó", "ultimos_7_dias": 10, "anteriores_7_dias": 8,
+                           "ultimos_30_dias": 40, "total": 100, "tendencia": 25.0}  # (10-8)/8*100
+        assert data[1]["tendencia"] == 400.0  # no previous week: divided by 1
 
 
 class TestOfertaDemanda:
-    def test_oferta_demanda(self, client, mock_query_dicts):
-        mock_query_dicts.batch.return_value = [
-            [{"municipio": "Apartadó", "dane_code": "05045", "vacantes": 50}],
-            [{"dane_code": "05045", "municipio": "Apartadó", "poblacion": 200000, "anio": 2023}],
-        ]
+    def test_oferta_demanda(self, client, mock_query_dicts, terridata_cube):
+        mock_query_dicts.return_value = [{"municipio": "Apartadó", "dane_code": "05045", "vacantes": 50}]
+        terridata_cube([td("Población total", "Apartadó", "05045", 200000, 2023)])
         resp = client.get("/api/analytics/laboral/oferta-demanda")
         assert resp.status_code == 200
         data = resp.json()
@@ -81,18 +108,22 @@ class TestBrechaSkills:
 
 
 class TestDinamismo:
-    def test_dinamismo_laboral(self, client, mock_query_dicts):
-        mock_query_dicts.return_value = [
-            {"mes": "2025-01", "ofertas": 40, "empresas": 10, "municipios": 5,
-             "sectores": 4, "crecimiento_pct": None},
-            {"mes": "2025-02", "ofertas": 52, "empresas": 12, "municipios": 6,
-             "sectores": 5, "crecimiento_pct": 30.0},
-        ]
+    def test_dinamismo_laboral(self, client, mock_query_dicts, daily_series):
+        daily_series([
+            day("2025-01-03", "Apartadó", "Agro", 25),
+            day("2025-01-20", "Turbo", "Salud", 15),
+            day("2025-02-11", "Turbo", None, 52),
+            day("2025-04-01", None, "Agro", 26),
+            day(None, "Turbo", "Agro", 7),
+        ], [{"mes": "2025-01", "empresas": 10}, {"mes": "2025-02", "empresas": 12}])
         resp = client.get("/api/analytics/laboral/dinamismo")
         assert resp.status_code == 200
-        data = resp.json()
-        assert len(data) == 2
-        assert data[1]["crecimiento_pct"] == 30.0
+        assert mock_query_dicts.call_count == 0
+        assert resp.json() == [
+            {"mes": "2025-01", "ofertas": 40, "empresas": 10, "municipios": 2, "sectores": 2, "crecimiento_pct": None},
+            {"mes": "2025-02", "ofertas": 52, "empresas": 12, "municipios": 1, "sectores": 0, "crecimiento_pct": 30.0},
+            {"mes": "2025-04", "ofertas": 26, "empresas": 0, "municipios": 0, "sectores": 1, "crecimiento_pct": -50.0},
+        ]
 
 
 class TestSectorMunicipio:
@@ -114,12 +145,12 @@ class TestSectorMunicipio:
 class TestCadenasProductivas:
     def test_cadenas_returns_list(self, client, mock_query_dicts):
         mock_query_dicts.batch.return_value = [
-            # sector_data
+            # sector × municipio cells
             [
-                {"sector": "Agroindustria", "municipio": "Apartadó", "ofertas": 40,
-                 "empresas": 8, "salario_promedio": 1500000},
-                {"sector": "Turismo y Gastronomía", "municipio": "Turbo", "ofertas": 15,
-                 "empresas": 5, "salario_promedio": 1200000},
+                {"sector": "Agroindustria", "municipio": "Apartadó",
+                 "ofertas": 40, "salario_suma": 30000000, "salario_n": 20},
+                {"sector": "Turismo y Gastronomía", "municipio": "Turbo",
+                 "ofertas": 15, "salario_suma": 12000000, "salario_n": 10},
             ],
             # skills_data
             [
@@ -127,6 +158,8 @@ class TestCadenasProductivas:
                 {"sector": "Agroindustria", "skill": "Empaque", "demanda": 8},
                 {"sector": "Turismo y Gastronomía", "skill": "Hotelería", "demanda": 5},
             ],
+            # distinct empresas per cadena
+            [{"cadena": "Banano y Plátano", "empresas": 8}, {"cadena": "Ganadería y Lácteos", "empresas": 8}],
         ]
         resp = client.get("/api/analytics/laboral/cadenas-productivas")
         assert resp.status_code == 200
@@ -144,42 +177,74 @@ class TestCadenasProductivas:
         assert "municipios" in first
 
     def test_cadenas_empty_data(self, client, mock_query_dicts):
-        mock_query_dicts.batch.return_value = [[], []]
+        mock_query_dicts.batch.return_value = [[], [], []]
         resp = client.get("/api/analytics/laboral/cadenas-productivas")
         assert resp.status_code == 200
         data = resp.json()
         assert isinstance(data, list)
 
+    def test_single_pass_aggregation(self):
+        from src.backend.services.cadenas import SECTOR_CADENAS, aggregate_cadenas
 
-class TestEstacionalidad:
-    def test_estacionalidad_returns_profile(self, client, mock_query_dicts):
-        mock_query_dicts.batch.return_value = [
-            # sector × month data
-            [
-                {"mes": 1, "sector": "Agroindustria", "ofertas": 20, "salario_promedio": 1500000},
-                {"mes": 2, "sector": "Agroindustria", "ofertas": 25, "salario_promedio": 1600000},
-                {"mes": 1, "sector": "Salud", "ofertas": 10, "salario_promedio": 2000000},
-            ],
-            # general monthly data
-            [
-                {"mes": 1, "ofertas": 30, "salario_promedio": 1600000},
-                {"mes": 2, "ofertas": 25, "salario_promedio": 1600000},
-            ],
+        assert SECTOR_CADENAS["Mantenimiento"] == ("Ganadería y Lácteos", "Construcción e Infraestructura")
+        cells = [
+            {"sector": "Agroindustria", "municipio": "Apartadó", "ofertas": 3, "salario_suma": 4000000, "salario_n": 2},
+            {"sector": "Mantenimiento", "municipio": "Turbo", "ofertas": 1, "salario_suma": None, "salario_n": 0},
+            {"sector": "Mantenimiento", "municipio": None, "ofertas": 2, "salario_suma": 3000000, "salario_n": 1},
+        ]
+        skills = [
+            {"sector": "Agroindustria", "skill": "Ganadería", "demanda": 2},
+            {"sector": "Mantenimiento", "skill": "Ganadería", "demanda": 1},
+            {"sector": "Mantenimiento", "skill": "Soldadura", "demanda": 4},
         ]
+        cadenas = {c["cadena"]: c for c in aggregate_cadenas(cells, skills, {"Ganadería y Lácteos": 1})}
+        ganaderia = cadenas["Ganadería y Lácteos"]
+        assert (ganaderia["ofertas"], ganaderia["empresas"], ganaderia["salario_promedio"]) == (6, 1, 2333333)
+        assert ganaderia["top_skills"] == [{"skill": "Ganadería", "demanda": 3}]
+        assert ganaderia["municipios"] == [{"municipio": "Apartadó", "ofertas": 3},
+                                           {"municipio": None, "ofertas": 2},
+                                           {"municipio": "Turbo", "ofertas": 1}]
+        assert cadenas["Construcción e Infraestructura"]["top_skills"] == [{"skill": "Soldadura", "demanda": 4}]
+        assert cadenas["Turismo y Gastronomía"] == {
+            "cadena": "Turismo y Gastronomía", "sectores": ["Turismo y Gastronomía"], "ofertas": 0,
+            "empresas": 0, "salario_promedio": None, "top_skills": [], "municipios": []}
+
+    def test_distinct_empresas_query(self, client, mock_query_dicts):
+        mock_query_dicts.batch.return_value = [[], [], [{"cadena": "Banano y Plátano", "empresas": 3}]]
+        data = client.get("/api/analytics/laboral/cadenas-productivas").json()
+        sql, params = mock_query_dicts.batch.call_args.args[0][2]
+        assert "COUNT(DISTINCT o.empresa)" in sql
+        assert params["link_sectores"].count("Mantenimiento") == 2
+        assert {c["cadena"]: c["empresas"] for c in data}["Banano y Plátano"] == 3
+
+
+class TestEstacionalidad:
+    def test_estacionalidad_returns_profile(self, client, mock_query_dicts, daily_series):
+        daily_series([
+            day("2024-01-10", "Apartadó", "Agroindustria", 20, 30000000, 20),
+            day("2024-02-10", "Apartadó", "Agroindustria", 25, 40000000, 25),
+            day("2025-01-15", "Turbo", "Salud", 10, 20000000, 10),
+        ])
         resp = client.get("/api/analytics/laboral/estacionalidad")
         assert resp.status_code == 200
+        assert mock_query_dicts.call_count == 0
         data = resp.json()
         assert "perfil_general" in data
         assert "sectores_estacionales" in data
-        assert "promedio_mensual" in data
-        assert len(data["perfil_general"]) == 2
-        # Check classification
+        assert data["promedio_mensual"] == 5  # 55 / 12
+        enero, febrero = data["perfil_general"]
+        assert (enero["mes"], enero["ofertas"], enero["salario_promedio"]) == (1, 30, 1666667)
+        assert (febrero["mes"], febrero["ofertas"], febrero["salario_promedio"]) == (2, 25, 1600000)
+        # Under two years of data: calendar-month mean (Jan 15, Feb 25, others 0) over their mean
+        assert (enero["indice_estacional"], febrero["indice_estacional"]) == (4.5, 7.5)
         for m in data["perfil_general"]:
             assert m["clasificacion"] in ("pico", "valle", "normal")
             assert "mes_nombre" in m
+        agro = data["sectores_estacionales"][0]
+        assert (agro["sector"], agro["total"], agro["Ene"], agro["Feb"]) == ("Agroindustria", 45, 20, 25)
 
-    def test_estacionalidad_empty(self, client, mock_query_dicts):
-        mock_query_dicts.batch.return_value = [[], []]
+    def test_estacionalidad_empty(self, client, daily_series):
+        daily_series([])
         resp = client.get("/api/analytics/laboral/estacionalidad")
         assert resp.status_code == 200
         data = resp.json()
@@ -188,16 +253,15 @@ class TestEstacionalidad:
 
 
 class TestInformalidad:
-    def test_informalidad_returns_ranking(self, client, mock_query_dicts):
+    def test_informalidad_returns_ranking(self, client, mock_query_dicts, terridata_cube):
         mock_query_dicts.batch.return_value = [
             # IPM data
             [{"municipio": "Apartadó", "dane_code": "05045", "tasa_ipm": 65.2}],
             # Proxy data
             [{"municipio": "Apartadó", "dane_code": "05045", "total_ofertas": 50,
               "no_indefinido": 20, "indefinido": 30}],
-            # Pobreza data
-            [{"dane_code": "05045", "pobreza_monetaria": 45.0, "anio": 2023}],
         ]
+        terridata_cube([td("Incidencia de la pobreza monetaria", "Apartadó", "05045", 45.0, 2023)])
         resp = client.get("/api/analytics/laboral/informalidad")
         assert resp.status_code == 200
         data = resp.json()
@@ -210,8 +274,9 @@ class TestInformalidad:
         assert item["pobreza_monetaria"] == 45.0
         assert item["indice_compuesto"] is not None
 
-    def test_informalidad_empty(self, client, mock_query_dicts):
-        mock_query_dicts.batch.return_value = [[], [], []]
+    def test_informalidad_empty(self, client, mock_query_dicts, terridata_cube):
+        mock_query_dicts.batch.return_value = [[], []]
+        terridata_cube([])
         resp = client.get("/api/analytics/laboral/informalidad")
         assert resp.status_code == 200
         assert resp.json() == []
@@ -220,11 +285,14 @@ class TestInformalidad:
 class TestSalarioImputado:
     def test_salario_imputado_returns_cobertura(self, client, mock_query_dicts):
         mock_query_dicts.batch.return_value = [
-            # Reference table
+            # Salary rollup cells
             [
                 {"sector": "Agroindustria", "municipio": "Apartadó",
                  "nivel_educativo": "Bachiller", "nivel_experiencia": "1 ano",
-                 "salario_estimado": 1300000, "muestra": 5, "mediana": 1300000},
+                 "salario_n": 5, "salario_suma": 6500000, "salario_sketch": '{"713": 5}'},
+                {"sector": "Agroindustria", "municipio": "Turbo",
+                 "nivel_educativo": None, "nivel_experiencia": None,
+                 "salario_n": 2, "salario_suma": 2600000, "salario_sketch": '{"713": 2}'},
             ],
             # Coverage stats
             [{"total": 200, "con_salario": 80, "con_imputado": 60}],
@@ -237,3 +305,19 @@ class TestSalarioImputado:
         assert data["cobertura"]["total_ofertas"] == 200
         assert data["cobertura"]["pct_salario_real"] == 40.0
         assert data["cobertura"]["pct_cobertura_total"] == 70.0
+        # Cells under the 3-salary minimum are left out
+        assert data["tabla_referencia"] == [{
+            "sector": "Agroindustria", "municipio": "Apartadó", "nivel_educativo": "Bachiller",
+            "nivel_experiencia": "1 ano", "salario_estimado": 1300000, "muestra": 5,
+            "mediana": round(2 * 1.02 ** 713 / 2.02),
+        }]
+
+    def test_salario_imputado_without_rollup_uses_exact_medians(self, client, mock_query_dicts):
+        mock_query_dicts.batch.return_value = [[], [{"total": 10, "con_salario": 4, "con_imputado": 0}]]
+        row = {"sector": "Salud", "municipio": "Turbo", "nivel_educativo": None, "nivel_experiencia": None,
+               "salario_estimado": 2000000, "muestra": 4, "mediana": 1900000}
+        mock_query_dicts.return_value = [row]
+        data = client.get("/api/analytics/laboral/salario-imputado").json()
+        assert data["tabla_referencia"] == [row]
+        sql = mock_query_dicts.call_args.args[0]
+        assert "PERCENTILE_CONT(0.5)" in sql and "salario_numerico > 0" in sql
@@ -0,0 +1,413 @@
+"""Tests for the bounded LRU/TTL cache engine and its stats endpoint."""
+import asyncio
+import gzip
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.backend.services.cache import CacheNamespace, CacheRegistry
+from src.backend.services.shared_cache import SQLiteCacheBackend
+from src.backend.services.encoding import EncodedPayload
+from src.backend.services import warmup
+from src.backend.database import cached, _cache
+
+
+class TestCacheNamespace:
+    def test_lru_eviction_by_entries(self):
+        ns = CacheNamespace("t", max_entries=2, max_bytes=10_000)
+        ns.set("a", 1, 60)
+        ns.set("b", 2, 60)
+        ns.get("a")  # "b" becomes least recently used
+        ns.set("c", 3, 60)
+        assert ns.get("b") is None
+        assert ns.get("a").value == 1
+        assert ns.get("c").value == 3
+        assert ns.stats.evictions == 1
+
+    def test_eviction_by_bytes(self):
+        ns = CacheNamespace("t", max_entries=100, max_bytes=250)
+        ns.set("a", b"x" * 100, 60)
+        ns.set("b", b"x" * 100, 60)
+        ns.set("c", b"x" * 100, 60)
+        assert len(ns) == 2
+        assert ns.bytes_used <= 250
+        assert ns.get("a") is None
+
+    def test_oversized_value_rejected(self):
+        ns = CacheNamespace("t", max_entries=10, max_bytes=50)
+        assert ns.set("big", b"x" * 100, 60) is False
+        assert len(ns) == 0
+        assert ns.stats.rejected == 1
+
+    def test_expired_entry_counts_as_miss(self):
+        ns = CacheNamespace("t", max_entries=10, max_bytes=10_000)
+        ns.set("a", 1, 10, now=100.0)
+        assert ns.get("a", now=105.0).value == 1
+        assert ns.get("a", now=111.0) is None
+        assert ns.stats.hits == 1
+        assert ns.stats.misses == 1
+        assert ns.stats.expirations == 1
+
+    def test_purge_expired(self):
+        ns = CacheNamespace("t", max_entries=10, max_bytes=10_000)
+        ns.set("old", 1, 5, now=100.0)
+        ns.set("new", 2, 60, now=100.0)
+        assert ns.purge_expired(now=110.0) == 1
+        assert len(ns) == 1
+
+
+class TestCacheRegistry:
+    def test_periodic_sweep(self):
+        reg = CacheRegistry(max_entries=10, max_bytes=10_000, sweep_interval=30)
+        ns = reg.namespace("x")
+        ns.set("k", 1, 1)
+        assert reg.maybe_sweep(now=0) == 0
+        assert reg.maybe_sweep(now=time.time() + 31) == 1
+
+    def test_namespace_budgets_override_defaults(self):
+        reg = CacheRegistry(max_entries=10, max_bytes=10_000)
+        ns = reg.namespace("x", max_entries=3)
+        assert ns.max_entries == 3
+        assert ns.max_bytes == 10_000
+
+    def test_stats_totals(self):
+        reg = CacheRegistry()
+        ns = reg.namespace("x")
+        ns.set("k", 1, 60)
+        ns.get("k")
+        ns.get("missing")
+        stats = reg.stats()
+        assert stats["namespaces"]["x"]["hits"] == 1
+        assert stats["totals"]["misses"] == 1
+        assert stats["totals"]["hit_ratio"] == 0.5
+
+
+class TestCachedDecoratorBudget:
+    def test_decorator_respects_max_entries(self):
+        @cached(ttl_seconds=60, max_entries=2)
+        def bounded(x):
+            return x
+
+        for i in range(5):
+            bounded(i)
+        assert len(bounded.cache_namespace) == 2
+        assert bounded.cache_namespace.stats.evictions == 3
+
+
+class TestCacheStatsEndpoint:
+    def test_stats_endpoint_reports_endpoint_counters(self, client, mock_query_dicts):
+        mock_query_dicts.return_value = [{"skill": "Excel", "demanda": 10}]
+        client.get("/api/empleo/skills")
+        client.get("/api/empleo/skills")
+        resp = client.get("/api/cache/stats")
+        assert resp.status_code == 200
+        ns = resp.json()["namespaces"]["empleo.get_skills_demand"]
+        assert ns["hits"] >= 1
+        assert ns["entries"] == 1
+
+
+class TestSingleFlight:
+    N_CALLERS = 8
+
+    def _run_concurrently(self, fn):
+        barrier = threading.Barrier(self.N_CALLERS)
+
+        def call():
+            barrier.wait()
+            return fn()
+
+        with ThreadPoolExecutor(max_workers=self.N_CALLERS) as pool:
+            return [f.result() for f in [pool.submit(call) for _ in range(self.N_CALLERS)]]
+
+    def test_concurrent_misses_execute_query_once(self, mock_query_dicts):
+        from src.backend.routers.empleo import get_skills_demand
+
+        def slow_query(sql, params=None):
+            time.sleep(0.2)
+            return [{"skill": "Excel", "demanda": 10}]
+
+        mock_query_dicts.side_effect = slow_query
+        stats = get_skills_demand.cache_namespace.stats
+        coalesced_before = stats.coalesced
+
+        async def burst():
+            return await asyncio.gather(*[
+                get_skills_demand(dane_code=None, sector=None, limit=25)
+                for _ in range(self.N_CALLERS)
+            ])
+
+        results = asyncio.run(burst())
+        assert mock_query_dicts.call_count == 1
+        assert all(r == [{"skill": "Excel", "demanda": 10}] for r in results)
+        assert stats.coalesced - coalesced_before == self.N_CALLERS - 1
+
+    def test_concurrent_sync_misses_compute_once(self):
+        calls = 0
+
+        @cached(ttl_seconds=60)
+        def slow():
+            nonlocal calls
+            calls += 1
+            time.sleep(0.2)
+            return "ok"
+
+        assert self._run_concurrently(slow) == ["ok"] * self.N_CALLERS
+        assert calls == 1
+
+    def test_error_is_shared_and_not_cached(self):
+        calls = 0
+
+        @cached(ttl_seconds=60)
+        def failing():
+            nonlocal calls
+            calls += 1
+            time.sleep(0.1)
+            raise RuntimeError("db down")
+
+        def call():
+            try:
+                failing()
+            except RuntimeError:
+                return "error"
+
+        assert self._run_concurrently(call) == ["error"] * self.N_CALLERS
+        assert calls == 1
+        assert len(failing.cache_namespace) == 0
+
+
+class TestStaleWhileRevalidate:
+    def _wait_for(self, predicate, timeout=2.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_serves_stale_and_refreshes_in_background(self):
+        calls = 0
+
+        @cached(ttl_seconds=0.1, max_stale_seconds=5)
+        def dashboard():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        ns = dashboard.cache_namespace
+        assert dashboard() == 1
+        time.sleep(0.15)
+        assert dashboard() == 1  # stale value returned immediately
+        assert self._wait_for(lambda: ns.peek(((), ())) is not None)
+        assert dashboard() == 2
+        assert ns.stats.stale_hits == 1
+        assert ns.stats.refreshes == 1
+        assert ns.stats.last_refresh_seconds is not None
+
+    def test_recomputes_inline_beyond_max_staleness(self):
+        calls = 0
+
+        @cached(ttl_seconds=0.05, max_stale_seconds=0.05)
+        def short_lived():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert short_lived() == 1
+        time.sleep(0.15)
+        assert short_lived() == 2
+        assert short_lived.cache_namespace.stats.stale_hits == 0
+
+    def test_failed_refresh_keeps_stale_value(self):
+        calls = 0
+
+        @cached(ttl_seconds=0.1, max_stale_seconds=5)
+        def flaky():
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                raise RuntimeError("db down")
+            return "ok"
+
+        ns = flaky.cache_namespace
+        assert flaky() == "ok"
+        time.sleep(0.15)
+        assert flaky() == "ok"
+        assert self._wait_for(lambda: ns.stats.refresh_errors == 1)
+        assert flaky() == "ok"
+
+
+class TestDataVersionKeys:
+    def test_version_bump_invalidates_entry(self):
+        calls = 0
+
+        @cached(ttl_seconds=60, depends_on=("empleo",))
+        def versioned():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        with patch("src.backend.database.get_data_versions", return_value={"empleo": 7}):
+            assert versioned() == 1
+            assert versioned() == 1
+        with patch("src.backend.database.get_data_versions", return_value={"empleo": 8}):
+            assert versioned() == 2
+        # Entries for the old version are dropped, not left to age out
+        assert len(versioned.cache_namespace) == 1
+
+    def test_known_version_extends_ttl(self):
+        @cached(ttl_seconds=0.05, depends_on=("empleo",))
+        def long_lived():
+            return time.time()
+
+        with patch("src.backend.database.get_data_versions", return_value={"empleo": 1}):
+            first = long_lived()
+            time.sleep(0.1)
+            assert long_lived() == first
+
+    def test_unknown_version_falls_back_to_ttl(self):
+        @cached(ttl_seconds=0.05, depends_on=("empleo",))
+        def short_lived():
+            return time.time()
+
+        with patch("src.backend.database.get_data_versions", return_value={}):
+            first = short_lived()
+            time.sleep(0.1)
+            assert short_lived() != first
+
+    def test_get_data_versions_tolerates_missing_table(self):
+        from src.backend import database
+
+        with patch.dict(database._data_versions, {"values": {}, "checked_at": 0.0}):
+            assert database.get_data_versions() == {}
+
+
+class TestSharedBackend:
+    def test_second_worker_reuses_shared_entry(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        worker_a = CacheRegistry(backend=SQLiteCacheBackend(path)).namespace("empleo.x")
+        worker_b = CacheRegistry(backend=SQLiteCacheBackend(path)).namespace("empleo.x")
+        calls = 0
+
+        def compute():
+            nonlocal calls
+            calls += 1
+            return [{"skill": "Excel", "demanda": 10}]
+
+        assert worker_a.load("k", compute, 60) == [{"skill": "Excel", "demanda": 10}]
+        assert worker_b.load("k", compute, 60) == [{"skill": "Excel", "demanda": 10}]
+        assert calls == 1
+        assert worker_b.stats.shared_hits == 1
+        assert len(worker_b) == 1  # promoted into L1
+
+    def test_expired_shared_entry_is_ignored(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+        ns = CacheNamespace("t", max_entries=10, max_bytes=10_000, backend=backend)
+        ns.set("k", 1, 10, now=100.0)
+        assert backend.get("t", "k", now=105.0).value == 1
+        assert backend.get("t", "k", now=111.0) is None
+        assert backend.purge_expired(now=111.0) == 1
+
+    def test_unpicklable_value_stays_local(self, tmp_path):
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+        ns = CacheNamespace("t", max_entries=10, max_bytes=10_000, backend=backend)
+        value = lambda: None  # noqa: E731
+        assert ns.set("k", value, 60) is True
+        assert ns.get("k").value is value
+        assert backend.stats()["entries"] == 0
+
+
+class TestEncodedPayloads:
+    ROWS = [{"sector": f"Sector {i}", "municipio": "Apartadó", "ofertas": i} for i in range(200)]
+
+    def test_payload_variants(self):
+        payload = EncodedPayload.encode(self.ROWS)
+        assert payload.decode() == self.ROWS
+        assert gzip.decompress(payload.gzip) == payload.identity
+        resp = payload.response("gzip, deflate")
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.body == payload.gzip
+        assert "Content-Encoding" not in payload.response("gzip;q=0, identity").headers
+
+    def test_small_payload_not_compressed(self):
+        payload = EncodedPayload.encode({"ok": True})
+        assert payload.gzip is None
+        assert payload.response("gzip").body == b'{"ok":true}'
+
+    def test_endpoint_serves_cached_gzip_body(self, client, mock_query_dicts):
+        mock_query_dicts.return_value = self.ROWS
+        with patch.object(EncodedPayload, "encode", wraps=EncodedPayload.encode) as encode:
+            first = client.get("/api/analytics/laboral/sector-municipio",
+                               headers={"Accept-Encoding": "gzip"})
+            second = client.get("/api/analytics/laboral/sector-municipio",
+                                headers={"Accept-Encoding": "gzip"})
+        assert first.headers["Content-Encoding"] == "gzip"
+        assert second.json() == first.json()
+        assert encode.call_count == 1
+
+    def test_direct_call_returns_decoded_value(self, mock_query_dicts):
+        from src.backend.routers.analytics import get_sector_municipio_matrix
+
+        mock_query_dicts.return_value = [{"sector": "Comercio", "municipio": "Turbo", "ofertas": 3}]
+        assert asyncio.run(get_sector_municipio_matrix()) == [{"sector": "Comercio", "total": 3, "Turbo": 3}]
+
+
+class TestWarmup:
+    def test_plan_covers_every_municipio_and_region(self):
+        from src.backend.routers.stats import MUNICIPIOS
+
+        plan = warmup.build_plan()
+        summary = [kw for label, _, kw in plan if label.startswith("stats.get_summary")]
+        assert sorted(kw["dane_code"] or "" for kw in summary) == sorted(["", *MUNICIPIOS])
+        assert len(plan) == len(warmup.PER_MUNICIPIO) * (len(MUNICIPIOS) + 1) + len(warmup.REGIONAL)
+
+    def test_query_defaults_are_resolved(self):
+        from src.backend.routers.empleo import get_skills_demand
+
+        assert warmup._default_kwargs(get_skills_demand) == {"dane_code": None, "sector": None, "limit": 25}
+
+    def test_warmup_populates_request_cache_keys(self, client, mock_query_dicts):
+        from src.backend.routers.empleo import get_skills_demand
+
+        mock_query_dicts.return_value = [{"skill": "Excel", "demanda": 10}]
+        plan = [("skills", get_skills_demand, {**warmup._default_kwargs(get_skills_demand), "dane_code": "05045"})]
+        result = asyncio.run(warmup.run_warmup(concurrency=2, plan=plan))
+        assert result["state"] == "done"
+        assert result["completed"] == 1 and result["failed"] == 0
+
+        client.get("/api/empleo/skills?dane_code=05045")
+        assert mock_query_dicts.call_count == 1  # served from the warmed entry
+
+    def test_failures_are_counted(self):
+        def broken(dane_code=None):
+            raise RuntimeError("db down")
+
+        result = asyncio.run(warmup.run_warmup(plan=[("broken", broken, {})]))
+        assert result["failed"] == 1
+
+    def test_single_worker_warms_shared_tier(self, tmp_path, monkeypatch):
+        import fcntl
+
+        path = tmp_path / "cache.sqlite3"
+        monkeypatch.setattr(warmup, "CACHE_BACKEND", "sqlite")
+        monkeypatch.setattr(warmup, "CACHE_SQLITE_PATH", str(path))
+        monkeypatch.setattr(warmup, "_node_lock", None)
+        # Another worker on the node already holds the warm-up lock
+        with open(f"{path}.warmup.lock", "a") as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            assert warmup.claim_node() is False
+        assert warmup.claim_node() is True
+        warmup._node_lock.close()
+
+    def test_per_process_caches_always_warm(self, monkeypatch):
+        monkeypatch.setattr(warmup, "CACHE_BACKEND", "memory")
+        assert warmup.claim_node() is True
+
+    def test_readiness_endpoint(self, client):
+        with patch.dict(warmup._status, {"state": "running"}):
+            assert client.get("/api/cache/ready").status_code == 503
+        with patch.dict(warmup._status, {"state": "delegated"}):
+            assert client.get("/api/cache/ready").status_code == 200
+        with patch.dict(warmup._status, {"state": "done"}):
+            resp = client.get("/api/cache/ready")
+            assert resp.status_code == 200
+            assert resp.json()["ready"] is True
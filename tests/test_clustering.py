@@ -0,0 +1,73 @@
+"""Tests for the k-means territorial clustering."""
+import numpy as np
+import pytest
+
+from src.backend.services.clustering import kmeans, standardize
+
+
+class TestStandardize:
+    def test_zscores_and_imputation(self):
+        Z = standardize(np.array([[1.0, 10.0], [3.0, np.nan], [5.0, 30.0]]))
+        np.testing.assert_allclose(Z[:, 0], [-1.224745, 0.0, 1.224745], atol=1e-6)
+        assert Z[1, 1] == 0.0  # missing -> feature mean
+        np.testing.assert_allclose(Z[[0, 2], 1], [-1.0, 1.0])
+
+    def test_log_and_constant_columns(self):
+        Z = standardize(np.array([[9.0, 2.0], [99.0, 2.0], [999.0, 2.0]]), log=[True, False])
+        np.testing.assert_allclose(np.diff(Z[:, 0]), np.diff(Z[:, 0])[0])  # evenly spaced once logged
+        assert (Z[:, 1] == 0).all()
+
+
+class TestKMeans:
+    X = np.array([[0.0, 0.0], [0.1, 0.2], [0.2, 0.1], [5.0, 5.0], [5.1, 4.9], [10.0, 0.0]])
+
+    def test_separates_groups_largest_first(self):
+        result = kmeans(self.X, 3)
+        assert result.labels.tolist() == [0, 0, 0, 1, 1, 2]
+        np.testing.assert_allclose(result.centroids[1], [5.05, 4.95])
+        assert result.inertia == pytest.approx(0.04 + 0.01)
+
+    def test_deterministic(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(300, 4))
+        first, second = kmeans(X, 5, seed=11), kmeans(X, 5, seed=11)
+        assert (first.labels == second.labels).all()
+        np.testing.assert_array_equal(first.centroids, second.centroids)
+
+    def test_k_capped_by_points(self):
+        assert kmeans(self.X[:2], 4).centroids.shape == (2, 2)
+        with pytest.raises(ValueError):
+            kmeans(np.empty((0, 2)), 2)
+
+
+class TestClustersEndpoint:
+    @staticmethod
+    def rows():
+        munis = [("Apartadó", "05045", 200000, 30.0), ("Turbo", "05837", 180000, 35.0),
+                 ("Necoclí", "05490", 70000, 60.0), ("Arboletes", "05051", 45000, 65.0),
+                 ("San Juan de Urabá", "05659", 25000, 70.0)]
+        rows = []
+        for muni, dane, pob, pobreza in munis:
+            for indicador, valor in (("Población total", pob), ("Incidencia de la pobreza monetaria", pobreza)):
+                rows.append({"indicador": indicador, "entidad": muni, "codigo_entidad": int(dane),
+                             "dane_code": dane, "dato_numerico": valor, "anio": 2023})
+        return rows
+
+    def test_clusters(self, client, mock_query_dicts, terridata_cube):
+        terridata_cube(self.rows())
+        data = client.get("/api/analytics/clusters?k=2&variables=poblacion,pobreza").json()
+        assert mock_query_dicts.call_count == 0
+        assert data["k"] == 2 and data["variables"] == ["poblacion", "pobreza"]
+        by_muni = {m["municipio"]: m["cluster"] for m in data["municipios"]}
+        assert by_muni["Apartadó"] == by_muni["Turbo"] != by_muni["Necoclí"] == by_muni["Arboletes"]
+        urbano = data["clusters"][by_muni["Apartadó"]]
+        assert urbano["municipios"] == 2 and urbano["promedios"]["poblacion"] == 190000
+        assert "Población" in urbano["descripcion"]
+
+    def test_invalid_variable(self, client, terridata_cube):
+        terridata_cube(self.rows())
+        assert client.get("/api/analytics/clusters?variables=poblacion,nope").status_code == 400
+
+    def test_no_data(self, client, terridata_cube):
+        terridata_cube([])
+        assert client.get("/api/analytics/clusters").json() == {"error": "Datos insuficientes para clustering"}
@@ -0,0 +1,80 @@
+"""Tests for the conditional GET (ETag / 304) middleware."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.backend.middleware.conditional import ConditionalGetMiddleware
+
+
+def _app(versions, build_id="b1"):
+    calls = {"geo": 0}
+    app = FastAPI()
+
+    async def current_versions():
+        return versions
+
+    app.add_middleware(
+        ConditionalGetMiddleware,
+        versioned_paths={"/geo": ("cartografia",)},
+        versions=current_versions,
+        build_id=build_id,
+    )
+
+    @app.get("/geo")
+    def geo():
+        calls["geo"] += 1
+        return {"type": "FeatureCollection", "features": []}
+
+    @app.get("/data")
+    def data():
+        return {"value": 1}
+
+    return TestClient(app), calls
+
+
+class TestConditionalGet:
+    def test_content_etag_and_304(self):
+        client, _ = _app({})
+        first = client.get("/data")
+        etag = first.headers["ETag"]
+        assert first.json() == {"value": 1}
+        assert first.headers["Cache-Control"] == "no-cache"
+
+        again = client.get("/data", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+
+    def test_version_etag_skips_endpoint(self):
+        client, calls = _app({"cartografia": 3})
+        etag = client.get("/geo?dane_code=05045").headers["ETag"]
+        resp = client.get("/geo?dane_code=05045", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert calls["geo"] == 1
+
+    def test_version_bump_changes_etag(self):
+        versions = {"cartografia": 3}
+        client, _ = _app(versions)
+        etag = client.get("/geo").headers["ETag"]
+        versions["cartografia"] = 4
+        resp = client.get("/geo", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+
+    def test_build_id_changes_etag(self):
+        old, _ = _app({"cartografia": 3}, build_id="release-1")
+        new, calls = _app({"cartografia": 3}, build_id="release-2")
+        etag = old.get("/geo").headers["ETag"]
+        resp = new.get("/geo", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert calls["geo"] == 1
+
+    def test_query_string_is_part_of_etag(self):
+        client, _ = _app({"cartografia": 1})
+        a = client.get("/geo?dane_code=05045").headers["ETag"]
+        b = client.get("/geo?dane_code=05837").headers["ETag"]
+        assert a != b
+
+    def test_api_response_carries_etag(self, client, mock_query_dicts):
+        mock_query_dicts.return_value = [{"skill": "Excel", "demanda": 10}]
+        etag = client.get("/api/empleo/skills").headers["ETag"]
+        resp = client.get("/api/empleo/skills", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
@@ -0,0 +1,64 @@
+"""Tests for the pairwise-complete correlation matrices."""
+import numpy as np
+import pandas as pd
+
+from src.backend.services.correlation import average_ranks, pairwise_counts, pearson_matrix, spearman_matrix
+
+nan = np.nan
+
+
+class TestCorrelation:
+    X = np.array([
+        [1.0, 2.0, 3.0, 4.0, nan],
+        [2.0, 4.0, 6.0, 8.0, 1.0],
+        [4.0, 3.0, nan, 1.0, 0.0],
+        [5.0, nan, nan, nan, 7.0],
+    ])
+
+    def test_average_ranks(self):
+        assert average_ranks(np.array([10.0, 30.0, 20.0, 30.0])).tolist() == [1.0, 3.5, 2.0, 3.5]
+
+    def test_pairwise_counts(self):
+        assert pairwise_counts(self.X).tolist() == [[4, 4, 3, 1], [4, 5, 4, 2], [3, 4, 4, 2], [1, 2, 2, 2]]
+
+    def test_pearson_uses_pairwise_complete_rows(self):
+        r = pearson_matrix(self.X)
+        assert r[0, 1] == 1.0  # the outlier in column 5 is missing for row 0
+        assert r[1, 0] == r[0, 1]
+        assert np.isnan(r[0, 3]) and np.isnan(r[3, 3])  # fewer than 3 observations
+
+    def test_matches_pandas(self):
+        rng = np.random.default_rng(7)
+        X = rng.normal(size=(6, 30)) * np.array([1e5, 1, 10, 300, 2, 1])[:, None]
+        X[rng.random(X.shape) < 0.25] = nan
+        X[4] = np.round(X[4])  # ties
+        frame = pd.DataFrame(X.T)
+        np.testing.assert_allclose(pearson_matrix(X), frame.corr().values, atol=1e-12)
+        np.testing.assert_allclose(spearman_matrix(X), frame.corr(method="spearman").values, atol=1e-12)
+
+    def test_constant_variable_is_undefined(self):
+        r = pearson_matrix(np.array([[1.0, 1.0, 1.0], [1.0, 2.0, 3.0]]))
+        assert np.isnan(r[0, 1]) and np.isnan(r[0, 0]) and r[1, 1] == 1.0
+
+
+class TestCorrelationMatrixEndpoint:
+    def test_matrix_from_cube(self, client, mock_query_dicts, terridata_cube):
+        def row(indicador, entidad, dane, valor):
+            return {"indicador": indicador, "entidad": entidad, "codigo_entidad": int(dane),
+                    "dane_code": dane, "dato_numerico": valor, "anio": 2023}
+
+        munis = [("Apartadó", "05045"), ("Turbo", "05837"), ("Necoclí", "05490"), ("Carepa", "05147")]
+        rows = [row("Población total", m, d, 1000.0 * (i + 1)) for i, (m, d) in enumerate(munis)]
+        rows += [row("Tasa de homicidios por cada 100.000 habitantes", m, d, 50.0 - i)
+                 for i, (m, d) in enumerate(munis[:3])]
+        terridata_cube(rows)
+
+        data = client.get("/api/crossvar/correlation-matrix").json()
+        assert mock_query_dicts.call_count == 0
+        ids = [v["id"] for v in data["variables"]]
+        pob, hom, icfes = ids.index("poblacion"), ids.index("homicidios"), ids.index("icfes")
+        assert data["pearson"][pob][hom] == -1.0
+        assert data["spearman"][hom][pob] == -1.0
+        assert data["n"][pob][hom] == 3
+        assert data["pearson"][pob][pob] == 1.0
+        assert data["pearson"][pob][icfes] is None and data["n"][icfes][icfes] == 0
@@ -1,6 +1,10 @@
 """Tests for database utility functions: cache decorator, query helpers."""
+import asyncio
 import time
-from src.backend.database import cached, _cache
+from unittest.mock import patch
+from src.backend.database import (
+    cached, _cache, aquery_dicts, aquery_dicts_batch, query_dicts_batch, run_sync, serial_batches,
+)
 
 
 class TestCacheDecorator:
@@ -54,3 +58,104 @@ class TestCacheDecorator:
         with_kwargs(name="b")
         with_kwargs(name="a")  # should hit cache
         assert call_count == 2
+
+
+class TestAsyncCacheDecorator:
+    def test_caches_coroutine_result(self):
+        call_count = 0
+
+        @cached(ttl_seconds=60)
+        async def expensive(x):
+            nonlocal call_count
+            call_count += 1
+            await asyncio.sleep(0.01)
+            return {"x": x}
+
+        async def run():
+            return await expensive(1), await expensive(1), await expensive(2)
+
+        assert asyncio.run(run()) == ({"x": 1}, {"x": 1}, {"x": 2})
+        assert call_count == 2
+
+    def test_stale_entry_refreshed_in_background_task(self):
+        call_count = 0
+
+        @cached(ttl_seconds=0.05, max_stale_seconds=5)
+        async def dashboard():
+            nonlocal call_count
+            call_count += 1
+            return call_count
+
+        async def run():
+            first = await dashboard()
+            await asyncio.sleep(0.1)
+            stale = await dashboard()
+            await asyncio.sleep(0.05)  # let the refresh task finish
+            return first, stale, await dashboard()
+
+        assert asyncio.run(run()) == (1, 1, 2)
+
+
+class TestAsyncQueryHelpers:
+    def test_aquery_dicts_falls_back_to_sync_helper(self, mock_query_dicts):
+        mock_query_dicts.return_value = [{"a": 1}]
+        assert asyncio.run(aquery_dicts("SELECT 1 AS a")) == [{"a": 1}]
+        mock_query_dicts.assert_called_once_with("SELECT 1 AS a", None)
+
+    def test_aquery_dicts_batch_falls_back_to_sync_helper(self, mock_query_dicts):
+        mock_query_dicts.batch.return_value = [[{"a": 1}], []]
+        assert asyncio.run(aquery_dicts_batch([("q1", None), ("q2", None)])) == [[{"a": 1}], []]
+
+
+class TestParallelBatch:
+    def _slow_query(self, sql, params=None):
+        time.sleep(0.2)
+        if sql == "broken":
+            raise RuntimeError("relation does not exist")
+        return [{"q": sql}]
+
+    def test_results_in_order_with_failure_isolated(self):
+        queries = [("a", None), ("broken", None), ("c", None)]
+        with patch("src.backend.database.query_dicts", side_effect=self._slow_query), \
+             patch("src.backend.database.DB_BATCH_PARALLELISM", 3):
+            started = time.perf_counter()
+            results = query_dicts_batch(queries, parallel=True)
+            elapsed = time.perf_counter() - started
+        assert results == [[{"q": "a"}], [], [{"q": "c"}]]
+        assert elapsed < 0.5  # ran concurrently, not 3 x 0.2s
+
+    def test_parallelism_of_one_stays_serial(self):
+        with patch("src.backend.database.query_dicts") as qd, \
+             patch("src.backend.database.DB_BATCH_PARALLELISM", 1):
+            query_dicts_batch([("SELECT 1", None), ("SELECT 2", None)], parallel=True)
+        qd.assert_not_called()  # single-connection SAVEPOINT path
+
+    def test_serial_batches_reaches_worker_threads(self):
+        async def batch():
+            with serial_batches():
+                return await run_sync(query_dicts_batch, [("SELECT 1", None), ("SELECT 2", None)], True)
+
+        with patch("src.backend.database.query_dicts") as qd, \
+             patch("src.backend.database.DB_BATCH_PARALLELISM", 3):
+            asyncio.run(batch())
+        qd.assert_not_called()  # the warm-up context kept the batch on one connection
+
+
+class TestSchemaProbe:
+    def test_success_is_remembered(self, mock_engine):
+        from src.backend.services.probe import probe_schema
+
+        assert probe_schema("SELECT x FROM t LIMIT 0", "no x") is True
+        assert probe_schema("SELECT x FROM t LIMIT 0", "no x") is True
+        assert mock_engine.connect.call_count == 1
+
+    def test_failure_is_retried_later(self, mock_engine):
+        from src.backend.services.probe import probe_schema
+
+        mock_engine.connect.side_effect = RuntimeError("relation does not exist")
+        assert probe_schema("SELECT x FROM t LIMIT 0", "no x", retry_seconds=60) is False
+        assert probe_schema("SELECT x FROM t LIMIT 0", "no x", retry_seconds=60) is False
+        assert mock_engine.connect.call_count == 1
+        # Migration applied: the next probe after the retry delay succeeds
+        mock_engine.connect.side_effect = None
+        assert probe_schema("SELECT x FROM t LIMIT 0", "no x", retry_seconds=0) is True
@@ -1,5 +1,7 @@
 """Tests for the empleo router endpoints."""
-from unittest.mock import patch, MagicMock
+from datetime import date
+from decimal import Decimal
+
 from sqlalchemy import text
 
 
@@ -65,22 +67,202 @@ class TestOfertasEndpoint:
         assert data["total_pages"] == 5
 
 
+class TestOfertasSearch:
+    def test_ilike_fallback_without_index(self, client, mock_query_dicts, monkeypatch):
+        # Migration 19 not applied yet
+        monkeypatch.setattr("src.backend.routers.empleo.fulltext_available", lambda: False)
+        mock_query_dicts.side_effect = [[{"total": 0}], []]
+        resp = client.get("/api/empleo/ofertas?busqueda=enfermera")
+        assert resp.status_code == 200
+        sql, params = mock_query_dicts.call_args.args
+        assert "ILIKE :q" in sql
+        assert params["q"] == "%enfermera%"
+
+    def test_fulltext_ranked(self, client, mock_query_dicts, monkeypatch):
+        monkeypatch.setattr("src.backend.routers.empleo.fulltext_available", lambda: True)
+        mock_query_dicts.side_effect = [[{"total": 0}], []]
+        resp = client.get("/api/empleo/ofertas?busqueda=técnico agrícola")
+        assert resp.status_code == 200
+        sql, params = mock_query_dicts.call_args.args
+        assert "search_tsv @@ websearch_to_tsquery('public.es_unaccent', :q)" in sql
+        assert "ORDER BY ts_rank_cd(search_tsv" in sql
+        assert params["q"] == "técnico agrícola"
+
+
+def test_serie_temporal_reads_monthly_rollup(client, mock_query_dicts):
+    mock_query_dicts.return_value = [
+        {"periodo": "2025-01", "ofertas": 10, "empresas": 4, "salario_promedio": Decimal("1500000"),
+         "salario_sketch": '{"713": 3, "730": 1}'},
+        {"periodo": "2025-02", "ofertas": 2, "empresas": 1, "salario_promedio": None, "salario_sketch": None},
+    ]
+    data = client.get("/api/empleo/serie-temporal?dane_code=05045").json()
+    assert data[0]["salario_promedio"] == 1500000
+    assert data[0]["salario_mediana"] == round(2 * 1.02 ** 713 / 2.02)  # median falls in bucket 713
+    assert "salario_sketch" not in data[0]
+    assert data[1]["salario_mediana"] is None
+    sql, params = mock_query_dicts.call_args.args
+    assert "FROM empleo.ofertas_rollup_mensual" in sql
+    assert "ofertas_laborales" not in sql
+    assert params == {"dane": "05045"}
+
+
+def test_serie_temporal_without_rollup_reads_offers(client, mock_query_dicts, monkeypatch):
+    monkeypatch.setattr("src.backend.routers.empleo.rollup_available", lambda: False)
+    mock_query_dicts.return_value = []
+    client.get("/api/empleo/serie-temporal?dane_code=05045")
+    sql, params = mock_query_dicts.call_args.args
+    assert "ofertas_rollup_mensual" not in sql
+    assert "FROM empleo.ofertas_laborales" in sql
+    assert params == {"dane": "05045"}
+
+
+class TestOfertasCursorMode:
+    @staticmethod
+    def _oferta(id_, fecha):
+        return {"id": id_, "titulo": f"Oferta {id_}", "fecha_publicacion": fecha}
+
+    def test_first_page_returns_cursor_and_estimate(self, client, mock_query_dicts):
+        mock_query_dicts.side_effect = [
+            [self._oferta(9, "2025-01-15"), self._oferta(8, "2025-01-14"), self._oferta(7, "2025-01-14")],
+            [{"QUERY PLAN": [{"Plan": {"Plan Rows": 120}}]}],  # EXPLAIN estimate
+        ]
+        resp = client.get("/api/empleo/ofertas?mode=cursor&page_size=2")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert [o["id"] for o in data["items"]] == [9, 8]
+        assert data["total_estimate"] == 120
+        assert data["next_cursor"]
+
+        sql, params = mock_query_dicts.call_args_list[0].args
+        assert "COUNT(*)" not in sql and "OFFSET" not in sql
+        assert params["lim"] == 3
+
+    def test_next_page_uses_keyset(self, client, mock_query_dicts):
+        from src.backend.services.pagination import encode_cursor
+
+        mock_query_dicts.side_effect = [[self._oferta(7, "2025-01-14")], []]
+        cursor = encode_cursor(date(2025, 1, 14), 8)
+        resp = client.get(f"/api/empleo/ofertas?mode=cursor&page_size=2&cursor={cursor}")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["next_cursor"] is None
+        assert data["total_estimate"] is None
+        # no COUNT, no EXPLAIN past page 1; the short range continues into the NULL block
+        assert mock_query_dicts.call_count == 2
+
+        sql, params = mock_query_dicts.call_args_list[0].args
+        assert "(fecha_publicacion, id) < (:ks_v, :ks_id)" in sql
+        assert params["ks_v"] == date(2025, 1, 14)
+        assert params["ks_id"] == 8
+
+    def test_invalid_cursor(self, client, mock_query_dicts):
+        resp = client.get("/api/empleo/ofertas?mode=cursor&cursor=not-a-cursor")
+        assert resp.status_code == 400
+
+
+class TestFacets:
+    def test_single_pass_disjunctive(self, client, mock_query_dicts):
+        def row(gset, n_total=0, **cols):
+            base = {d: None for d in ("fuente", "sector", "tipo_contrato", "modalidad", "nivel_educativo", "municipio")}
+            return {"gset": gset, **base, "n_total": n_total,
+                    **{f"n_{d}": cols.pop(f"n_{d}", 0) for d in base}, **cols}
+
+        mock_query_dicts.return_value = [
+            row(0b111111, n_total=7),
+            row(0b101111, sector="Agro", n_sector=7),
+            row(0b101111, sector="Salud", n_sector=4),
+            row(0b101111, sector=None, n_sector=2),  # NULL sector is not a facet value
+            row(0b011111, fuente="sena", n_fuente=5),
+            row(0b011111, fuente="elempleo", n_fuente=0),  # no match under the other filters
+        ]
+        resp = client.get("/api/empleo/facets?sector=Agro&dane_code=05045")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total"] == 7
+        assert data["facets"]["sector"] == [{"value": "Agro", "count": 7}, {"value": "Salud", "count": 4}]
+        assert data["facets"]["fuente"] == [{"value": "sena", "count": 5}]
+        assert data["facets"]["modalidad"] == []
+
+        assert mock_query_dicts.call_count == 1
+        sql, params = mock_query_dicts.call_args.args
+        assert "GROUPING SETS ((), (fuente), (sector)" in sql
+        # The sector facet ignores the sector filter; the dane_code filter restricts the scan
+        assert "COUNT(*) FILTER (WHERE TRUE) AS n_sector" in sql
+        assert "COUNT(*) FILTER (WHERE TRUE AND sector = :sector) AS n_fuente" in sql
+        assert "WHERE TRUE AND dane_code = :dane" in sql
+        assert params == {"sector": "Agro", "dane": "05045"}
+
+
 class TestEmpleoStats:
     def test_stats_basic(self, client, mock_query_dicts):
-        mock_query_dicts.side_effect = [
-            [{"total": 100}],
-            [{"municipio": "Apartadó", "total": 60}, {"municipio": "Turbo", "total": 40}],
-            [{"fuente": "computrabajo", "total": 70}],
-            [{"sector": "Agroindustria", "total": 50}],
-            [{"empresa": "Unibán", "total": 20}],
-            [{"total": 30}],
-            [{"promedio": 1500000, "minimo": 1000000, "maximo": 5000000, "mediana": 1300000}],
+        def row(gset, total, **cols):
+            return {"gset": gset, "municipio": None, "fuente": None, "sector": None,
+                    "empresa": None, "total": total, **cols}
+
+        mock_query_dicts.batch.return_value = [
+            [  # one GROUPING SETS result
+                row(0b0111, 60, municipio="Apartadó"),
+                row(0b0111, 40, municipio="Turbo"),
+                row(0b1011, 70, fuente="computrabajo"),
+                row(0b1101, 50, sector="Agroindustria"),
+                row(0b1110, 20, empresa="Unibán"),
+                row(0b1111, 100, con_salario=30, promedio=1500000, minimo=1000000, maximo=5000000),
+            ],
+            # merged salary histogram of the rollup cells
+            [{"bucket": "713", "n": 20}, {"bucket": "750", "n": 10}],
         ]
         resp = client.get("/api/empleo/stats")
         assert resp.status_code == 200
+        (stats_sql, _), (sketch_sql, _) = mock_query_dicts.batch.call_args.args[0]
+        assert "PERCENTILE_CONT" not in stats_sql
+        assert "FROM empleo.salarios_rollup" in sketch_sql
         data = resp.json()
         assert data["total_ofertas"] == 100
-        assert len(data["por_municipio"]) == 2
+        assert data["con_salario"] == 30
+        assert data["salario_mediana"] == round(2 * 1.02 ** 713 / 2.02)
+        assert data["por_municipio"] == [
+            {"municipio": "Apartadó", "total": 60}, {"municipio": "Turbo", "total": 40},
+        ]
+        assert data["por_fuente"] == [{"fuente": "computrabajo", "total": 70}]
+        assert data["top_empresas"] == [{"empresa": "Unibán", "total": 20}]
+
+    def test_median_falls_back_without_salary_rollup(self, client, mock_query_dicts):
+        totals = {"gset": 0b1111, "municipio": None, "fuente": None, "sector": None, "empresa": None,
+                  "total": 100, "con_salario": 30, "promedio": 1500000, "minimo": 1000000, "maximo": 5000000}
+        mock_query_dicts.batch.return_value = [[totals], []]  # salarios_rollup missing
+        mock_query_dicts.return_value = [{"mediana": 1400000.0}]
+        data = client.get("/api/empleo/stats?dane_code=05045").json()
+        assert data["salario_mediana"] == 1400000
+        sql, params = mock_query_dicts.call_args.args
+        assert "PERCENTILE_CONT(0.5)" in sql and "salario_numerico > 0" in sql
+        assert params == {"dane": "05045"}
+
+
+class TestSalaryPercentiles:
+    CELLS = [
+        {"sector": "Agro", "municipio": "Apartadó", "nivel_educativo": "Bachiller", "nivel_experiencia": None,
+         "salario_n": 3, "salario_suma": 4500000, "salario_sketch": '{"713": 2, "735": 1}'},
+        {"sector": "Agro", "municipio": "Turbo", "nivel_educativo": "Técnico", "nivel_experiencia": None,
+         "salario_n": 1, "salario_suma": 2000000, "salario_sketch": '{"733": 1}'},
+    ]
+
+    def test_grouped_percentiles(self, client, mock_query_dicts):
+        mock_query_dicts.return_value = self.CELLS
+        data = client.get("/api/empleo/salarios/percentiles?sector=Agro&por=sector").json()
+        sql, params = mock_query_dicts.call_args.args
+        assert "FROM empleo.salarios_rollup" in sql and "sector = :sector" in sql
+        assert params == {"sector": "Agro"}
+        assert data["percentiles"] == ["p10", "p25", "p50", "p75", "p90"]
+        (agro,) = data["grupos"]
+        assert (agro["sector"], agro["muestra"], agro["salario_promedio"]) == ("Agro", 4, 1625000)
+        assert agro["p10"] == agro["p50"] == round(2 * 1.02 ** 713 / 2.02)
+        assert agro["p90"] == round(2 * 1.02 ** 733 / 2.02)  # rank 2.7 of 4 lands in bucket 733
+
+    def test_min_sample_and_validation(self, client, mock_query_dicts):
+        mock_query_dicts.return_value = self.CELLS
+        data = client.get("/api/empleo/salarios/percentiles?por=municipio,nivel_educativo&min_muestra=2").json()
+        assert [(g["municipio"], g["nivel_educativo"]) for g in data["grupos"]] == [("Apartadó", "Bachiller")]
+        assert client.get("/api/empleo/salarios/percentiles?por=empresa").status_code == 400
 
 
 class TestEmpleoSkills:
@@ -98,15 +280,11 @@ class TestEmpleoSkills:
 
 class TestEmpleoKpis:
     def test_kpis_endpoint(self, client, mock_query_dicts):
-        mock_conn = MagicMock()
-        mock_row = (100, 25, 8, 1500000, "Agroindustria", "Unibán")
-        mock_conn.__enter__ = MagicMock(return_value=mock_conn)
-        mock_conn.__exit__ = MagicMock(return_value=False)
-        mock_conn.execute.return_value.fetchone.return_value = mock_row
-
-        with patch("src.backend.routers.empleo.engine") as mock_eng:
-            mock_eng.connect.return_value = mock_conn
-            resp = client.get("/api/empleo/kpis")
+        mock_query_dicts.return_value = [{
+            "total_ofertas": 100, "total_empresas": 25, "total_sectores": 8,
+            "salario_promedio": 1500000, "sector_top": "Agroindustria", "empresa_top": "Unibán",
+        }]
+        resp = client.get("/api/empleo/kpis")
 
         assert resp.status_code == 200
         data = resp.json()
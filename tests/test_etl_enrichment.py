@@ -1,5 +1,8 @@
 """Tests for ETL enrichment functions: skill extraction, sector classification, salary parsing, deduplication."""
+import json
 import sys
+from datetime import date
+from unittest.mock import MagicMock
 from pathlib import Path
 
 # Make etl module importable
@@ -14,6 +17,18 @@ from etl_sync import (
     compute_dedup_hash,
     categorize_skills,
     SKILL_CATEGORIES,
+    apply_daily_rollup_deltas,
+    apply_rollup_deltas,
+    daily_rollup_deltas,
+    ensure_rollup_table,
+    refresh_ofertas_rollup,
+    rollup_day,
+    rollup_deltas,
+    rollup_month,
+    salary_bucket,
+    salary_rollup_deltas,
+    sketch_quantile,
+    merge_salary_sketches,
 )
 
 
@@ -233,3 +248,106 @@ class TestCategorizeSkills:
         expected = {"Tecnológica", "Agroindustrial", "Blanda", "Industrial",
                     "Administrativa", "Logística y Transporte", "Turismo y Gastronomía"}
         assert set(SKILL_CATEGORIES.keys()) == expected
+
+
+class TestOfertasRollup:
+    ROWS = [
+        {"fecha_publicacion": date(2025, 3, 17), "municipio": "Turbo", "dane_code": "05837",
+         "sector": "Salud", "fuente": "sena", "empresa": "IPS", "salario_numerico": 2000000,
+         "nivel_educativo": "Técnico", "nivel_experiencia": None},
+        {"fecha_publicacion": "2025-03-02", "municipio": "Turbo", "dane_code": "05837",
+         "sector": "Salud", "fuente": "sena", "empresa": "IPS", "salario_numerico": 3000000,
+         "nivel_educativo": "Técnico", "nivel_experiencia": None},
+        {"fecha_publicacion": None, "municipio": "Turbo", "dane_code": "05837",
+         "sector": "Salud", "fuente": "sena", "empresa": None, "salario_numerico": None,
+         "nivel_educativo": None, "nivel_experiencia": None},
+    ]
+
+    def test_rollup_month(self):
+        assert rollup_month("2025-03-17") == date(2025, 3, 1)
+        assert rollup_month(date(2025, 3, 17)) == date(2025, 3, 1)
+        assert rollup_month(None) is None
+        assert rollup_month("17/03/2025") is None
+
+    def test_salary_bucket_relative_width(self):
+        b = salary_bucket(1_300_000)
+        assert 1.02 ** (b - 1) < 1_300_000 <= 1.02 ** b
+        assert salary_bucket(None) is None and salary_bucket(0) is None
+
+    def test_deltas_aggregate_per_cell(self):
+        march, undated = sorted(rollup_deltas(self.ROWS), key=lambda c: c["mes"] is None)
+        assert march["mes"] == date(2025, 3, 1)
+        assert (march["ofertas"], march["salario_n"], march["salario_suma"]) == (2, 2, 5000000)
+        assert (march["salario_min"], march["salario_max"]) == (2000000, 3000000)
+        assert march["empresas"] == ["IPS"]
+        assert sum(json.loads(march["salario_sketch"]).values()) == 2
+        assert undated["mes"] is None and undated["salario_suma"] is None
+        assert undated["empresas"] == [] and undated["salario_sketch"] == "{}"
+
+    def test_non_positive_salary_is_not_counted(self):
+        rows = [{**self.ROWS[0], "salario_numerico": 0}, {**self.ROWS[1], "salario_numerico": -5}]
+        (cell,) = rollup_deltas(rows)
+        assert cell["ofertas"] == 2
+        assert (cell["salario_n"], cell["salario_suma"], cell["salario_min"]) == (0, None, None)
+        assert json.loads(cell["salario_sketch"]) == {}
+        (daily,) = daily_rollup_deltas([{**rows[0], "fecha_publicacion": "2025-03-17"}])
+        assert (daily["salario_n"], daily["salario_suma"]) == (0, 0)
+
+    def test_apply_deltas_upserts(self):
+        conn = MagicMock()
+        deltas = rollup_deltas(self.ROWS)
+        assert apply_rollup_deltas(conn, deltas) == 2
+        sql, params = str(conn.execute.call_args.args[0]), conn.execute.call_args.args[1]
+        assert "ON CONFLICT (mes, municipio, dane_code, sector, fuente) DO UPDATE" in sql
+        assert "ofertas = r.ofertas + EXCLUDED.ofertas" in sql
+        assert "jsonb_each_text(EXCLUDED.salario_sketch)" in sql
+        assert params == deltas
+        assert apply_rollup_deltas(MagicMock(), []) == 0
+
+    def test_full_refresh(self):
+        conn = MagicMock()
+        conn.execute.return_value.rowcount = 2
+        assert refresh_ofertas_rollup(conn) == 2
+        statements = [str(c.args[0]) for c in conn.execute.call_args_list]
+        assert "DELETE FROM empleo.ofertas_rollup_mensual" in statements
+        assert "DELETE FROM empleo.salarios_rollup" in statements
+        assert "DELETE FROM empleo.ofertas_rollup_diario" in statements
+        assert "NULLS NOT DISTINCT" in "".join(statements)
+        # The rebuild aggregates in SQL: no offer rows are fetched into Python
+        conn.execute.return_value.mappings.assert_not_called()
+        inserts = [s for s in statements if "INSERT INTO" in s]
+        assert len(inserts) == 3
+        assert all("FROM empleo.ofertas_laborales" in s and "GROUP BY" in s for s in inserts)
+        assert all("ON CONFLICT" not in s for s in inserts)
+        monthly = inserts[0]
+        assert "INSERT INTO empleo.ofertas_rollup_mensual" in monthly
+        assert "PARTITION BY mes, municipio, dane_code, sector, fuente, bucket" in monthly
+        assert "CEIL(LN(salario_numerico) / LN(1.02))" in monthly
+        assert "INSERT INTO empleo.salarios_rollup" in inserts[-1]
+
+    def test_ensure_reports_empty_rollup(self):
+        conn = MagicMock()
+        conn.execute.return_value.scalar.return_value = True
+        assert ensure_rollup_table(conn) is True
+        assert "SELECT NOT EXISTS (SELECT 1 FROM empleo.ofertas_rollup_mensual)" in str(
+            conn.execute.call_args.args[0])
+        conn.execute.return_value.scalar.return_value = False
+        assert ensure_rollup_table(conn) is False
+
+    def test_daily_deltas(self):
+        assert rollup_day("2025-03-17") == date(2025, 3, 17) and rollup_day("17/03/2025") is None
+        cells = {c["dia"]: c for c in daily_rollup_deltas(self.ROWS + self.ROWS[:1])}
+        assert cells[date(2025, 3, 17)] == {"dia": date(2025, 3, 17), "municipio": "Turbo", "sector": "Salud",
+                                            "ofertas": 2, "salario_suma": 4000000, "salario_n": 2}
+        assert (cells[None]["ofertas"], cells[None]["salario_n"]) == (1, 0)
+        conn = MagicMock()
+        assert apply_daily_rollup_deltas(conn, list(cells.values())) == 3
+        assert "ON CONFLICT (dia, municipio, sector) DO UPDATE" in str(conn.execute.call_args.args[0])
+        assert apply_daily_rollup_deltas(MagicMock(), []) == 0
+
+    def test_salary_rollup_skips_unsalaried(self):
+        (cell,) = salary_rollup_deltas(self.ROWS)
+        assert (cell["sector"], cell["nivel_educativo"], cell["nivel_experiencia"]) == ("Salud", "Técnico", None)
+        assert (cell["salario_n"], cell["salario_suma"]) == (2, 5000000)
+        median = sketch_quantile(merge_salary_sketches([cell["salario_sketch"]]), 0.5)
+        assert abs(median - 2000000) / 2000000 <= 0.01
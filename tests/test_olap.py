@@ -0,0 +1,229 @@
+"""Tests for the in-memory columnar snapshot (OLAP_ENGINE=numpy)."""
+import pytest
+
+from src.backend.services import olap
+from src.backend.services.olap import OfertasSnapshot
+from src.backend.services.sketches import HLL_RELATIVE_ERROR
+
+ROWS = [
+    {"municipio": "Apartadó", "dane_code": "05045", "sector": "Agro", "fuente": "sena",
+     "empresa": "Unibán", "tipo_contrato": "Fijo", "nivel_educativo": None,
+     "nivel_experiencia": "1 ano", "modalidad": "Presencial", "salario_numerico": 1300000, "periodo": "2025-01",
+     "skills": ["Cosecha", "Empaque"]},
+    {"municipio": "Apartadó", "dane_code": "05045", "sector": "Agro", "fuente": "elempleo",
+     "empresa": "Banacol", "tipo_contrato": "Fijo", "nivel_educativo": "Bachiller",
+     "nivel_experiencia": None, "modalidad": "Presencial", "salario_numerico": 2500001, "periodo": "2025-02",
+     "skills": ["Cosecha", "Excel"]},
+    {"municipio": "Turbo", "dane_code": "05837", "sector": "Salud", "fuente": "sena",
+     "empresa": "No especificada", "tipo_contrato": None, "nivel_educativo": "Técnico",
+     "nivel_experiencia": None, "modalidad": None, "salario_numerico": None, "periodo": "2025-01",
+     "skills": ["Excel", "Enfermería"]},
+    {"municipio": "Turbo", "dane_code": "05837", "sector": None, "fuente": "sena",
+     "empresa": None, "tipo_contrato": "Obra", "nivel_educativo": None,
+     "nivel_experiencia": None, "modalidad": "Remoto", "salario_numerico": 6000000, "periodo": None,
+     "skills": None},
+]
+
+
+@pytest.fixture()
+def snap():
+    return OfertasSnapshot(ROWS, version=3)
+
+
+@pytest.fixture()
+def numpy_engine(snap, monkeypatch):
+    """Route the empleo endpoints through the snapshot."""
+    async def current():
+        return snap
+
+    monkeypatch.setattr("src.backend.routers.empleo.aget_snapshot", current)
+    monkeypatch.setattr("src.backend.routers.analytics.aget_snapshot", current)
+    return snap
+
+
+class TestSnapshot:
+    def test_dictionary_encoding(self, snap):
+        assert snap.n == 4
+        assert snap.values["municipio"] == ["Apartadó", "Turbo"]
+        assert snap.codes["municipio"].tolist() == [0, 0, 1, 1]
+        assert None in snap.values["sector"]
+
+    def test_masks(self, snap):
+        assert snap.where(dane_code="05837").tolist() == [False, False, True, True]
+        assert snap.where(dane_code="99999").sum() == 0
+        assert snap.where(dane_code=None).all()
+        assert snap.not_null("sector").tolist() == [True, True, True, False]
+
+    def test_count_by_keeps_null_group(self, snap):
+        assert snap.count_by("sector", snap.where()) == [("Agro", 2), ("Salud", 1), (None, 1)]
+
+    def test_distinct(self, snap):
+        mask = snap.where()
+        assert snap.distinct("empresa", mask) == 3  # NULL not counted
+        assert snap.distinct_by("municipio", "sector", mask).tolist() == [1, 1]
+
+    def test_approximate_distinct(self):
+        rows = [{**ROWS[0], "empresa": f"E{i % 4000}", "municipio": f"M{i % 3}"} for i in range(12_000)]
+        big = OfertasSnapshot(rows)
+        mask = big.where()
+        assert big.distinct("empresa", mask) == 4000
+        assert abs(big.distinct("empresa", mask, exact=False) - 4000) <= 4000 * 3 * HLL_RELATIVE_ERROR
+        approx = big.distinct_by("municipio", "empresa", mask, exact=False)
+        assert big.distinct_by("municipio", "empresa", mask).tolist() == [4000, 4000, 4000]
+        assert all(abs(a - 4000) <= 4000 * 3 * HLL_RELATIVE_ERROR for a in approx)
+
+    def test_approximate_distinct_small_groups(self, snap):
+        mask = snap.where()
+        assert snap.distinct("empresa", mask, exact=False) == 3
+        assert snap.distinct_by("municipio", "sector", mask, exact=False).tolist() == [1, 1]
+
+    def test_salary_by(self, snap):
+        groups = {g["municipio"]: g for g in snap.salary_by("municipio", snap.where())}
+        assert groups["Apartadó"] == {"municipio": "Apartadó", "ofertas": 2, "con_salario": 2,
+                                      "promedio": 1900001, "minimo": 1300000, "maximo": 2500001}
+        assert groups["Turbo"]["con_salario"] == 1
+
+    def test_salary_summary_and_buckets(self, snap):
+        mask = snap.where()
+        assert snap.salary_summary(mask) == {"con_salario": 3, "promedio": 3266667, "minimo": 1300000,
+                                             "maximo": 6000000, "mediana": 2500001.0}
+        assert snap.salary_buckets([1300000, 2000000, 3000000, 5000000], mask) == [0, 1, 1, 0, 1]
+
+    def test_cells(self, snap):
+        assert snap.cells(["municipio", "sector"], snap.where()) == [
+            {"municipio": "Apartadó", "sector": "Agro", "ofertas": 2, "salario_suma": 3800001, "salario_n": 2},
+            {"municipio": "Turbo", "sector": "Salud", "ofertas": 1, "salario_suma": None, "salario_n": 0},
+            {"municipio": "Turbo", "sector": None, "ofertas": 1, "salario_suma": 6000000, "salario_n": 1},
+        ]
+        assert snap.cells(["sector"], snap.where(dane_code="99999")) == []
+
+    def test_skill_posting_lists(self, snap):
+        assert snap.postings["Cosecha"].tolist() == [0, 1]
+        assert snap.skill_counts(snap.where()) == [("Cosecha", 2), ("Excel", 2), ("Empaque", 1), ("Enfermería", 1)]
+        assert snap.skill_counts(snap.where(dane_code="05837")) == [("Excel", 1), ("Enfermería", 1)]
+
+    def test_skill_counts_by_sector(self, snap):
+        by_sector = snap.skill_counts_by("sector", snap.not_null("sector"))
+        assert by_sector["Agro"][0] == ("Cosecha", 2)
+        assert dict(by_sector["Salud"]) == {"Excel": 1, "Enfermería": 1}
+
+    def test_co_occurrence(self, snap):
+        assert snap.co_occurrence("Cosecha", snap.where()) == (2, [("Empaque", 1), ("Excel", 1)])
+        assert snap.co_occurrence("Cosecha", snap.where(dane_code="05837")) == (0, [])
+        assert snap.co_occurrence("Inexistente", snap.where()) == (0, [])
+
+    def test_empty_snapshot(self):
+        empty = OfertasSnapshot([])
+        assert empty.count_by("sector", empty.where()) == []
+        assert empty.salary_summary(empty.where())["promedio"] is None
+
+
+class TestSnapshotLifecycle:
+    def test_disabled_by_default(self):
+        assert olap.get_snapshot() is None
+
+    def test_loads_once_per_version(self, mock_query_dicts, monkeypatch):
+        monkeypatch.setattr(olap, "OLAP_ENGINE", "numpy")
+        olap.reset()
+        mock_query_dicts.return_value = ROWS
+        try:
+            first = olap._store.load(5)
+            assert first.n == 4 and first.version == 5
+            assert olap._store.load(5) is first
+            assert mock_query_dicts.call_count == 1
+            assert olap._store.load(6) is not first
+            assert mock_query_dicts.call_count == 2
+        finally:
+            olap.reset()
+
+    def test_load_failure_keeps_sql(self, mock_query_dicts, monkeypatch):
+        monkeypatch.setattr(olap, "OLAP_ENGINE", "numpy")
+        olap.reset()
+        mock_query_dicts.side_effect = RuntimeError("db down")
+        try:
+            assert olap._store.load(1) is None
+            assert olap._store.load(1) is None
+            assert mock_query_dicts.call_count == 1  # retry is deferred
+        finally:
+            olap.reset()
+
+
+class TestEndpointsFromSnapshot:
+    def test_stats(self, client, mock_query_dicts, numpy_engine):
+        data = client.get("/api/empleo/stats").json()
+        assert mock_query_dicts.call_count == 0
+        assert data["total_ofertas"] == 4
+        assert data["salario_mediana"] == 2500001
+        assert data["por_fuente"] == [{"fuente": "sena", "total": 3}, {"fuente": "elempleo", "total": 1}]
+        assert [e["empresa"] for e in data["top_empresas"]] == ["Unibán", "Banacol"]
+
+    def test_kpis_filtered(self, client, mock_query_dicts, numpy_engine):
+        data = client.get("/api/empleo/kpis?dane_code=05837").json()
+        assert data == {"total_ofertas": 2, "total_empresas": 1, "total_sectores": 1,
+                        "salario_promedio": 6000000, "sector_top": "Salud", "empresa_top": None}
+
+    def test_distribution(self, client, numpy_engine):
+        assert client.get("/api/empleo/contratos").json() == [
+            {"tipo": "Fijo", "total": 2}, {"tipo": "Obra", "total": 1}]
+
+    def test_salarios(self, client, numpy_engine):
+        data = client.get("/api/empleo/salarios").json()
+        assert data["por_sector"] == [{"sector": "Agro", "ofertas": 2, "promedio": 1900001,
+                                       "minimo": 1300000, "maximo": 2500001}]
+        assert [m["municipio"] for m in data["por_municipio"]] == ["Turbo", "Apartadó"]
+        assert data["rangos"] == [{"rango": "1-2 SMMLV", "ofertas": 1}, {"rango": "2-3 SMMLV", "ofertas": 1},
+                                  {"rango": "> 5 SMMLV", "ofertas": 1}]
+
+    def test_sectores_and_serie(self, client, numpy_engine):
+        sectores = client.get("/api/empleo/sectores").json()
+        assert sectores[0] == {"sector": "Agro", "ofertas": 2, "empresas": 2, "municipios": 1,
+                               "salario_promedio": 1900001, "con_salario": 2}
+        serie = client.get("/api/empleo/serie-temporal").json()
+        assert [(p["periodo"], p["ofertas"], p["empresas"]) for p in serie] == [("2025-01", 2, 2), ("2025-02", 1, 1)]
+
+    def test_cadenas(self, client, mock_query_dicts, monkeypatch):
+        rows = [{**r, "sector": "Agroindustria" if r["sector"] == "Agro" else r["sector"]} for r in ROWS]
+
+        async def current():
+            return OfertasSnapshot(rows)
+
+        monkeypatch.setattr("src.backend.routers.analytics.aget_snapshot", current)
+        cadenas = {c["cadena"]: c for c in client.get("/api/analytics/laboral/cadenas-productivas").json()}
+        assert mock_query_dicts.call_count == 0 and mock_query_dicts.batch.call_count == 0
+        banano = cadenas["Banano y Plátano"]
+        assert (banano["ofertas"], banano["empresas"], banano["salario_promedio"]) == (2, 2, 1900000)
+        assert cadenas["Servicios y Administrativo"]["empresas"] == 1
+        assert banano["top_skills"] == [{"skill": "Cosecha", "demanda": 2}, {"skill": "Empaque", "demanda": 1}]
+        assert cadenas["Servicios y Administrativo"]["top_skills"] == [{"skill": "Excel", "demanda": 1}]
+
+    def test_skills_and_cooccurrence(self, client, mock_query_dicts, numpy_engine):
+        assert client.get("/api/empleo/skills?sector=Agro").json() == [
+            {"skill": "Cosecha", "demanda": 2}, {"skill": "Empaque", "demanda": 1}, {"skill": "Excel", "demanda": 1}]
+        data = client.get("/api/empleo/skills/co-occurrence?skill=Excel").json()
+        assert mock_query_dicts.call_count == 0
+        assert data["ofertas"] == 2 and data["total_ofertas"] == 4
+        assert data["coocurrencias"] == [
+            {"skill": "Cosecha", "ofertas": 1, "confianza": 0.5, "lift": 1.0},
+            {"skill": "Enfermería", "ofertas": 1, "confianza": 0.5, "lift": 2.0},
+        ]
+
+
+def test_cooccurrence_sql_fallback(client, mock_query_dicts):
+    mock_query_dicts.return_value = [
+        {"skill": "Cosecha", "ofertas": 3, "frecuencia": 10, "total": 100, "base": 6},
+    ]
+    data = client.get("/api/empleo/skills/co-occurrence?skill=Empaque&dane_code=05045").json()
+    sql, params = mock_query_dicts.call_args.args
+    assert "skills @> ARRAY[CAST(:skill AS TEXT)]" in sql
+    assert params == {"skill": "Empaque", "dane": "05045"}
+    assert data["coocurrencias"] == [{"skill": "Cosecha", "ofertas": 3, "confianza": 0.5, "lift": 5.0}]
+
+
+def test_facets_from_snapshot(client, mock_query_dicts, numpy_engine):
+    data = client.get("/api/empleo/facets?fuente=sena&municipio=apar").json()
+    assert mock_query_dicts.call_count == 0
+    assert data["total"] == 1
+    # fuente ignores its own filter (municipio ILIKE '%apar%' still applies)
+    assert data["facets"]["fuente"] == [{"value": "sena", "count": 1}, {"value": "elempleo", "count": 1}]
+    assert data["facets"]["municipio"] == [{"value": "Turbo", "count": 2}, {"value": "Apartadó", "count": 1}]
+    assert data["facets"]["nivel_educativo"] == []
@@ -0,0 +1,101 @@
+"""Tests for keyset (cursor) pagination helpers and the places directory."""
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from src.backend.services.pagination import (
+    decode_cursor, encode_cursor, estimate_count, fetch_keyset_page, keyset_condition,
+)
+
+
+class TestCursorEncoding:
+    def test_round_trip_keeps_types(self):
+        cursor = encode_cursor(date(2025, 1, 14), 8)
+        assert decode_cursor(cursor, 2) == [date(2025, 1, 14), 8]
+
+        cursor = encode_cursor(datetime(2025, 1, 14, 8, 30), "abc")
+        assert decode_cursor(cursor, 2) == [datetime(2025, 1, 14, 8, 30), "abc"]
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor("Almacén ñandú", "ChIJ-_/x")
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1, 2, 3), encode_cursor({"x": 1}, 2)])
+    def test_malformed_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 2)
+
+
+class TestKeysetCondition:
+    def test_descending_nulls_last(self):
+        sql, params = keyset_condition("fecha", "id", date(2025, 1, 1), 5, descending=True)
+        assert sql == "((fecha, id) < (:ks_v, :ks_id))"
+        assert params == {"ks_v": date(2025, 1, 1), "ks_id": 5}
+
+    def test_inside_null_block(self):
+        sql, params = keyset_condition("rating", "place_id", None, "p1")
+        assert sql == "(rating IS NULL AND place_id > :ks_id)"
+        assert params == {"ks_id": "p1"}
+
+    def test_ascending_row_value(self):
+        sql, _ = keyset_condition("name", "place_id", "B", "p1")
+        assert sql == "((name, place_id) > (:ks_v, :ks_id))"
+
+
+class TestFetchKeysetPage:
+    def test_range_scan_then_null_block(self, mock_query_dicts):
+        mock_query_dicts.side_effect = [[{"id": 3}], [{"id": 9}, {"id": 2}]]
+        rows = asyncio.run(fetch_keyset_page(
+            "SELECT id FROM t", "1=1", {"x": 1}, "fecha", "id",
+            [date(2025, 1, 1), 5], 3, descending=True))
+        assert [r["id"] for r in rows] == [3, 9, 2]
+        (range_sql, range_params), (null_sql, null_params) = (
+            c.args for c in mock_query_dicts.call_args_list)
+        assert "(fecha, id) < (:ks_v, :ks_id)" in range_sql
+        assert "IS NULL" not in range_sql
+        assert range_params == {"x": 1, "ks_v": date(2025, 1, 1), "ks_id": 5, "lim": 3}
+        assert "AND fecha IS NULL ORDER BY fecha DESC NULLS LAST, id DESC" in null_sql
+        assert null_params == {"x": 1, "lim": 2}
+
+    def test_full_range_page_skips_null_block(self, mock_query_dicts):
+        mock_query_dicts.return_value = [{"id": 4}, {"id": 3}]
+        asyncio.run(fetch_keyset_page("SELECT id FROM t", "1=1", {}, "fecha", "id",
+                                      [date(2025, 1, 1), 5], 2, descending=True))
+        assert mock_query_dicts.call_count == 1
+
+    def test_inside_null_block_single_query(self, mock_query_dicts):
+        mock_query_dicts.return_value = []
+        asyncio.run(fetch_keyset_page("SELECT id FROM t", "1=1", {}, "fecha", "id",
+                                      [None, 5], 2, descending=True))
+        assert mock_query_dicts.call_count == 1
+        assert "(fecha IS NULL AND id < :ks_id)" in mock_query_dicts.call_args.args[0]
+
+
+def test_estimate_count_unavailable_on_sqlite():
+    # SQLite has no EXPLAIN (FORMAT JSON); the helper degrades to None
+    assert asyncio.run(estimate_count("(SELECT 1) t")) is None
+
+
+class TestPlacesDirectoryCursor:
+    def test_cursor_follows_sort_column(self, client, mock_query_dicts):
+        places = [{"place_id": f"p{i}", "name": n, "category": "tienda", "address": "",
+                   "rating": r, "user_ratings_total": 1, "lat": 0, "lon": 0}
+                  for i, (n, r) in enumerate([("A", 4.8), ("B", 4.5), ("C", 4.5)])]
+        mock_query_dicts.side_effect = [places, [{"QUERY PLAN": [{"Plan": {"Plan Rows": 40}}]}]]
+        resp = client.get("/api/geo/places/directory?mode=cursor&page_size=2&sort_by=rating&sort_order=desc")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert len(data["items"]) == 2
+        assert data["total_estimate"] == 40
+        assert decode_cursor(data["next_cursor"], 4) == ["rating", "DESC", 4.5, "p1"]
+        sql = mock_query_dicts.call_args_list[0].args[0]
+        assert "ORDER BY rating DESC NULLS LAST, place_id DESC" in sql
+
+    def test_cursor_bound_to_sort(self, client, mock_query_dicts):
+        cursor = encode_cursor("rating", "DESC", 4.5, "p1")
+        resp = client.get(f"/api/geo/places/directory?mode=cursor&sort_by=name&cursor={cursor}")
+        assert resp.status_code == 400
+        resp = client.get(f"/api/geo/places/directory?mode=cursor&sort_by=rating&sort_order=asc&cursor={cursor}")
+        assert resp.status_code == 400
+        mock_query_dicts.assert_not_called()
@@ -0,0 +1,74 @@
+"""Tests for the mergeable summaries read from the ETL rollups."""
+import random
+import sys
+from pathlib import Path
+
+from src.backend.services.sketches import (
+    HLL_RELATIVE_ERROR, HyperLogLog, histogram_quantile, histogram_quantiles, merge_histograms,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "etl"))
+from etl_sync import rollup_deltas  # noqa: E402
+
+
+def _cell_sketches(salaries, cells=4):
+    """Split salaries across rollup cells, as the ETL would store them."""
+    rows = [{"fecha_publicacion": f"2025-{i % cells + 1:02d}-01", "municipio": "Turbo", "dane_code": "05837",
+             "sector": "Salud", "fuente": "sena", "empresa": None, "salario_numerico": s}
+            for i, s in enumerate(salaries)]
+    return [c["salario_sketch"] for c in rollup_deltas(rows)]
+
+
+def test_merge_adds_counts():
+    merged = merge_histograms(['{"1": 2}', {"1": 1, "3": 4}, None])
+    assert merged == {1: 3, 3: 4}
+
+
+def test_median_of_merged_cells_within_one_percent():
+    rng = random.Random(7)
+    salaries = [rng.randint(900_000, 9_000_000) for _ in range(2001)]
+    exact = sorted(salaries)[1000]
+    approx = histogram_quantile(merge_histograms(_cell_sketches(salaries)), 0.5)
+    assert abs(approx - exact) / exact <= 0.01
+
+
+def test_quantiles_in_one_pass():
+    rng = random.Random(11)
+    salaries = [rng.randint(900_000, 9_000_000) for _ in range(1001)]
+    ordered = sorted(salaries)
+    sketch = merge_histograms(_cell_sketches(salaries))
+    for q, approx in zip((0.9, 0.1, 0.5), histogram_quantiles(sketch, (0.9, 0.1, 0.5))):
+        exact = ordered[round(q * 1000)]
+        assert abs(approx - exact) / exact <= 0.01
+        assert approx == histogram_quantile(sketch, q)
+
+
+def test_empty_histogram():
+    assert histogram_quantile({}, 0.5) is None
+    assert histogram_quantile(None, 0.5) is None
+
+
+def test_hll_within_error_bound():
+    hll = HyperLogLog()
+    for i in range(50_000):
+        hll.add(f"empresa-{i % 20_000}")
+    # 3 standard errors
+    assert abs(hll.count() - 20_000) / 20_000 <= 3 * HLL_RELATIVE_ERROR
+
+
+def test_hll_small_counts_exact():
+    hll = HyperLogLog()
+    for value in ["Unibán", "Banacol", "Unibán", "Augura"]:
+        hll.add(value)
+    assert hll.count() == 3
+
+
+def test_hll_merge_is_union():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        a.add(i)
+    for i in range(2000, 6000):
+        b.add(i)
+    merged = HyperLogLog(a.to_bytes()).merge(b)
+    assert abs(merged.count() - 6000) / 6000 <= 3 * HLL_RELATIVE_ERROR
+    assert a.count() == HyperLogLog(a.to_bytes()).count()
@@ -0,0 +1,92 @@
+"""Tests for the TerriData latest-value cube."""
+import pytest
+
+from src.backend.services import terridata
+from src.backend.services.terridata import TerriDataCube
+
+ROWS = [
+    {"indicador": "Población total", "entidad": "Apartadó", "codigo_entidad": 5045,
+     "dane_code": "05045", "dato_numerico": 120000.0, "anio": 2023},
+    {"indicador": "Población total", "entidad": "Antioquia", "codigo_entidad": 5,
+     "dane_code": "05045", "dato_numerico": 6800000.0, "anio": 2023},
+    {"indicador": "Población total", "entidad": "Turbo", "codigo_entidad": 5837,
+     "dane_code": "05837", "dato_numerico": 60000.0, "anio": 2022},
+    {"indicador": "Tasa de homicidios por cada 100.000 habitantes", "entidad": "Apartadó",
+     "codigo_entidad": 5045, "dane_code": "05045", "dato_numerico": 30.0, "anio": 2021},
+    {"indicador": "Tasa de homicidios por cada 100.000 habitantes", "entidad": "Turbo",
+     "codigo_entidad": 5837, "dane_code": "05837", "dato_numerico": None, "anio": 2022},
+]
+
+
+@pytest.fixture()
+def cube():
+    return TerriDataCube(ROWS, version=2)
+
+
+class TestCube:
+    def test_shape(self, cube):
+        assert cube.values.shape == (2, 3)
+        assert cube.names == ["Apartadó", "Antioquia", "Turbo"]
+
+    def test_dane_code_resolves_to_own_entity(self, cube):
+        assert cube.entity("05045") == "Apartadó"
+        assert cube.latest("Población total", "05045") == (120000.0, 2023)
+
+    def test_latest_missing(self, cube):
+        assert cube.latest("Población total", "99999") == (None, None)
+        assert cube.latest("No existe", "05045") == (None, None)
+        assert cube.latest("Tasa de homicidios por cada 100.000 habitantes", "05837") == (None, None)
+
+    def test_latest_regional_takes_latest_year(self, cube):
+        assert cube.latest("Tasa de homicidios por cada 100.000 habitantes", None) == (None, None)
+        assert cube.latest("Población total", None)[1] == 2023
+
+    def test_column_and_by_dane_code(self, cube):
+        homicidios = "Tasa de homicidios por cada 100.000 habitantes"
+        assert cube.column(homicidios) == [
+            {"municipio": "Apartadó", "dane_code": "05045", "valor": 30.0, "anio": 2021},
+            {"municipio": "Turbo", "dane_code": "05837", "valor": None, "anio": 2022},
+        ]
+        assert cube.by_dane_code(homicidios) == {"05045": {"municipio": "Apartadó", "valor": 30.0, "anio": 2021}}
+
+    def test_regional_average(self, cube):
+        assert cube.regional_average("Población total") == (3460000.0, 2023)
+        assert cube.regional_average("No existe") == (None, None)
+
+    def test_pairs(self, cube):
+        assert cube.pairs("Población total", "Tasa de homicidios por cada 100.000 habitantes") == [
+            {"label": "Apartadó", "x": 120000.0, "y": 30.0},
+        ]
+
+    def test_empty(self):
+        empty = TerriDataCube([])
+        assert empty.column("Población total") == []
+        assert empty.latest("Población total", None) == (None, None)
+
+
+class TestCubeLifecycle:
+    def test_builds_once_per_version(self, mock_query_dicts):
+        mock_query_dicts.return_value = ROWS
+        first = terridata._store.load(5)
+        assert first.version == 5 and len(first.entities) == 3
+        assert terridata._store.load(5) is first
+        assert mock_query_dicts.call_count == 1
+        assert terridata._store.load(6) is not first
+
+    def test_failed_rebuild_serves_previous(self, mock_query_dicts):
+        mock_query_dicts.return_value = ROWS
+        first = terridata._store.load(1)
+        mock_query_dicts.side_effect = RuntimeError("db down")
+        assert terridata._store.load(2) is first
+        terridata.reset()
+        with pytest.raises(RuntimeError):
+            terridata._store.load(2)
+
+
+class TestEndpointsFromCube:
+    def test_scatter(self, client, mock_query_dicts, terridata_cube):
+        terridata_cube(ROWS)
+        data = client.get("/api/crossvar/scatter?var_x=poblacion&var_y=homicidios").json()
+        assert mock_query_dicts.call_count == 0
+        assert data["n"] == 1
+        assert data["points"] == [{"label": "Apartadó", "x": 120000.0, "y": 30.0}]
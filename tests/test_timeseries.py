@@ -0,0 +1,101 @@
+"""Tests for the daily offers time-series store."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.backend.services import timeseries
+from src.backend.services.timeseries import DailySeries, growth_pct, seasonal_indices
+
+ROWS = [
+    {"dia": date(2025, 1, 30), "municipio": "Turbo", "sector": "Salud", "ofertas": 2,
+     "salario_suma": 4000000, "salario_n": 2},
+    {"dia": "2025-02-02", "municipio": "Apartadó", "sector": "Agro", "ofertas": 3,
+     "salario_suma": 0, "salario_n": 0},
+    {"dia": "2025-03-01", "municipio": None, "sector": "Agro", "ofertas": 1,
+     "salario_suma": 1500000, "salario_n": 1},
+    {"dia": None, "municipio": "Turbo", "sector": None, "ofertas": 5, "salario_suma": 0, "salario_n": 0},
+]
+
+
+@pytest.fixture()
+def series():
+    return DailySeries(ROWS, [{"mes": "2025-02", "empresas": 2}], version=4)
+
+
+class TestDailySeries:
+    def test_axes(self, series):
+        assert series.municipios == ["Apartadó", "Turbo", None]
+        assert series.sectores == ["Agro", "Salud", None]
+        assert str(series.days[0]) == "2025-01-30" and len(series.days) == 31
+        assert [str(m) for m in series.months] == ["2025-01", "2025-02", "2025-03"]
+        assert series.empresas_mes.tolist() == [0, 2, 0]
+
+    def test_windows(self, series):
+        assert series.window().tolist() == [3, 2, 1]
+        assert series.window("2025-02-01", "2025-03-01").tolist() == [3, 0, 0]
+        assert series.window("2025-02-01").tolist() == [3, 0, 1]
+        assert series.window("2030-01-01").tolist() == [0, 0, 0]
+        assert series.window("2020-01-01", "2025-01-31").tolist() == [0, 2, 0]
+        assert series.totals().tolist() == [3, 7, 1]
+
+    def test_monthly(self, series):
+        monthly = series.monthly()
+        assert monthly.sum(axis=(0, 1)).tolist() == [2, 3, 1]
+        assert monthly[0, 0].tolist() == [0, 3, 0]
+        assert series.month_of_year().tolist() == [1, 2, 3]
+        assert series.salario_suma.sum(axis=(0, 1)).tolist() == [4000000, 0, 1500000]
+
+    def test_empty(self):
+        empty = DailySeries([])
+        assert empty.monthly().shape == (0, 0, 0)
+        assert empty.window("2025-01-01").tolist() == []
+
+
+class TestSeriesMath:
+    def test_growth_pct(self):
+        np.testing.assert_allclose(growth_pct([40, 52, 26, 0, 5]), [np.nan, 30.0, -50.0, -100.0, np.nan])
+
+    def test_seasonal_indices_recover_pattern(self):
+        months = np.arange(np.datetime64("2021-01"), np.datetime64("2025-01"))
+        moy = months.astype(np.int64) % 12 + 1
+        pattern = np.array([0.6, 0.8, 1.0, 1.2, 1.4, 1.0, 0.8, 1.0, 1.2, 1.0, 1.0, 1.0])
+        trend = np.linspace(100, 200, len(months))
+        indices = seasonal_indices(trend * pattern[moy - 1], moy)
+        np.testing.assert_allclose(indices, pattern, atol=0.02)
+        assert indices.mean() == pytest.approx(1.0)
+
+    def test_seasonal_indices_short_series(self):
+        indices = seasonal_indices([10, 30], np.array([11, 12]))
+        assert indices[10] == 0.5 and indices[11] == 1.5
+        assert np.isnan(indices[:10]).all()
+
+
+class TestSeriesLifecycle:
+    def test_builds_once_per_version(self, mock_query_dicts):
+        mock_query_dicts.side_effect = lambda sql, *a, **k: ROWS if "rollup_diario" in sql else []
+        first = timeseries._store.load(5)
+        assert first.version == 5 and first.totals().sum() == 11
+        assert timeseries._store.load(5) is first
+        assert mock_query_dicts.call_count == 2
+        assert timeseries._store.load(6) is not first
+
+    def test_failed_rebuild_serves_previous(self, mock_query_dicts):
+        mock_query_dicts.side_effect = lambda sql, *a, **k: ROWS if "rollup_diario" in sql else []
+        first = timeseries._store.load(1)
+        mock_query_dicts.side_effect = RuntimeError("db down")
+        assert timeseries._store.load(2) is first
+        timeseries.reset()
+        with pytest.raises(RuntimeError):
+            timeseries._store.load(2)
+
+    def test_falls_back_to_offers_without_rollups(self, mock_query_dicts):
+        def query(sql, *a, **k):
+            if "rollup" in sql:
+                raise RuntimeError('relation "empleo.ofertas_rollup_diario" does not exist')
+            return ROWS if "DATE(fecha_publicacion)" in sql else [{"mes": "2025-02", "empresas": 2}]
+
+        mock_query_dicts.side_effect = query
+        series = timeseries._store.load(3)
+        assert series.totals().sum() == 11 and series.empresas_mes.tolist() == [0, 2, 0]
+        assert all("ofertas_laborales" in c.args[0] for c in mock_query_dicts.call_args_list[1:])